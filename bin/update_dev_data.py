@@ -8,6 +8,7 @@ from tempfile import TemporaryDirectory
 
 import importlib_resources
 from pyramid.paster import bootstrap
+from pyramid.settings import asbool
 
 from checkmate.checker.url.custom_rules import CustomRules
 from checkmate.models import Reason
@@ -35,7 +36,7 @@ def update_remote_dev_data():
         )
 
 
-def update_dev_data(db):
+def update_dev_data(db, rule_index=False):
     """Create some usable data to run against in dev."""
 
     raw_rules = {
@@ -43,7 +44,7 @@ def update_dev_data(db):
         "example.net": Reason.MEDIA_VIDEO,
         "bad.example.com": Reason.MALICIOUS,
     }
-    CustomRules(db).load_simple_rules(raw_rules)
+    CustomRules(db).load_simple_rules(raw_rules, rule_index=rule_index)
     print(f"Loaded {len(raw_rules)} custom rules")
 
 
@@ -55,4 +56,7 @@ if __name__ == "__main__":
         request = env["request"]
 
         with request.tm:
-            update_dev_data(request.db)
+            update_dev_data(
+                request.db,
+                rule_index=asbool(request.registry.settings.get("rule_index")),
+            )
@@ -73,9 +73,35 @@ class CheckmateConfigurator:
         return keys
 
     def _configure_checkmate(self, config):
+        # Both the web app and the Celery tasks need to know about these
+        self.add_setting_from_env("url_haus_filter", default="false")
+        self.add_setting_from_env("url_haus_filter_capacity", default="2000000")
+        self.add_setting_from_env("url_haus_filter_fingerprint_bits", default="12")
+        self.add_setting_from_env("url_haus_swap_tables", default="false")
+        self.add_setting_from_env("url_haus_hash_processes", default="1")
+        self.add_setting_from_env("digest_file", default="")
+        self.add_setting_from_env("last_known_good_file", default="")
+        self.add_setting_from_env("rule_index", default="false")
+
         if not self.celery_worker:
             # The celery workers don't need to know about this stuff
 
+            self.add_setting_from_env("hash_index", default="false")
+            self.add_setting_from_env("hash_index_refresh", default="30")
+            self.add_setting_from_env("combined_lookup", default="false")
+            self.add_setting_from_env("check_function", default="false")
+            self.add_setting_from_env("result_cache", default="false")
+            self.add_setting_from_env("result_cache_size", default="10000")
+            self.add_setting_from_env("result_cache_ttl", default="60")
+            self.add_setting_from_env("url_hash_cache_size", default="10000")
+            self.add_setting_from_env("parallel_checks", default="false")
+            self.add_setting_from_env("parallel_checks_workers", default="8")
+            self.add_setting_from_env("parallel_checks_timeout", default="500")
+            self.add_setting_from_env("check_statement_timeout", default="0")
+            self.add_setting_from_env("circuit_breaker", default="false")
+            self.add_setting_from_env("circuit_breaker_failures", default="5")
+            self.add_setting_from_env("circuit_breaker_reset", default="30")
+
             config.include("pyramid_services")
             config.include("checkmate.services")
 
@@ -105,6 +131,18 @@ class CheckmateConfigurator:
 
     def _configure_db(self, config):
         self.add_setting_from_env("database_url")
+        self.add_setting_from_env("database_pool_size", default="5")
+        self.add_setting_from_env("database_pool_max_overflow", default="10")
+        self.add_setting_from_env("database_pool_timeout", default="30")
+        self.add_setting_from_env("database_pool_recycle", default="-1")
+        self.add_setting_from_env("database_pool_pre_ping", default="false")
+        if self.celery_worker:
+            # Celery tasks write to the DB, so always use the primary
+            config.add_settings({"database_replica_url": ""})
+        else:
+            self.add_setting_from_env("database_replica_url", default="")
+            self.add_setting_from_env("database_replica_stale_after", default="5")
+            self.add_setting_from_env("database_replica_health_check", default="10")
         config.include("checkmate.models")
         config.include("checkmate.db")
 
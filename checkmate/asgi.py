@@ -0,0 +1,282 @@
+"""An ASGI app which serves URL checks with asyncio and asyncpg.
+
+Gunicorn's sync workers can only wait on the DB for one check at a time. This
+app runs the same check views, but makes their DB calls with asyncpg, so one
+process can hold many checks at once while they wait on the DB:
+
+    uvicorn --factory checkmate.asgi:create_asgi_app --port 9100
+
+Only the check API is served here. The Pyramid app carries on serving
+everything else, including the admin and block pages.
+
+Every request runs on the event loop's thread, so anything which keeps state
+in a thread local is shared between all of the requests in progress. Pyramid's
+current request (`get_current_request()`) is kept per request here, but
+nothing else which is thread local may be used on this path. For the same
+reason, anything slow which doesn't wait on the DB should be run with
+`run_off_the_loop()`.
+
+Checks always read from the primary DB (`DATABASE_URL`), never a replica.
+"""
+
+import asyncio
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import BytesIO
+
+import sqlalchemy as sa
+import zope.sqlalchemy
+from pyramid import threadlocal
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from checkmate.app import create_app
+from checkmate.db_pool import connect_args, pool_options
+
+CHECK_PATHS = frozenset(("/api/check", "/api/check/batch", "/api/check/prefixes"))
+"""The paths served by this app."""
+
+
+class AsyncCheckApp:
+    """Serve Pyramid views with a DB session on an async engine.
+
+    Each request is handled by the Pyramid app as normal, including all of
+    its tweens, authentication and error handling, so the responses are the
+    same as you would get from it. The difference is that `request.db` is
+    backed by an `AsyncSession`, so whenever a view waits on the DB the
+    event loop can get on with other requests.
+
+    As with `request.db` in the Pyramid app, the session is part of the
+    request's transaction, so `pyramid_tm` commits or aborts it.
+
+    Pyramid's current request is only kept per request once a
+    `ContextLocalManager` has been installed, as `create_asgi_app()` does.
+    """
+
+    def __init__(self, pyramid_app, engine, paths=CHECK_PATHS):
+        """Initialise the app.
+
+        :param pyramid_app: The Pyramid router to handle requests with
+        :param engine: SQLAlchemy `AsyncEngine` to give requests sessions on
+        :param paths: The paths to serve, anything else gets a 404
+        """
+        self._pyramid_app = pyramid_app
+        self._engine = engine
+        self._sessionmaker = async_sessionmaker(engine)
+        self._paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["path"] not in self._paths:
+            await _send_response(send, 404, [(b"content-type", b"text/plain")], b"")
+            return
+
+        environ = _environ(scope, await _read_body(receive))
+        with ContextLocalManager.request_stack():
+            async with self._sessionmaker() as session:
+                # Run the view in a greenlet which hands control back to the
+                # event loop whenever the session waits on the DB
+                response = await session.run_sync(self._handle, environ)
+
+        await _send_response(
+            send,
+            response.status_code,
+            [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headerlist
+            ],
+            response.body,
+        )
+
+    def _handle(self, session, environ):
+        with self._pyramid_app.request_context(environ) as request:
+            # This is what `request.db` would do with a session of its own
+            zope.sqlalchemy.register(session, transaction_manager=request.tm)
+            request.db = session
+
+            return self._pyramid_app.invoke_request(request)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            else:
+                # The only other message is "lifespan.shutdown"
+                await self._engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+_REQUEST_STACK = ContextVar("checkmate_request_stack", default=None)
+
+
+class ContextLocalManager:
+    """Pyramid's stack of current requests, kept per request by this app.
+
+    Each request is handled in an asyncio task of its own, and SQLAlchemy runs
+    the view's greenlet in that task's context, so `AsyncCheckApp` gives each
+    request a stack of its own in a context variable. Anything else is passed
+    on to the thread local manager this wraps.
+    """
+
+    def __init__(self, manager):
+        """Initialise the manager.
+
+        :param manager: Pyramid's `ThreadLocalManager` to wrap
+        """
+        self._manager = manager
+
+    @staticmethod
+    @contextmanager
+    def request_stack():
+        """Give the code within a stack of current requests of its own."""
+
+        token = _REQUEST_STACK.set([])
+        try:
+            yield
+        finally:
+            _REQUEST_STACK.reset(token)
+
+    def push(self, info):
+        stack = _REQUEST_STACK.get()
+        if stack is None:
+            self._manager.push(info)
+        else:
+            stack.append(info)
+
+    set = push
+
+    def pop(self):
+        stack = _REQUEST_STACK.get()
+        if stack is None:
+            return self._manager.pop()
+
+        return stack.pop() if stack else None
+
+    def get(self):
+        stack = _REQUEST_STACK.get()
+        if stack is None:
+            return self._manager.get()
+
+        return stack[-1] if stack else self._manager.default()
+
+    def clear(self):
+        stack = _REQUEST_STACK.get()
+        if stack is None:
+            self._manager.clear()
+        else:
+            stack.clear()
+
+
+def run_off_the_loop(function, *args):
+    """Call a CPU bound function without holding up the event loop.
+
+    Views served by `AsyncCheckApp` run on the event loop's thread, so this
+    runs the function in a thread of the loop's default executor instead.
+    Anywhere else it just calls the function.
+
+    :param function: The function to call
+    :param args: Arguments to call it with
+    """
+    if not in_greenlet():
+        return function(*args)
+
+    return await_only(asyncio.get_running_loop().run_in_executor(None, function, *args))
+
+
+def async_database_url(database_url):
+    """Get the asyncpg version of a Postgres DB URL."""
+
+    return sa.engine.make_url(database_url).set(drivername="postgresql+asyncpg")
+
+
+def create_asgi_app(**settings):  # pragma: no cover
+    """Configure and return the ASGI app."""
+
+    # Many requests share the event loop's thread, so they can't share a
+    # thread local stack of current requests
+    threadlocal.manager = ContextLocalManager(threadlocal.manager)
+
+    pyramid_app = create_app(
+        None,
+        **{
+            # Parallel checks block a thread for each lookup, which would
+            # hold up the event loop
+            "parallel_checks": "false",
+            **settings,
+        },
+    )
+
+    pool = pool_options(pyramid_app.registry.settings)
+    # Async engines need a pool which is safe to use with asyncio
+    del pool["poolclass"]
+    pool["connect_args"] = connect_args(
+        pyramid_app.registry.settings, async_driver=True
+    )
+    engine = create_async_engine(
+        async_database_url(pyramid_app.registry.settings["database_url"]), **pool
+    )
+
+    return AsyncCheckApp(pyramid_app, engine)
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _environ(scope, body):
+    """Get a WSGI environ for an ASGI HTTP request."""
+
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("",))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        # We've already read the whole body, so we know how long it is
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+
+        if name == "CONTENT_LENGTH":
+            continue
+
+        if name == "CONTENT_TYPE":
+            environ[name] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
@@ -1,10 +1,13 @@
 """Async tasks."""
 
 from celery.utils.log import get_task_logger
+from pyramid.settings import asbool
 
 from checkmate.celery_async.celery import app
-from checkmate.checker.url import URLHaus
+from checkmate.checker.pipeline import UNCHANGED
+from checkmate.checker.url import DigestFile, URLHaus
 from checkmate.exceptions import StageRetryableException
+from checkmate.models import RuleIndex, RuleVersion, URLHausRule
 
 LOG = get_task_logger(__name__)
 
@@ -33,11 +36,18 @@ def initialize_urlhaus():
     with app.request_context() as request:
         LOG.info("Performing full URLHaus re-sync")
 
-        with request.tm:
-            synced = URLHaus(request.db).reinitialize_db()
+        url_haus = _url_haus(request)
+        if asbool(request.registry.settings.get("url_haus_swap_tables")):
+            synced = url_haus.reinitialize_db(transaction_manager=request.tm)
+        else:
+            with request.tm:
+                synced = url_haus.reinitialize_db()
 
         LOG.info("Reinitialized %s records", synced)
 
+        _write_digest_file(request)
+        _vacuum_urlhaus(request)
+
 
 @pipeline_task
 def sync_urlhaus():
@@ -49,6 +59,112 @@ def sync_urlhaus():
         LOG.info("Performing partial URLHaus update")
 
         with request.tm:
-            synced = URLHaus(request.db).update_db()
+            synced = _url_haus(request).update_db()
+
+        if synced is UNCHANGED:
+            LOG.info("URLHaus hasn't changed since the last update")
+            return
 
         LOG.info("Synced %s records", synced)
+
+        _write_digest_file(request)
+
+
+@app.task
+def write_digest_file():
+    """Write the rules to the files shared by the web processes.
+
+    These are the digest file and the last known good file, if they are set.
+
+    This happens after every URLHaus sync and every change made in the admin
+    pages, but can also be run on a schedule to repair the files.
+    """
+
+    # pylint: disable=no-member
+    # PyLint doesn't know about the `request_context` method that we add
+    with app.request_context() as request:
+        _write_digest_file(request)
+
+
+@app.task
+def vacuum_urlhaus():
+    """Vacuum the URLHaus rules one partition at a time.
+
+    This happens after every full URLHaus re-sync, but can also be run on a
+    schedule rather than waiting for autovacuum to get to the whole table.
+    """
+
+    # pylint: disable=no-member
+    # PyLint doesn't know about the `request_context` method that we add
+    with app.request_context() as request:
+        _vacuum_urlhaus(request)
+
+
+@app.task
+def rebuild_rule_index():
+    """Regenerate the combined rule index from the rule tables.
+
+    The index is kept up to date as the rules change, so this is only needed
+    to fill it for the first time, or to repair it.
+    """
+
+    # pylint: disable=no-member
+    # PyLint doesn't know about the `request_context` method that we add
+    with app.request_context() as request:
+        with request.tm:
+            RuleIndex.rebuild(request.db)
+            RuleVersion.bump(request.db)
+
+        LOG.info("Rebuilt the rule index")
+
+
+def _write_digest_file(request):
+    settings = request.registry.settings
+
+    # The web processes only ever read these files, so this is the one place
+    # we read every rule from the DB. They can both be the same file, in
+    # which case we only need to write it once.
+    paths = dict.fromkeys(
+        path
+        for path in (
+            settings.get("digest_file"),
+            settings.get("last_known_good_file"),
+        )
+        if path
+    )
+    if not paths:
+        return
+
+    with request.tm:
+        version = RuleVersion.current(request.db)
+        for path in paths:
+            written = DigestFile.write(request.db, path, version)
+            LOG.info("Wrote %s digests at version %s to %s", written, version, path)
+
+
+def _vacuum_urlhaus(request):
+    URLHausRule.vacuum(request.registry["database_engine"])
+
+    LOG.info("Vacuumed %s URLHaus partitions", URLHausRule.PARTITIONS)
+
+
+def _url_haus(request):
+    return URLHaus(
+        request.db,
+        filter_settings=_filter_settings(request),
+        hash_processes=int(request.registry.settings["url_haus_hash_processes"]),
+        rule_index=asbool(request.registry.settings["rule_index"]),
+    )
+
+
+def _filter_settings(request):
+    """Get the settings for the URLHaus filter, or None if it's disabled."""
+
+    settings = request.registry.settings
+    if not asbool(settings.get("url_haus_filter")):
+        return None
+
+    return {
+        "capacity": int(settings["url_haus_filter_capacity"]),
+        "fingerprint_bits": int(settings["url_haus_filter_fingerprint_bits"]),
+    }
@@ -1,5 +1,5 @@
 """Low level tools for working with online lists."""
 
-from checkmate.checker.pipeline.core import Pipeline
+from checkmate.checker.pipeline.core import UNCHANGED, Pipeline
 from checkmate.checker.pipeline.file import ReadCSVFile, ReadTextFile, UnzipFile
 from checkmate.checker.pipeline.web import Download
@@ -3,7 +3,10 @@
 import os.path
 from tempfile import NamedTemporaryFile
 
-from checkmate.exceptions import StageException
+from checkmate.exceptions import SourceUnchanged, StageException
+
+UNCHANGED = object()
+"""The result of a pipeline whose source hasn't changed since last time."""
 
 
 class Stage:
@@ -24,6 +27,15 @@ class Stage:
 
         return NamedTemporaryFile(dir=working_dir, delete=False, suffix=suffix)
 
+    @classmethod
+    def check_source(cls, source):
+        """Check that a source is a valid file or a file object."""
+
+        if hasattr(source, "read"):
+            return
+
+        cls.check_file(source)
+
     @staticmethod
     def check_file(filename):
         """Check that a source is a valid file.
@@ -39,13 +51,20 @@ class Stage:
 
 
 class Pipeline(Stage):
-    """A collection of stages which run together."""
+    """A collection of stages which run together.
+
+    If any stage finds its source hasn't changed, the rest are skipped and the
+    pipeline returns `UNCHANGED`.
+    """
 
     def __init__(self, stages):
         self.stages = stages
 
     def __call__(self, working_dir, source=None):
-        for stage in self.stages:
-            source = stage(working_dir, source)
+        try:
+            for stage in self.stages:
+                source = stage(working_dir, source)
+        except SourceUnchanged:
+            return UNCHANGED
 
         return source
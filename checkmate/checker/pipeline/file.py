@@ -1,6 +1,7 @@
 """Stages which read files."""
 
 import csv
+from io import TextIOWrapper
 from logging import getLogger
 from zipfile import BadZipFile, ZipFile
 
@@ -11,7 +12,10 @@ LOG = getLogger(__name__)
 
 
 class ReadTextFile(Stage):
-    """A stage which reads a file and outputs a generator of lines."""
+    """A stage which reads a file and outputs a generator of lines.
+
+    The source can be a filename or a binary file object.
+    """
 
     def __init__(self, name=None):
         self._name = name
@@ -20,9 +24,15 @@ class ReadTextFile(Stage):
         if source is None:
             source = self._name
 
-        self.check_file(source)
+        self.check_source(source)
+
+        if isinstance(source, str):
+            # pylint: disable=consider-using-with
+            handle = open(source, encoding="utf8")
+        else:
+            handle = TextIOWrapper(source, encoding="utf8")
 
-        with open(source, encoding="utf8") as handle:
+        with handle:
             yield from handle
 
 
@@ -37,13 +47,23 @@ class ReadCSVFile(ReadTextFile):
 
 
 class UnzipFile(Stage):
-    """A stage which reads a file from a ZIP file and outputs a new file."""
+    """A stage which reads a file from a ZIP file and outputs a new file.
+
+    The source can be a filename or a seekable binary file object.
+    """
 
-    def __init__(self, file_in_zip):
+    def __init__(self, file_in_zip, stream=False):
+        """Initialise a stage to unzip a file.
+
+        :param file_in_zip: The name of the file to read from the ZIP file
+        :param stream: Provide a file object which unzips the file as it's
+            read, rather than extracting it to a new file
+        """
         self._file_in_zip = file_in_zip
+        self._stream = stream
 
     def __call__(self, working_dir, source=None):
-        self.check_file(source)
+        self.check_source(source)
 
         try:
             zip_file = ZipFile(source)  # pylint: disable=consider-using-with
@@ -51,6 +71,9 @@ class UnzipFile(Stage):
             raise StageException(f"Cannot parse zip file '{source}'") from err
 
         try:
+            if self._stream:
+                return _ZipMember(zip_file.open(self._file_in_zip, mode="r"), source)
+
             return self._extract_file(self._file_in_zip, zip_file, working_dir)
         except KeyError as err:
             raise StageException(
@@ -65,3 +88,24 @@ class UnzipFile(Stage):
                 temp_file.write(line)
 
             return temp_file.name
+
+
+class _ZipMember:
+    """A file object for a file in a ZIP file, which closes its source with it.
+
+    `ZipFile` never closes file objects it's given, so without this they'd
+    be left open until they're garbage collected.
+    """
+
+    def __init__(self, member, source):
+        self._member = member
+        self._source = source
+
+    def __getattr__(self, name):
+        return getattr(self._member, name)
+
+    def close(self):
+        self._member.close()
+
+        if hasattr(self._source, "close"):
+            self._source.close()
@@ -1,10 +1,16 @@
 """Stages which deal with online sources."""
 
+from tempfile import SpooledTemporaryFile
+
 import requests
 from requests.exceptions import ReadTimeout, RequestException
 
 from checkmate.checker.pipeline.core import Stage
-from checkmate.exceptions import StageException, StageRetryableException
+from checkmate.exceptions import (
+    SourceUnchanged,
+    StageException,
+    StageRetryableException,
+)
 
 
 class Download(Stage):
@@ -12,16 +18,32 @@ class Download(Stage):
 
     CHUNK_SIZE = 64000
 
-    def __init__(self, url, timeout=10):
+    SPOOL_SIZE = 16 * 1024 * 1024
+    """The largest download to keep in memory when streaming."""
+
+    VALIDATORS = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+    """Response headers to keep, and the request headers to send them back in."""
+
+    def __init__(self, url, timeout=10, validators=None, stream=False):
         """Initialise a stage to download a file.
 
         :param url: URL to retrieve
         :param timeout: Maximum time to wait on getting it
+        :param validators: A dict of the `VALIDATORS` headers from the last
+            time the URL was downloaded. If provided, the file is only
+            downloaded if it has changed since. After downloading, this is
+            replaced by the headers of the new file.
+        :param stream: Provide a seekable file object rather than a filename.
+            Downloads up to `SPOOL_SIZE` are kept in memory, and larger ones
+            in an anonymous temporary file.
+        :raise SourceUnchanged: If the file hasn't changed since `validators`
         :raise StageRetryableException: If the request takes too long
         :raise StageException: For any other problems
         """
         self._url = url
         self._timeout = timeout
+        self.validators = validators or {}
+        self._stream = stream
 
     def __call__(self, working_dir, source=None):
         try:
@@ -34,12 +56,38 @@ class Download(Stage):
             raise StageException(f"Could not download url {self._url}: {err}") from err
 
     def _download(self, url, working_dir):
-        with requests.get(url, timeout=self._timeout) as response:
+        headers = {
+            request_header: self.validators[response_header]
+            for response_header, request_header in self.VALIDATORS.items()
+            if self.validators.get(response_header)
+        }
+
+        with requests.get(url, timeout=self._timeout, headers=headers) as response:
+            if response.status_code == 304:
+                raise SourceUnchanged(f"{url} hasn't changed since it was last read")
+
             response.raise_for_status()
 
-            temp_file = self.temp_file(working_dir, "zip")
+            self.validators = {
+                header: response.headers[header]
+                for header in self.VALIDATORS
+                if header in response.headers
+            }
+
+            if self._stream:
+                # pylint: disable=consider-using-with
+                temp_file = SpooledTemporaryFile(
+                    max_size=self.SPOOL_SIZE, dir=working_dir
+                )
+            else:
+                temp_file = self.temp_file(working_dir, "zip")
 
             for chunk in response.iter_content(self.CHUNK_SIZE):
                 temp_file.write(chunk)
 
-            return temp_file.name
+            if not self._stream:
+                return temp_file.name
+
+            temp_file.seek(0)
+
+            return temp_file
@@ -1,3 +1,6 @@
 from checkmate.checker.url.allow_rules import AllowRules
+from checkmate.checker.url.cuckoo_filter import CuckooFilter
 from checkmate.checker.url.custom_rules import BlocklistParser, CustomRules
+from checkmate.checker.url.digest_file import DigestFile
+from checkmate.checker.url.hash_index import HashIndex
 from checkmate.checker.url.url_haus import URLHaus
@@ -14,7 +14,5 @@ class AllowRules(HashedURLChecker):
         :returns: A generator of Reason objects
         """
 
-        hits = AllowRule.find_matches(self._session, hex_hashes)
-
-        if not hits.count():
+        if not AllowRule.has_matches(self._session, hex_hashes):
             yield Reason.NOT_ALLOWED
@@ -0,0 +1,206 @@
+"""A compact probabilistic set of hashes which supports deletion."""
+
+import random
+import struct
+from array import array
+
+from checkmate.exceptions import FilterFull
+
+
+class CuckooFilter:
+    """A cuckoo filter of SHA-256 digests.
+
+    This can tell you an item is definitely not present, or that it probably
+    is, using only a few bits per item. Unlike a Bloom filter, items can be
+    removed again, so the filter can be kept up to date as rows change.
+
+    As items are already SHA-256 digests, we use their bits directly to pick
+    buckets and fingerprints rather than hashing them again.
+
+    See: https://www.cs.cmu.edu/~dga/papers/cuckoo-conext2014.pdf
+    """
+
+    BUCKET_SIZE = 4
+    """The number of fingerprints held in each bucket."""
+
+    MAX_KICKS = 500
+    """How many items to move around before we declare the filter full."""
+
+    TARGET_LOAD = 0.95
+    """The fraction of slots we expect to be able to fill."""
+
+    _HEADER = struct.Struct("!BIQ")
+
+    def __init__(self, capacity, fingerprint_bits=12):
+        """Create an empty filter.
+
+        :param capacity: The number of items the filter should be able to hold
+        :param fingerprint_bits: The number of bits to store for each item.
+            Each extra bit halves the false positive rate.
+        """
+        if not 1 <= fingerprint_bits <= 16:
+            raise ValueError("Fingerprints must be between 1 and 16 bits")
+
+        self.fingerprint_bits = fingerprint_bits
+
+        self.version = None
+        """The version of the stored filter this was loaded from, if any."""
+
+        # Picking the alternative bucket with an XOR only works if the number
+        # of buckets is a power of two
+        min_buckets = max(1, int(capacity / (self.BUCKET_SIZE * self.TARGET_LOAD)))
+        self._num_buckets = 1 << (min_buckets - 1).bit_length()
+        self._slots = array(
+            "B" if fingerprint_bits <= 8 else "H",
+            [0] * (self._num_buckets * self.BUCKET_SIZE),
+        )
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, digest):
+        fingerprint, bucket_1, bucket_2 = self._locate(digest)
+
+        return self._find(bucket_1, fingerprint) is not None or (
+            self._find(bucket_2, fingerprint) is not None
+        )
+
+    def add(self, digest):
+        """Add a digest to the filter.
+
+        Adding the same digest twice means it will need removing twice.
+
+        :param digest: A SHA-256 digest as bytes
+        :raise FilterFull: If there's no room left in the filter
+        """
+        fingerprint, bucket_1, bucket_2 = self._locate(digest)
+
+        for bucket in (bucket_1, bucket_2):
+            if self._insert(bucket, fingerprint):
+                self._count += 1
+                return
+
+        # Both buckets are full, so start evicting other fingerprints into
+        # their alternative buckets until something fits
+        moves = []
+        bucket = random.choice((bucket_1, bucket_2))
+        for _ in range(self.MAX_KICKS):
+            slot = bucket * self.BUCKET_SIZE + random.randrange(self.BUCKET_SIZE)
+            moves.append((slot, self._slots[slot]))
+            fingerprint, self._slots[slot] = self._slots[slot], fingerprint
+
+            bucket = self._alternative(bucket, fingerprint)
+            if self._insert(bucket, fingerprint):
+                self._count += 1
+                return
+
+        # Put everything back where it was, so we don't lose anything
+        for slot, previous in reversed(moves):
+            self._slots[slot] = previous
+
+        raise FilterFull(f"Cuckoo filter is full with {self._count} items")
+
+    def remove(self, digest):
+        """Remove a digest which was previously added.
+
+        :param digest: A SHA-256 digest as bytes
+        :return: True if the digest was found and removed
+        """
+        fingerprint, bucket_1, bucket_2 = self._locate(digest)
+
+        for bucket in (bucket_1, bucket_2):
+            slot = self._find(bucket, fingerprint)
+            if slot is not None:
+                self._slots[slot] = 0
+                self._count -= 1
+                return True
+
+        return False
+
+    @property
+    def capacity(self):
+        """Get the number of slots available for items."""
+
+        return len(self._slots)
+
+    @property
+    def memory_bytes(self):
+        """Get the memory used to store the fingerprints."""
+
+        return len(self._slots) * self._slots.itemsize
+
+    @property
+    def false_positive_rate(self):
+        """Get the upper bound of the false positive rate when full."""
+
+        return 2 * self.BUCKET_SIZE / (1 << self.fingerprint_bits)
+
+    def metrics(self):
+        """Get a dict of statistics about this filter."""
+
+        return {
+            "items": self._count,
+            "capacity": self.capacity,
+            "load_factor": self._count / self.capacity,
+            "fingerprint_bits": self.fingerprint_bits,
+            "false_positive_rate": self.false_positive_rate,
+            "memory_bytes": self.memory_bytes,
+        }
+
+    def to_bytes(self):
+        """Serialise the filter so it can be stored."""
+
+        return (
+            self._HEADER.pack(self.fingerprint_bits, self._num_buckets, self._count)
+            + self._slots.tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data, version=None):
+        """Load a filter serialised with `to_bytes()`.
+
+        :param data: The serialised filter
+        :param version: The version of the stored filter the data came from
+        """
+
+        fingerprint_bits, num_buckets, count = cls._HEADER.unpack_from(data)
+
+        cuckoo_filter = cls(capacity=0, fingerprint_bits=fingerprint_bits)
+        cuckoo_filter.version = version
+        cuckoo_filter._num_buckets = num_buckets
+        cuckoo_filter._count = count
+        cuckoo_filter._slots = array(cuckoo_filter._slots.typecode)
+        cuckoo_filter._slots.frombytes(data[cls._HEADER.size :])
+
+        return cuckoo_filter
+
+    def _locate(self, digest):
+        # Fingerprints of 0 mean "empty", so we can't use them
+        fingerprint = (
+            int.from_bytes(digest[8:10], "big") & ((1 << self.fingerprint_bits) - 1)
+        ) or 1
+        bucket = int.from_bytes(digest[:8], "big") & (self._num_buckets - 1)
+
+        return fingerprint, bucket, self._alternative(bucket, fingerprint)
+
+    def _alternative(self, bucket, fingerprint):
+        # This is symmetrical, so we can get from either bucket to the other
+        # knowing only the fingerprint (0x5BD1E995 is the MurmurHash2 mixer)
+        return (bucket ^ (fingerprint * 0x5BD1E995)) & (self._num_buckets - 1)
+
+    def _find(self, bucket, fingerprint):
+        start = bucket * self.BUCKET_SIZE
+        for slot in range(start, start + self.BUCKET_SIZE):
+            if self._slots[slot] == fingerprint:
+                return slot
+
+        return None
+
+    def _insert(self, bucket, fingerprint):
+        slot = self._find(bucket, 0)
+        if slot is None:
+            return False
+
+        self._slots[slot] = fingerprint
+        return True
@@ -7,7 +7,7 @@ import requests
 from checkmatelib.url import hash_for_rule
 
 from checkmate.checker.url._hashed_url_checker import HashedURLChecker
-from checkmate.models import CustomRule, Reason
+from checkmate.models import CustomRule, Reason, RuleIndex, RuleVersion, Source
 
 
 class CustomRules(HashedURLChecker):
@@ -19,24 +19,28 @@ class CustomRules(HashedURLChecker):
         :param hex_hashes: A list of hashes for a URL
         :returns: A generator of Reason objects
         """
-        hits = CustomRule.find_matches(self._session, hex_hashes)
+        for tags in CustomRule.find_matching_values(
+            self._session, CustomRule.tags, hex_hashes
+        ):
+            yield from (Reason.parse(tag) for tag in tags)
 
-        for hit in hits:
-            yield from hit.reasons
-
-    def load_simple_rule_url(self, source_url):  # pragma: no cover
+    def load_simple_rule_url(self, source_url, rule_index=False):  # pragma: no cover
         """Update the DB with the content hosted at a specified URL."""
         raw_rules = BlocklistParser.parse_url(source_url)
 
         if not raw_rules:
             return None
 
-        self.load_simple_rules(raw_rules)
+        self.load_simple_rules(raw_rules, rule_index=rule_index)
 
         return raw_rules
 
-    def load_simple_rules(self, raw_rules):  # pragma: no cover
-        """Update the DB with a series of rules."""
+    def load_simple_rules(self, raw_rules, rule_index=False):  # pragma: no cover
+        """Update the DB with a series of rules.
+
+        :param raw_rules: A dict of domains to `Reason`s
+        :param rule_index: Keep the `RuleIndex` table up to date
+        """
 
         # Note: This currently has no way of removing things from the DB
         # Soon this won't matter as we won't be doing this any more
@@ -48,6 +52,9 @@ class CustomRules(HashedURLChecker):
                 for domain, reason in raw_rules.items()
             ],
         )
+        if rule_index:
+            RuleIndex.update(self._session, Source.BLOCK_LIST)
+        RuleVersion.bump(self._session)
 
     @staticmethod
     def value_from_domain(domain, reason):  # pragma: no cover
@@ -0,0 +1,196 @@
+"""A memory mapped file of rule hashes which can be shared between processes."""
+
+import heapq
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from tempfile import NamedTemporaryFile
+
+import sqlalchemy as sa
+
+from checkmate.checker.url.hash_index import HashIndex
+from checkmate.models import AllowRule, CustomRule, Reason, Source, URLHausRule
+
+
+class DigestFile:
+    """A sorted file of fixed width records which is searched in place.
+
+    The file is laid out as:
+
+     * A header with the `RuleVersion`, record count and label table size
+     * A JSON label table listing each combination of source and reasons
+     * Records of a 32 byte digest and a 1 byte index into the label table,
+       sorted by digest
+
+    As the file is memory mapped read-only, every process which opens it
+    shares a single copy via the OS page cache.
+    """
+
+    MAGIC = b"CMDIGST1"
+    DIGEST_SIZE = 32
+    RECORD_SIZE = DIGEST_SIZE + 1
+
+    _HEADER = struct.Struct("!8sQQI")
+
+    def __init__(self, path):
+        """Open and map a file written by `write()`.
+
+        :param path: The file to open
+        :raise ValueError: If this isn't a digest file
+        """
+        with open(path, "rb") as handle:
+            # The mapping stays valid after the file is closed, or even
+            # replaced by a newer version
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.version, self._count, labels_size = self._HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a digest file")
+
+        labels_end = self._HEADER.size + labels_size
+        self._labels = [
+            (Source(source), tuple(Reason(reason) for reason in reasons))
+            for source, reasons in json.loads(
+                self._mmap[self._HEADER.size : labels_end]
+            )
+        ]
+        self._records_start = labels_end
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        """Get the digest at a position, so we can use `bisect` on the file."""
+
+        start = self._records_start + position * self.RECORD_SIZE
+
+        return self._mmap[start : start + self.DIGEST_SIZE]
+
+    def labels(self, digest):
+        """Get the source and reasons of each rule with a given digest.
+
+        :param digest: The digest to look up
+        :return: A generator of (Source, tuple of Reasons) tuples
+        """
+        position = bisect_left(self, digest)
+
+        while position < self._count and self[position] == digest:
+            label_offset = (
+                self._records_start + position * self.RECORD_SIZE + self.DIGEST_SIZE
+            )
+            yield self._labels[self._mmap[label_offset]]
+            position += 1
+
+    def as_index(self):
+        """Get a `HashIndex` which reads from this file."""
+
+        return HashIndex(
+            self.version,
+            url_haus=_SourceView(self, Source.URL_HAUS),
+            block_list=_SourceView(self, Source.BLOCK_LIST),
+            allow_list=_SourceView(self, Source.ALLOW_LIST),
+        )
+
+    @classmethod
+    def write(cls, session, path, version):
+        """Write all of the rules in the DB to a file.
+
+        The file is written next to the destination and then renamed into
+        place, so anyone opening the file will see either the old version or
+        the new one.
+
+        :param session: DB session to read the rules with
+        :param path: The file to write
+        :param version: The `RuleVersion` the rules are at
+        :return: The number of records written
+        """
+        labels = {}
+
+        def label(source, reasons):
+            key = (source.value, tuple(reason.value for reason in reasons))
+            if key not in labels:
+                if len(labels) > 255:
+                    raise ValueError("Too many combinations of reasons to store")
+
+                labels[key] = len(labels)
+
+            return labels[key]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        with NamedTemporaryFile(dir=directory, delete=False) as handle:
+            try:
+                # We don't know how big the header will be until we've seen
+                # all of the rules, so write the records to a second file
+                # and then join them up
+                with NamedTemporaryFile(dir=directory) as records:
+                    count = 0
+                    for digest, source, reasons in _sorted_rules(session):
+                        records.write(digest)
+                        records.write(bytes((label(source, reasons),)))
+                        count += 1
+
+                    label_table = json.dumps(list(labels)).encode("utf-8")
+                    handle.write(
+                        cls._HEADER.pack(cls.MAGIC, version, count, len(label_table))
+                    )
+                    handle.write(label_table)
+
+                    records.seek(0)
+                    while chunk := records.read(1024 * 1024):
+                        handle.write(chunk)
+
+                handle.flush()
+                os.fsync(handle.fileno())
+                # Temporary files are only readable by us by default
+                os.chmod(handle.name, 0o644)
+            except BaseException:
+                os.unlink(handle.name)
+                raise
+
+        os.replace(handle.name, path)
+
+        return count
+
+
+def _sorted_rules(session):
+    """Get (digest, Source, reasons) for every rule, sorted by digest."""
+
+    def rows(source, model, reasons):
+        # The DB sorts digests byte by byte, just like Python
+        stmt = sa.select(model.hash_digest(), reasons).order_by(model.hash)
+
+        for digest, tags in session.execute(stmt.execution_options(yield_per=10000)):
+            yield (
+                digest,
+                source,
+                tuple(Reason.parse(tag) for tag in tags or ()),
+            )
+
+    return heapq.merge(
+        rows(Source.URL_HAUS, URLHausRule, sa.null()),
+        rows(Source.BLOCK_LIST, CustomRule, CustomRule.tags),
+        rows(Source.ALLOW_LIST, AllowRule, sa.null()),
+        key=lambda row: row[0],
+    )
+
+
+class _SourceView:
+    """The rules in a `DigestFile` from one source, as a read-only mapping."""
+
+    def __init__(self, digest_file, source):
+        self._digest_file = digest_file
+        self._source = source
+
+    def __contains__(self, digest):
+        return self.get(digest) is not None
+
+    def get(self, digest, default=None):
+        for source, reasons in self._digest_file.labels(digest):
+            if source == self._source:
+                return reasons
+
+        return default
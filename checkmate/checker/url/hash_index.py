@@ -0,0 +1,208 @@
+"""An in-memory copy of the rule hashes which can be checked without the DB."""
+
+import sqlalchemy as sa
+
+from checkmate.models import (
+    AllowRule,
+    CustomRule,
+    Reason,
+    RuleIndex,
+    Source,
+    URLHausRule,
+)
+
+
+class HashIndex:
+    """An immutable snapshot of the hashes from all of our rule tables.
+
+    Hashes are held as raw digests rather than hex strings, which halves the
+    memory required to hold them.
+    """
+
+    def __init__(self, version, url_haus, block_list, allow_list):
+        """Create a new index.
+
+        :param version: The `RuleVersion` this index was built from
+        :param url_haus: A set of URLHaus digests
+        :param block_list: A dict of custom rule digests to lists of Reasons
+        :param allow_list: A set of allow list digests
+        """
+        self.version = version
+        self._url_haus = url_haus
+        self._block_list = block_list
+        self._allow_list = allow_list
+
+        self.blocking_checkers = {
+            Source.URL_HAUS: _IndexedURLHaus(url_haus),
+            Source.BLOCK_LIST: _IndexedCustomRules(block_list),
+        }
+        self.allowing_checkers = {
+            Source.ALLOW_LIST: _IndexedAllowRules(allow_list),
+        }
+
+    @classmethod
+    def load(cls, session, version):
+        """Build a new index from the DB.
+
+        :param session: DB session to read the rules with
+        :param version: The `RuleVersion` the rules are at
+        """
+        url_haus = frozenset(
+            session.execute(sa.select(URLHausRule.hash_digest())).scalars()
+        )
+        block_list = {
+            digest: tuple(Reason.parse(tag) for tag in tags)
+            for digest, tags in session.execute(
+                sa.select(CustomRule.hash_digest(), CustomRule.tags)
+            )
+        }
+        allow_list = frozenset(
+            session.execute(sa.select(AllowRule.hash_digest())).scalars()
+        )
+
+        return cls(version, url_haus, block_list, allow_list)
+
+    @classmethod
+    def load_matching(cls, session, hex_hashes):
+        """Build an index of only the rules which match some hashes.
+
+        This reads matches from all of the rule tables in a single query, and
+        will give the same results as a full index for those hashes.
+
+        :param session: DB session to read the rules with
+        :param hex_hashes: List of URL hashes to find
+        """
+        return cls._from_rows(session.execute(_matching_rules(hex_hashes)))
+
+    @classmethod
+    def load_from_rule_index(cls, session, hex_hashes):
+        """Build an index of the rules which match some hashes from `RuleIndex`.
+
+        This finds matches from all of the sources with a single index scan.
+
+        :param session: DB session to read the rules with
+        :param hex_hashes: List of URL hashes to find
+        """
+        return cls._from_rows(
+            RuleIndex.find_matching_rows(
+                session, [RuleIndex.source, RuleIndex.hash, RuleIndex.tags], hex_hashes
+            )
+        )
+
+    @classmethod
+    def load_prefixes(cls, session, prefixes):
+        """Build an index of all the rules with hashes starting with prefixes.
+
+        :param session: DB session to read the rules with
+        :param prefixes: List of lower case hex prefixes
+        """
+        return cls._from_rows(session.execute(_prefix_rules(prefixes)))
+
+    def hashes(self):
+        """Get every digest in the index as a hex hash."""
+
+        return {
+            digest.hex()
+            for digests in (
+                self._url_haus,
+                self._block_list,
+                self._allow_list,
+            )
+            for digest in digests
+        }
+
+    @classmethod
+    def _from_rows(cls, rows):
+        url_haus, block_list, allow_list = set(), {}, set()
+        for source, hex_hash, tags in rows:
+            digest = bytes.fromhex(hex_hash)
+
+            if source == Source.URL_HAUS.value:
+                url_haus.add(digest)
+            elif source == Source.BLOCK_LIST.value:
+                block_list[digest] = tuple(Reason.parse(tag) for tag in tags)
+            else:
+                allow_list.add(digest)
+
+        return cls(None, url_haus, block_list, allow_list)
+
+
+def _select_rules(source, model, tags=sa.null()):
+    """Get a statement selecting (source, hash, tags) from a rule table."""
+
+    return sa.select(
+        sa.literal(source.value).label("source"),
+        model.hash,
+        sa.cast(tags, CustomRule.tags.type).label("tags"),
+    )
+
+
+def _matching_rules(hex_hashes):
+    """Get a statement selecting (source, hash, tags) for matching rules."""
+
+    return sa.union_all(
+        # The hashes can be for many URLs in a batch, so we need every match
+        _select_rules(Source.URL_HAUS, URLHausRule).where(
+            URLHausRule.hash_in(hex_hashes)
+        ),
+        _select_rules(Source.BLOCK_LIST, CustomRule, CustomRule.tags).where(
+            CustomRule.hash_in(hex_hashes)
+        ),
+        _select_rules(Source.ALLOW_LIST, AllowRule).where(
+            AllowRule.hash_in(hex_hashes)
+        ),
+    )
+
+
+def _prefix_rules(prefixes):
+    """Get a statement selecting (source, hash, tags) for rules with prefixes."""
+
+    return sa.union_all(
+        *(
+            _select_rules(source, model, *tags).where(
+                model.hash_prefix_condition(prefixes)
+            )
+            for source, model, tags in (
+                (Source.URL_HAUS, URLHausRule, ()),
+                (Source.BLOCK_LIST, CustomRule, (CustomRule.tags,)),
+                (Source.ALLOW_LIST, AllowRule, ()),
+            )
+        )
+    )
+
+
+def _digests(hex_hashes):
+    return [bytes.fromhex(hex_hash) for hex_hash in hex_hashes]
+
+
+class _IndexedURLHaus:
+    """An in-memory equivalent of the `URLHaus` checker."""
+
+    def __init__(self, digests):
+        self._digests = digests
+
+    def check_url(self, hex_hashes):
+        if any(digest in self._digests for digest in _digests(hex_hashes)):
+            yield Reason.MALICIOUS
+
+
+class _IndexedCustomRules:
+    """An in-memory equivalent of the `CustomRules` checker."""
+
+    def __init__(self, reasons_by_digest):
+        self._reasons_by_digest = reasons_by_digest
+
+    def check_url(self, hex_hashes):
+        for digest in _digests(hex_hashes):
+            yield from self._reasons_by_digest.get(digest, ())
+
+
+class _IndexedAllowRules:
+    """An in-memory equivalent of the `AllowRules` checker."""
+
+    def __init__(self, digests):
+        self._digests = digests
+
+    def check_url(self, hex_hashes):
+        if not any(digest in self._digests for digest in _digests(hex_hashes)):
+            yield Reason.NOT_ALLOWED
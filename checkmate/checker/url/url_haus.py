@@ -1,12 +1,31 @@
 """URLHaus (https://urlhaus.abuse.ch/) based checker."""
 
+from collections import deque
+from itertools import islice
 from tempfile import TemporaryDirectory
 
+import billiard
 from checkmatelib.url import hash_for_rule
 
-from checkmate.checker.pipeline import Download, Pipeline, ReadCSVFile, UnzipFile
+from checkmate.checker.pipeline import (
+    UNCHANGED,
+    Download,
+    Pipeline,
+    ReadCSVFile,
+    UnzipFile,
+)
 from checkmate.checker.url._hashed_url_checker import HashedURLChecker
-from checkmate.models import Reason, URLHausRule
+from checkmate.checker.url.cuckoo_filter import CuckooFilter
+from checkmate.exceptions import FilterFull
+from checkmate.models import (
+    DownloadValidator,
+    Reason,
+    RuleIndex,
+    RuleVersion,
+    Source,
+    URLHausFilter,
+    URLHausRule,
+)
 
 
 class URLHaus(HashedURLChecker):
@@ -19,18 +38,47 @@ class URLHaus(HashedURLChecker):
 
     INITIAL_FEED = Pipeline(
         [
-            Download("https://urlhaus.abuse.ch/downloads/csv/", timeout=30),
-            UnzipFile("csv.txt"),
+            # The zip has to be seekable, but everything else is read as it's
+            # needed, rather than being copied to disk first
+            Download(
+                "https://urlhaus.abuse.ch/downloads/csv/", timeout=30, stream=True
+            ),
+            UnzipFile("csv.txt", stream=True),
             ReadCSVFile(),
         ]
     )
 
-    UPDATE_FEED = Pipeline(
-        [
-            Download("https://urlhaus.abuse.ch/downloads/csv_recent/", timeout=30),
-            ReadCSVFile(),
-        ]
-    )
+    UPDATE_URL = "https://urlhaus.abuse.ch/downloads/csv_recent/"
+
+    HASH_CHUNK_SIZE = 5000
+    """The number of rows to send to each process at once when hashing."""
+
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        session,
+        url_haus_filter=None,
+        filter_settings=None,
+        hash_processes=1,
+        rule_index=False,
+    ):
+        """Create a new checking object.
+
+        :param session: A DB session to work in
+        :param url_haus_filter: A `CuckooFilter` of all of the URLHaus hashes.
+            URLs which aren't in it are passed without querying the DB.
+        :param filter_settings: A dict of `CuckooFilter` arguments. If
+            provided, a stored filter is kept up to date as the DB is updated.
+        :param hash_processes: The number of processes to hash rules in. With
+            more than one, rules are hashed in parallel in a process pool.
+        :param rule_index: Keep the `RuleIndex` table up to date as the DB is
+            updated
+        """
+        super().__init__(session)
+
+        self._filter = url_haus_filter
+        self._filter_settings = filter_settings
+        self._hash_processes = hash_processes
+        self._rule_index = rule_index
 
     def check_url(self, hex_hashes):
         """Check for reasons to block a URL based on it's hashes.
@@ -39,36 +87,249 @@ class URLHaus(HashedURLChecker):
         :returns: A generator of Reason objects
         """
 
+        # The filter never gives false negatives, so if none of the hashes
+        # are in it, they can't be in the DB either
+        if self._filter is not None and not any(
+            bytes.fromhex(hex_hash) in self._filter for hex_hash in hex_hashes
+        ):
+            return
+
         # All URLHaus rules are malicious, so there's no reason to find more
         # than one
-        hits = URLHausRule.find_matches(self._session, hex_hashes, limit=1)
-
-        if hits.count():
+        if URLHausRule.has_matches(self._session, hex_hashes):
             yield Reason.MALICIOUS
 
-    def reinitialize_db(self):
-        """Completely resynchronise the DB from scratch."""
+    def reinitialize_db(self, transaction_manager=None):
+        """Completely resynchronise the DB from scratch.
 
-        URLHausRule.delete_all(self._session)
-        return self._update(self.INITIAL_FEED)
+        :param transaction_manager: If provided, the rules are built in a new
+            table in one transaction, and swapped in with a second, short one.
+            Otherwise the old rules are deleted and replaced in whatever
+            transaction the session is in.
+        """
+        url_haus_filter = None
+        if self._filter_settings is not None:
+            url_haus_filter = CuckooFilter(**self._filter_settings)
+
+        if transaction_manager is None:
+            URLHausRule.delete_all(self._session)
+
+            return self._update(self.INITIAL_FEED, url_haus_filter, full_sync=True)
+
+        with transaction_manager:
+            synced, _, overflowed = self._load(
+                self.INITIAL_FEED,
+                url_haus_filter,
+                full_sync=True,
+                load=lambda values: URLHausRule.build_shadow(self._session, values),
+            )
+            if overflowed:
+                url_haus_filter = self._build_filter(URLHausRule.SHADOW_TABLE)
+
+        # Readers wait for the swap, so it's kept short. The filter is small,
+        # and is saved along with the rules it was built from, so readers
+        # never see one without the other.
+        with transaction_manager:
+            URLHausRule.swap_shadow(self._session)
+            if url_haus_filter is not None:
+                URLHausFilter.save(self._session, url_haus_filter.to_bytes())
+            RuleVersion.bump(self._session)
+
+        if self._rule_index:
+            # Rebuilding the index takes too long to hold readers up with, so
+            # it's rebuilt from the rules once they're live. Until then it
+            # still matches the old ones.
+            with transaction_manager:
+                RuleIndex.update(self._session, Source.URL_HAUS)
+                RuleVersion.bump(self._session)
+
+        return synced
 
     def update_db(self):
-        """Perform a partial update of the last 30 days of data."""
+        """Perform a partial update of the last 30 days of data.
+
+        :return: The number of rules synced, or `UNCHANGED` if the data
+            hasn't changed since the last update
+        """
+
+        url_haus_filter = None
+        if self._filter_settings is not None:
+            data = URLHausFilter.load(self._session)
+            url_haus_filter = (
+                CuckooFilter.from_bytes(data) if data else self._build_filter()
+            )
+
+        # The recent data is only updated every few minutes, so we ask for it
+        # only if it's changed since the last time we read it
+        download = Download(
+            self.UPDATE_URL,
+            timeout=30,
+            validators=DownloadValidator.load(self._session, self.UPDATE_URL),
+            stream=True,
+        )
+        synced = self._update(
+            Pipeline([download, ReadCSVFile()]), url_haus_filter, full_sync=False
+        )
+
+        if synced is not UNCHANGED:
+            # This is saved along with the rules, so if they aren't, we'll
+            # read this version again next time
+            DownloadValidator.save(self._session, self.UPDATE_URL, download.validators)
+
+        return synced
+
+    def _update(self, feed, url_haus_filter, full_sync):
+        loaded = self._load(
+            feed,
+            url_haus_filter,
+            full_sync,
+            # A full sync starts with an empty table, so every rule is new
+            load=lambda values: URLHausRule.sync(
+                self._session, values, find_added=not full_sync
+            ),
+        )
+        if loaded is UNCHANGED:
+            return UNCHANGED
+
+        (synced, added, replaced), hex_hashes, overflowed = loaded
+        if url_haus_filter is not None and not full_sync:
+            overflowed = self._update_filter(url_haus_filter, added, replaced)
+
+        self._finish(
+            url_haus_filter,
+            None if full_sync else hex_hashes.union(replaced),
+            overflowed,
+        )
+        RuleVersion.bump(self._session)
 
-        return self._update(self.UPDATE_FEED)
+        return synced
+
+    def _load(self, feed, url_haus_filter, full_sync, load):
+        overflowed = False
+        hex_hashes = set()
+
+        def collect_hashes(values):
+            for value in values:
+                hex_hashes.add(value["hash"])
+                yield value
+
+        def add_to_filter(values):
+            nonlocal overflowed
+
+            # Every rule in a full sync is new, so we can add them as we go
+            for value in values:
+                if not overflowed:
+                    try:
+                        url_haus_filter.add(bytes.fromhex(value["hash"]))
+                    except FilterFull:
+                        overflowed = True
+
+                yield value
 
-    def _update(self, feed):
         with TemporaryDirectory() as working_dir:
-            return URLHausRule.bulk_upsert(
-                session=self._session,
-                values=(self._value_from_row(row) for row in feed(working_dir)),
+            rows = feed(working_dir)
+            if rows is UNCHANGED:
+                return UNCHANGED
+
+            values = self._values_from_rows(rows)
+            if url_haus_filter is not None and full_sync:
+                values = add_to_filter(values)
+            if self._rule_index and not full_sync:
+                values = collect_hashes(values)
+
+            synced = load(values)
+
+        return synced, hex_hashes, overflowed
+
+    def _finish(self, url_haus_filter, hex_hashes, overflowed):
+        """Update everything we keep alongside the rules to match them."""
+
+        if self._rule_index:
+            # Rules are matched by their URLHaus id, so only the hashes we've
+            # seen, and those of any rules they replaced, can be affected
+            RuleIndex.update(self._session, Source.URL_HAUS, hex_hashes)
+
+        if overflowed:
+            url_haus_filter = self._build_filter()
+
+        if url_haus_filter is not None:
+            URLHausFilter.save(self._session, url_haus_filter.to_bytes())
+
+    @staticmethod
+    def _update_filter(url_haus_filter, added, replaced):
+        """Make the same changes to the filter as a partial sync made to the DB.
+
+        The filter holds an entry for every rule, even where they share a
+        hash or a fingerprint. So removing one only removes an entry which is
+        there for that rule, and never leaves out any which are still needed.
+
+        :return: True if the filter overflowed, and must be rebuilt
+        """
+        for hex_hash in replaced:
+            url_haus_filter.remove(bytes.fromhex(hex_hash))
+
+        try:
+            for hex_hash in added:
+                url_haus_filter.add(bytes.fromhex(hex_hash))
+        except FilterFull:
+            return True
+
+        return False
+
+    def _build_filter(self, table_name=None):
+        """Build a filter of all the hashes currently in the DB."""
+
+        hex_hashes = URLHausRule.all_hashes(self._session, table_name=table_name)
+
+        # Leave plenty of room to grow, so we don't have to do this often
+        url_haus_filter = CuckooFilter(
+            **{
+                **self._filter_settings,
+                "capacity": max(self._filter_settings["capacity"], 2 * len(hex_hashes)),
+            }
+        )
+        # One entry for every rule, as `_update_filter()` expects
+        for hex_hash in hex_hashes:
+            url_haus_filter.add(bytes.fromhex(hex_hash))
+
+        return url_haus_filter
+
+    def _values_from_rows(self, rows):
+        chunks = iter(lambda: list(islice(rows, self.HASH_CHUNK_SIZE)), [])
+
+        if self._hash_processes <= 1:
+            return (
+                value for chunk in chunks for value in self._values_from_chunk(chunk)
             )
 
-    def _value_from_row(self, row):
-        expanded_url, hex_hash = hash_for_rule(raw_url=row[self.COLUMN_URL])
+        return self._values_from_chunks_in_parallel(chunks)
+
+    def _values_from_chunks_in_parallel(self, chunks):
+        # Unlike `multiprocessing`, `billiard` can start processes from within
+        # Celery's worker processes
+        with billiard.Pool(self._hash_processes) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(self._values_from_chunk, (chunk,)))
+
+                # Keep every process busy, but don't read further ahead than
+                # that, so we only hold a few chunks in memory at once
+                if len(pending) > 2 * self._hash_processes:
+                    yield from pending.popleft().get()
+
+            while pending:
+                yield from pending.popleft().get()
+
+    @classmethod
+    def _values_from_chunk(cls, rows):
+        return [cls._value_from_row(row) for row in rows]
+
+    @classmethod
+    def _value_from_row(cls, row):
+        expanded_url, hex_hash = hash_for_rule(raw_url=row[cls.COLUMN_URL])
 
         return {
-            "id": row[self.COLUMN_ID],
+            "id": row[cls.COLUMN_ID],
             "rule": expanded_url,
             "hash": hex_hash,
         }
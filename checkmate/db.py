@@ -6,6 +6,9 @@ import sqlalchemy
 import zope.sqlalchemy
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from checkmate.db_pool import connect_args, pool_options
+from checkmate.db_replicas import ReplicaRouter
+
 LOG = logging.getLogger(__name__)
 
 NAMING_CONVENTIONS = {
@@ -43,14 +46,19 @@ Base = declarative_base(
 
 SESSION = sessionmaker()
 
+READ_ONLY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+"""Requests with these methods don't write, so can be sent to a replica."""
+
 
-def create_engine(database_url):  # pragma: no cover
-    return sqlalchemy.create_engine(database_url)
+def create_engine(database_url, **kwargs):  # pragma: no cover
+    return sqlalchemy.create_engine(database_url, **kwargs)
 
 
 def _session(request):  # pragma: no cover
     # This is set below in `includeme()`
-    engine = request.registry["database_engine"]
+    engine = request.registry["database_router"].engine(
+        read_only=request.method in READ_ONLY_METHODS
+    )
     session = SESSION(bind=engine)
 
     # If the request has a transaction manager, associate the session with it.
@@ -80,11 +88,27 @@ def _session(request):  # pragma: no cover
 def includeme(config):  # pragma: no cover
     """Pyramid config."""
 
+    settings = config.registry.settings
+    pool = pool_options(settings)
+    pool["connect_args"] = connect_args(settings)
+
     # Create the SQLAlchemy engine and save a reference in the app registry.
-    database_url = config.registry.settings["database_url"]
-    engine = create_engine(database_url)
+    database_url = settings["database_url"]
+    engine = create_engine(database_url, **pool)
     config.registry["database_engine"] = engine
 
+    # Read only requests can be sent to any replicas of the DB
+    config.registry["database_router"] = ReplicaRouter(
+        engine,
+        replicas=[
+            create_engine(url.strip(), **pool)
+            for url in settings.get("database_replica_url", "").split(",")
+            if url.strip()
+        ],
+        stale_after=float(settings.get("database_replica_stale_after", 5)),
+        health_check_interval=float(settings.get("database_replica_health_check", 10)),
+    )
+
     # Add a property to all requests for easy access to the session. This means
     # that view functions need only refer to ``request.db`` in order to
     # retrieve the current database session.
@@ -0,0 +1,122 @@
+"""A DB connection pool which records how long callers wait for connections."""
+
+import time
+from threading import Lock
+
+from pyramid.settings import asbool
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A `QueuePool` which keeps statistics about checkouts.
+
+    If requests are queueing for connections, the time spent waiting for
+    a checkout will climb well before the pool runs out and checkouts start
+    to fail.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._stats_lock = Lock()
+        self._checkouts = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception as err:
+            with self._stats_lock:
+                self._failures += 1
+                if isinstance(err, PoolTimeout):
+                    self._timeouts += 1
+            raise
+
+        wait = time.perf_counter() - start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+
+        # Keep counting from where we were, rather than starting again
+        with self._stats_lock:
+            pool._checkouts = self._checkouts
+            pool._failures = self._failures
+            pool._timeouts = self._timeouts
+            pool._wait_total = self._wait_total
+            pool._wait_max = self._wait_max
+
+        return pool
+
+    def metrics(self):
+        """Get the current state of the pool and the checkouts so far."""
+
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                # The pool counts connections it hasn't opened yet as
+                # negative overflow, but we only care about extra ones
+                "overflow": max(self.overflow(), 0),
+                "checkouts": self._checkouts,
+                "failures": self._failures,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+def pool_options(settings):
+    """Get the `create_engine()` pool arguments from the app settings.
+
+    :param settings: The Pyramid settings dict
+    """
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(settings.get("database_pool_size", 5)),
+        "max_overflow": int(settings.get("database_pool_max_overflow", 10)),
+        "pool_timeout": float(settings.get("database_pool_timeout", 30)),
+        "pool_recycle": int(settings.get("database_pool_recycle", -1)),
+        "pool_pre_ping": asbool(settings.get("database_pool_pre_ping", False)),
+    }
+
+
+def connect_args(settings, async_driver=False):
+    """Get the `create_engine()` connection arguments from the app settings.
+
+    Every query gets `check_statement_timeout` to run in, which is set as
+    each connection is made rather than before each check.
+
+    :param settings: The Pyramid settings dict
+    :param async_driver: Get the arguments for asyncpg rather than psycopg2
+    """
+    timeout = int(settings.get("check_statement_timeout", 0))
+    if not timeout:
+        return {}
+
+    if async_driver:
+        return {"server_settings": {"statement_timeout": str(timeout)}}
+
+    return {"options": f"-c statement_timeout={timeout}"}
+
+
+def pool_metrics(engine):
+    """Get metrics for an engine's pool, or None if it doesn't keep any.
+
+    :param engine: SQLAlchemy engine to get the metrics of
+    """
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        return engine.pool.metrics()
+
+    return None
@@ -0,0 +1,140 @@
+"""Spread read only DB traffic across replicas of the primary DB."""
+
+import os
+import time
+from itertools import count
+from logging import getLogger
+from threading import Event, Lock, Thread
+
+import sqlalchemy as sa
+
+from checkmate.db_pool import pool_metrics
+
+LOG = getLogger(__name__)
+
+
+class ReplicaRouter:
+    """Choose which engine each request should use.
+
+    Read only requests take turns between the replicas, skipping any which
+    failed their last health check. Everything else uses the primary.
+
+    Replicas lag a little behind the primary, so for a while after this
+    process writes anything reads go to the primary too. This means anyone
+    making a change sees it straight away, even before the replicas do.
+    """
+
+    _WROTE = "checkmate.wrote"
+    """The key we mark connections which have written something with."""
+
+    def __init__(
+        self, primary, replicas=(), stale_after=5.0, health_check_interval=10.0
+    ):
+        """Initialise the router.
+
+        :param primary: SQLAlchemy engine for the primary DB
+        :param replicas: List of SQLAlchemy engines for replicas of it
+        :param stale_after: Seconds after a write to keep reading from the
+            primary
+        :param health_check_interval: Seconds between replica health checks
+        """
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._stale_after = stale_after
+        self._health_check_interval = health_check_interval
+
+        # Assume the replicas are fine until we hear otherwise
+        self._healthy = set(self.replicas)
+        self._turn = count()
+        self._last_write = None
+
+        self._lock = Lock()
+        self._stop = Event()
+        self._pid = None
+
+        sa.event.listen(primary, "before_cursor_execute", self._on_execute)
+        sa.event.listen(primary, "commit", self._on_commit)
+        sa.event.listen(primary, "rollback", self._on_rollback)
+
+    def engine(self, read_only=False):
+        """Get the engine to use.
+
+        :param read_only: Whether the caller will only read from the DB
+        """
+        if not read_only or not self.replicas or self._recently_written():
+            return self.primary
+
+        self._ensure_checking()
+
+        healthy = [replica for replica in self.replicas if replica in self._healthy]
+        if not healthy:
+            return self.primary
+
+        return healthy[next(self._turn) % len(healthy)]
+
+    def check_health(self):
+        """Check we can reach each replica."""
+
+        healthy = set()
+        for replica in self.replicas:
+            try:
+                with replica.connect() as connection:
+                    connection.execute(sa.select(1))
+            except sa.exc.SQLAlchemyError:
+                LOG.warning("Replica %r failed its health check", replica.url)
+            else:
+                healthy.add(replica)
+
+        self._healthy = healthy
+
+    def metrics(self):
+        """Get metrics about the replicas."""
+
+        return {
+            "replicas": len(self.replicas),
+            "healthy": len(self._healthy),
+            "pools": [pool_metrics(replica) for replica in self.replicas],
+        }
+
+    def stop(self):
+        """Stop the background health checks."""
+
+        self._stop.set()
+
+    def _recently_written(self):
+        return (
+            self._last_write is not None
+            and time.monotonic() - self._last_write < self._stale_after
+        )
+
+    def _on_execute(  # pylint:disable=too-many-arguments
+        self, connection, _cursor, _statement, _parameters, context, _executemany
+    ):
+        if context.isinsert or context.isupdate or context.isdelete:
+            connection.info[self._WROTE] = True
+
+    def _on_commit(self, connection):
+        if connection.info.pop(self._WROTE, False):
+            self._last_write = time.monotonic()
+
+    def _on_rollback(self, connection):
+        connection.info.pop(self._WROTE, None)
+
+    def _ensure_checking(self):
+        # Threads don't survive forking, so if we've been forked into a new
+        # worker process we need to start another one
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            Thread(target=self._run, name="replica-health", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_health()
+            except Exception:  # pylint:disable=broad-except
+                LOG.exception("Could not check the replicas")
+
+            self._stop.wait(self._health_check_interval)
@@ -60,3 +60,15 @@ class StageException(Exception):
 
 class StageRetryableException(StageException):
     """A stage within a checker pipeline failed temporarily."""
+
+
+class SourceUnchanged(Exception):
+    """A source hasn't changed since the last time it was read."""
+
+
+class FilterFull(Exception):
+    """There is no room to add another item to a probabilistic filter."""
+
+
+class SlowLookup(Exception):
+    """A rule lookup would need to read more than just an index."""
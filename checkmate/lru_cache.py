@@ -0,0 +1,90 @@
+"""A bounded in-memory cache."""
+
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+
+
+class LRUCache:
+    """A thread safe cache which discards the least recently used items.
+
+    This keeps counts of how it's being used, so we can tell if it's sized
+    correctly.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        """Create an empty cache.
+
+        :param max_size: The most items to hold before discarding old ones
+        :param ttl: Seconds after which items expire, or None to keep them
+            until they are discarded
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._items = OrderedDict()
+        # Hold this to make several calls to the cache in one go
+        self.lock = RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        """Get an item from the cache.
+
+        :param key: The key to look up
+        :param default: The value to return if the key isn't present
+        """
+        with self.lock:
+            try:
+                value, expires = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires is not None and expires <= monotonic():
+                del self._items[key]
+                self.misses += 1
+                return default
+
+            self._items.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value):
+        """Add an item to the cache, discarding the oldest if we are full."""
+
+        expires = monotonic() + self.ttl if self.ttl is not None else None
+
+        with self.lock:
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove everything from the cache."""
+
+        with self.lock:
+            self._items.clear()
+
+    def metrics(self):
+        """Get a dict of statistics about this cache."""
+
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+        }
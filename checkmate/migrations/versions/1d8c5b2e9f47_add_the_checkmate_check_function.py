@@ -0,0 +1,82 @@
+"""Add the checkmate_check() function.
+
+Revision ID: 1d8c5b2e9f47
+Revises: e4f9a0c37b15
+Create Date: 2026-10-18 17:05:52.661930
+
+"""
+
+# pylint:disable=invalid-name,no-member
+from alembic import op
+
+revision = "1d8c5b2e9f47"
+down_revision = "e4f9a0c37b15"
+
+
+def upgrade():
+    # This is a copy of `CheckFunction.create_sql()` at the time of writing
+    op.execute(
+        """
+    CREATE OR REPLACE FUNCTION checkmate_check(
+        hashes TEXT[],
+        allow_all BOOLEAN DEFAULT FALSE,
+        fail_fast BOOLEAN DEFAULT TRUE,
+        ignore TEXT[] DEFAULT '{}'
+    )
+    RETURNS TABLE (source TEXT, reason TEXT)
+    LANGUAGE plpgsql STABLE
+    AS $$
+    DECLARE
+        digests BYTEA[];
+        tag TEXT;
+    BEGIN
+        digests := ARRAY(SELECT decode(value, 'hex') FROM unnest(hashes) AS value);
+
+        -- All URLHaus rules are malicious
+        IF EXISTS (
+            SELECT 1 FROM urlhaus_rule WHERE urlhaus_rule.hash = ANY(digests)
+        ) AND NOT 'malicious' = ANY(ignore) THEN
+            source := 'url_haus';
+            reason := 'malicious';
+            RETURN NEXT;
+
+            IF fail_fast THEN
+                RETURN;
+            END IF;
+        END IF;
+
+        FOR tag IN
+            SELECT unnest(custom_rule.tags)
+            FROM custom_rule
+            WHERE custom_rule.hash = ANY(digests)
+        LOOP
+            -- The same as `Reason.parse()`
+            reason := CASE
+                WHEN btrim(tag) IN ('malicious', 'publisher-blocked', 'media-video', 'media-audio', 'media-image', 'media-mixed', 'high-io', 'not-explicitly-allowed', 'other') THEN btrim(tag)
+                ELSE 'other'
+            END;
+            CONTINUE WHEN reason = ANY(ignore);
+
+            source := 'block_list';
+            RETURN NEXT;
+
+            IF fail_fast AND reason IN ('malicious') THEN
+                RETURN;
+            END IF;
+        END LOOP;
+
+        IF NOT allow_all AND NOT EXISTS (
+            SELECT 1 FROM allow_rule WHERE allow_rule.hash = ANY(digests)
+        ) AND NOT 'not-explicitly-allowed' = ANY(ignore) THEN
+            source := 'allow_list';
+            reason := 'not-explicitly-allowed';
+            RETURN NEXT;
+        END IF;
+    END;
+    $$
+    """
+    )
+
+
+def downgrade():
+    op.execute("DROP FUNCTION checkmate_check(TEXT[], BOOLEAN, BOOLEAN, TEXT[])")
@@ -0,0 +1,75 @@
+"""Partition the urlhaus_rule table by hash.
+
+Revision ID: 3c7e9a1f5b24
+Revises: 8a3f6d0c2b71
+Create Date: 2026-10-18 20:31:07.582914
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+
+revision = "3c7e9a1f5b24"
+down_revision = "8a3f6d0c2b71"
+
+# This is `URLHausRule.PARTITIONS` at the time of writing
+PARTITIONS = 8
+
+
+def upgrade():
+    # Tables can't be partitioned in place, so we copy the rules into a new
+    # partitioned table and swap it in
+    _rename("urlhaus_rule", "urlhaus_rule_old")
+
+    op.create_table(
+        "urlhaus_rule",
+        sa.Column("id", sa.Integer, nullable=False, autoincrement=False),
+        sa.Column("hash", sa.LargeBinary, nullable=False),
+        sa.Column("rule", sa.String, nullable=False),
+        sa.PrimaryKeyConstraint("hash", "id", name=op.f("pk__urlhaus_rule")),
+        postgresql_partition_by="HASH (hash)",
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE urlhaus_rule_p{remainder} PARTITION OF urlhaus_rule "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+
+    op.execute(
+        "INSERT INTO urlhaus_rule (id, hash, rule) "
+        "SELECT id, hash, rule FROM urlhaus_rule_old"
+    )
+    op.drop_table("urlhaus_rule_old")
+
+
+def downgrade():
+    _rename("urlhaus_rule", "urlhaus_rule_old")
+
+    op.create_table(
+        "urlhaus_rule",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("hash", sa.LargeBinary, nullable=False),
+        sa.Column("rule", sa.String, nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk__urlhaus_rule")),
+    )
+    op.create_index(op.f("ix__urlhaus_rule_hash"), "urlhaus_rule", ["hash"])
+
+    # Without the hash in the key, ids have to be unique again
+    op.execute(
+        "INSERT INTO urlhaus_rule (id, hash, rule) "
+        "SELECT DISTINCT ON (id) id, hash, rule FROM urlhaus_rule_old"
+    )
+    op.execute(
+        "SELECT setval('urlhaus_rule_id_seq', coalesce(max(id), 0) + 1, false) "
+        "FROM urlhaus_rule"
+    )
+    # Dropping the parent drops the partitions too
+    op.drop_table("urlhaus_rule_old")
+
+
+def _rename(table_name, new_name):
+    op.rename_table(table_name, new_name)
+    op.execute(
+        f"ALTER TABLE {new_name} RENAME CONSTRAINT pk__{table_name} TO pk__{new_name}"
+    )
@@ -0,0 +1,26 @@
+"""Add the rule_version table.
+
+Revision ID: 3f1d2c9a7b10
+Revises: 889971cce5bb
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+
+revision = "3f1d2c9a7b10"
+down_revision = "889971cce5bb"
+
+
+def upgrade():
+    op.create_table(
+        "rule_version",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("rule_version")
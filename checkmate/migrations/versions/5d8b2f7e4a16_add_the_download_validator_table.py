@@ -0,0 +1,27 @@
+"""Add the download_validator table.
+
+Revision ID: 5d8b2f7e4a16
+Revises: 3c7e9a1f5b24
+Create Date: 2026-10-18 22:14:39.106273
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+
+revision = "5d8b2f7e4a16"
+down_revision = "3c7e9a1f5b24"
+
+
+def upgrade():
+    op.create_table(
+        "download_validator",
+        sa.Column("url", sa.String, primary_key=True),
+        sa.Column("etag", sa.String, nullable=True),
+        sa.Column("last_modified", sa.String, nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("download_validator")
@@ -0,0 +1,27 @@
+"""Add the urlhaus_filter table.
+
+Revision ID: 6c2e8d4f1a93
+Revises: 3f1d2c9a7b10
+Create Date: 2026-10-18 11:02:17.530911
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+
+revision = "6c2e8d4f1a93"
+down_revision = "3f1d2c9a7b10"
+
+
+def upgrade():
+    op.create_table(
+        "urlhaus_filter",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("data", sa.LargeBinary, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("urlhaus_filter")
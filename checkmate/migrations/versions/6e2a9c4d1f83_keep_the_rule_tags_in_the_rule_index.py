@@ -0,0 +1,50 @@
+"""Keep the rule tags in the rule index.
+
+Revision ID: 6e2a9c4d1f83
+Revises: 5d8b2f7e4a16
+Create Date: 2026-10-18 21:34:09.512873
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import ARRAY
+
+revision = "6e2a9c4d1f83"
+down_revision = "5d8b2f7e4a16"
+
+
+def upgrade():
+    op.drop_constraint("pk__rule_index", "rule_index", type_="primary")
+    op.drop_column("rule_index", "reason_bits")
+    op.add_column("rule_index", sa.Column("tags", ARRAY(sa.String, dimensions=1)))
+
+    # Only custom rules have tags, and their hashes are unique
+    op.execute(
+        """
+        UPDATE rule_index SET tags = custom_rule.tags
+        FROM custom_rule
+        WHERE rule_index.source = 'block_list' AND rule_index.hash = custom_rule.hash
+        """
+    )
+
+    op.execute(
+        "ALTER TABLE rule_index ADD CONSTRAINT pk__rule_index "
+        "PRIMARY KEY (hash, source) INCLUDE (tags)"
+    )
+
+
+def downgrade():
+    op.drop_constraint("pk__rule_index", "rule_index", type_="primary")
+    op.drop_column("rule_index", "tags")
+    # The reasons can't be worked out here, so run the `rebuild_rule_index`
+    # task after downgrading to fill them in again
+    op.add_column(
+        "rule_index",
+        sa.Column("reason_bits", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.execute(
+        "ALTER TABLE rule_index ADD CONSTRAINT pk__rule_index "
+        "PRIMARY KEY (hash, source) INCLUDE (reason_bits)"
+    )
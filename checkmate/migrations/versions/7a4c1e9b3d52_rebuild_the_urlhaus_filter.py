@@ -0,0 +1,25 @@
+"""Rebuild the URLHaus filter with an entry for every rule.
+
+Revision ID: 7a4c1e9b3d52
+Revises: 6e2a9c4d1f83
+Create Date: 2026-10-18 23:14:36.207158
+
+"""
+
+# pylint:disable=invalid-name,no-member
+from alembic import op
+
+revision = "7a4c1e9b3d52"
+down_revision = "6e2a9c4d1f83"
+
+
+def upgrade():
+    # The stored filter had one entry for each distinct fingerprint, so
+    # removing rules from it could remove entries other rules still need.
+    # Without it, the next URLHaus sync builds a new one from the rules.
+    op.execute("DELETE FROM urlhaus_filter")
+
+
+def downgrade():
+    # A filter with an entry for every rule works just as well as before
+    pass
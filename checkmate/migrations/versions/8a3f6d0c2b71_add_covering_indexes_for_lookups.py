@@ -0,0 +1,38 @@
+"""Add covering indexes for rule lookups.
+
+Revision ID: 8a3f6d0c2b71
+Revises: 1d8c5b2e9f47
+Create Date: 2026-10-18 18:12:41.307215
+
+"""
+
+# pylint:disable=invalid-name,no-member
+from alembic import op
+
+revision = "8a3f6d0c2b71"
+down_revision = "1d8c5b2e9f47"
+
+
+def upgrade():
+    op.drop_index("ix__custom_rule_hash", table_name="custom_rule")
+    op.create_index(
+        "ix__custom_rule_hash",
+        "custom_rule",
+        ["hash"],
+        unique=True,
+        postgresql_include=["tags"],
+    )
+
+    op.drop_constraint("pk__rule_index", "rule_index", type_="primary")
+    op.execute(
+        "ALTER TABLE rule_index ADD CONSTRAINT pk__rule_index "
+        "PRIMARY KEY (hash, source) INCLUDE (reason_bits)"
+    )
+
+
+def downgrade():
+    op.drop_constraint("pk__rule_index", "rule_index", type_="primary")
+    op.create_primary_key("pk__rule_index", "rule_index", ["hash", "source"])
+
+    op.drop_index("ix__custom_rule_hash", table_name="custom_rule")
+    op.create_index("ix__custom_rule_hash", "custom_rule", ["hash"], unique=True)
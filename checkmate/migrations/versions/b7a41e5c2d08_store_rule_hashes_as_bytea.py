@@ -0,0 +1,31 @@
+"""Store rule hashes as bytea.
+
+Revision ID: b7a41e5c2d08
+Revises: 6c2e8d4f1a93
+Create Date: 2026-10-18 14:21:05.402117
+
+"""
+
+# pylint:disable=invalid-name,no-member
+from alembic import op
+
+revision = "b7a41e5c2d08"
+down_revision = "6c2e8d4f1a93"
+
+TABLES = ["urlhaus_rule", "custom_rule", "allow_rule"]
+
+
+def upgrade():
+    # Changing the type rebuilds the indexes on the column as well
+    for table in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN hash TYPE bytea USING decode(hash, 'hex')"
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(
+            f'ALTER TABLE {table} ALTER COLUMN hash TYPE varchar COLLATE "C" '
+            "USING encode(hash, 'hex')"
+        )
@@ -0,0 +1,31 @@
+"""Add the rule_index table.
+
+Revision ID: e4f9a0c37b15
+Revises: b7a41e5c2d08
+Create Date: 2026-10-18 15:47:30.218764
+
+"""
+
+# pylint:disable=invalid-name,no-member
+import sqlalchemy as sa
+from alembic import op
+
+revision = "e4f9a0c37b15"
+down_revision = "b7a41e5c2d08"
+
+
+def upgrade():
+    op.create_table(
+        "rule_index",
+        sa.Column("hash", sa.LargeBinary, nullable=False),
+        sa.Column("source", sa.String, nullable=False),
+        sa.Column("reason_bits", sa.Integer, nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("hash", "source", name=op.f("pk__rule_index")),
+    )
+
+    # The index starts empty. Fill it with the `rebuild_rule_index` task
+    # rather than holding a long lock on the rule tables here
+
+
+def downgrade():
+    op.drop_table("rule_index")
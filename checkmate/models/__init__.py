@@ -2,7 +2,12 @@
 
 from checkmate.models.blocked_for import BlockedFor
 from checkmate.models.db.allow_rule import AllowRule
+from checkmate.models.db.check_function import CheckFunction
 from checkmate.models.db.custom_rule import CustomRule
+from checkmate.models.db.download_validator import DownloadValidator
+from checkmate.models.db.rule_index import RuleIndex
+from checkmate.models.db.rule_version import RuleVersion
+from checkmate.models.db.url_haus_filter import URLHausFilter
 from checkmate.models.db.url_haus_rule import URLHausRule
 from checkmate.models.detection import Detection
 from checkmate.models.reason import Reason, Severity
@@ -0,0 +1,142 @@
+"""A function in the DB which checks URL hashes against all of the rules."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from checkmate.db import Base
+from checkmate.models.detection import Detection
+from checkmate.models.reason import Reason, Severity
+from checkmate.models.source import Source
+
+
+class CheckFunction:
+    """The `checkmate_check()` SQL function.
+
+    This does the same thing as `URLCheckerService`, in the same order and
+    with the same fail fast and ignore logic, but in a single call to the DB.
+    As it's in the DB, anything else with access to it can use it too:
+
+        SELECT * FROM checkmate_check(
+            ARRAY['<hex hash>', ...], allow_all, fail_fast, ARRAY['<reason>', ...]
+        );
+
+    It returns a (source, reason) row for each detection, in the order they
+    were found.
+    """
+
+    NAME = "checkmate_check"
+
+    @classmethod
+    def check(  # pylint:disable=too-many-arguments
+        cls, session, hex_hashes, allow_all=False, fail_fast=True, ignore_reasons=()
+    ):
+        """Call the function.
+
+        :param session: DB session to execute within
+        :param hex_hashes: List of URL hashes to check
+        :param allow_all: Disable the allow list protection
+        :param fail_fast: Stop at the first mandatory reason we get
+        :param ignore_reasons: Ignore these Reasons
+        :returns: A list of Detection objects in the order they were found
+        """
+        text_array = ARRAY(sa.Text)
+        function = getattr(sa.func, cls.NAME)(
+            sa.bindparam("hashes", list(hex_hashes), type_=text_array),
+            sa.bindparam("allow_all", bool(allow_all), type_=sa.Boolean),
+            sa.bindparam("fail_fast", bool(fail_fast), type_=sa.Boolean),
+            sa.bindparam(
+                "ignore",
+                [reason.value for reason in ignore_reasons],
+                type_=text_array,
+            ),
+        ).table_valued("source", "reason")
+
+        return [
+            Detection(Reason(reason), Source(source))
+            for source, reason in session.execute(
+                sa.select(function.c.source, function.c.reason)
+            )
+        ]
+
+    @classmethod
+    def create_sql(cls):
+        """Get the SQL to create (or replace) the function."""
+
+        reasons = ", ".join(f"'{reason.value}'" for reason in Reason)
+        mandatory = ", ".join(
+            f"'{reason.value}'"
+            for reason in Reason
+            if reason.severity == Severity.MANDATORY
+        )
+
+        return f"""
+            CREATE OR REPLACE FUNCTION {cls.NAME}(
+                hashes TEXT[],
+                allow_all BOOLEAN DEFAULT FALSE,
+                fail_fast BOOLEAN DEFAULT TRUE,
+                ignore TEXT[] DEFAULT '{{}}'
+            )
+            RETURNS TABLE (source TEXT, reason TEXT)
+            LANGUAGE plpgsql STABLE
+            AS $$
+            DECLARE
+                digests BYTEA[];
+                tag TEXT;
+            BEGIN
+                digests := ARRAY(SELECT decode(value, 'hex') FROM unnest(hashes) AS value);
+
+                -- All URLHaus rules are malicious
+                IF EXISTS (
+                    SELECT 1 FROM urlhaus_rule WHERE urlhaus_rule.hash = ANY(digests)
+                ) AND NOT '{Reason.MALICIOUS.value}' = ANY(ignore) THEN
+                    source := '{Source.URL_HAUS.value}';
+                    reason := '{Reason.MALICIOUS.value}';
+                    RETURN NEXT;
+
+                    IF fail_fast THEN
+                        RETURN;
+                    END IF;
+                END IF;
+
+                FOR tag IN
+                    SELECT unnest(custom_rule.tags)
+                    FROM custom_rule
+                    WHERE custom_rule.hash = ANY(digests)
+                LOOP
+                    -- The same as `Reason.parse()`
+                    reason := CASE
+                        WHEN btrim(tag) IN ({reasons}) THEN btrim(tag)
+                        ELSE '{Reason.OTHER.value}'
+                    END;
+                    CONTINUE WHEN reason = ANY(ignore);
+
+                    source := '{Source.BLOCK_LIST.value}';
+                    RETURN NEXT;
+
+                    IF fail_fast AND reason IN ({mandatory}) THEN
+                        RETURN;
+                    END IF;
+                END LOOP;
+
+                IF NOT allow_all AND NOT EXISTS (
+                    SELECT 1 FROM allow_rule WHERE allow_rule.hash = ANY(digests)
+                ) AND NOT '{Reason.NOT_ALLOWED.value}' = ANY(ignore) THEN
+                    source := '{Source.ALLOW_LIST.value}';
+                    reason := '{Reason.NOT_ALLOWED.value}';
+                    RETURN NEXT;
+                END IF;
+            END;
+            $$
+        """
+
+    @classmethod
+    def drop_sql(cls):
+        """Get the SQL to remove the function."""
+
+        return f"DROP FUNCTION IF EXISTS {cls.NAME}(TEXT[], BOOLEAN, BOOLEAN, TEXT[])"
+
+
+# Install the function along with the tables when creating the DB from the
+# models, rather than from the migrations
+sa.event.listen(Base.metadata, "after_create", sa.DDL(CheckFunction.create_sql()))
+sa.event.listen(Base.metadata, "before_drop", sa.DDL(CheckFunction.drop_sql()))
@@ -15,10 +15,16 @@ class CustomRule(Base, HashMatchMixin, BulkUpsertMixin):
     BULK_UPSERT_UPDATE_ELEMENTS = ["hash", "tags"]
 
     __tablename__ = "custom_rule"
+    __table_args__ = (
+        # Including the tags lets lookups be answered from the index alone
+        sa.Index(
+            "ix__custom_rule_hash", "hash", unique=True, postgresql_include=["tags"]
+        ),
+    )
 
     id = sa.Column(sa.Integer, autoincrement=True, primary_key=True)
 
-    hash = HashMatchMixin.hash_column(unique=True)
+    hash = HashMatchMixin.hash_column(index=False)
     """A hash for quick comparison."""
 
     # While our hashes should be unique, we might change our mind about how
@@ -0,0 +1,73 @@
+"""Model for remembering what we last downloaded from a URL."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from zope.sqlalchemy import mark_changed
+
+from checkmate.db import Base
+
+
+class DownloadValidator(Base):
+    """The `ETag` and `Last-Modified` headers of the last download of a URL.
+
+    Sending these back with the next request lets the server tell us the file
+    hasn't changed, rather than sending all of it again.
+    """
+
+    __tablename__ = "download_validator"
+
+    url = sa.Column(sa.String, primary_key=True)
+
+    etag = sa.Column(sa.String, nullable=True)
+    """The `ETag` header of the last download."""
+
+    last_modified = sa.Column(sa.String, nullable=True)
+    """The `Last-Modified` header of the last download."""
+
+    @classmethod
+    def load(cls, session, url):
+        """Get the headers of the last download of a URL.
+
+        :param session: DB session to execute within
+        :param url: The URL to get the headers for
+        :return: A dict of header names to values, which is empty if we've
+            never downloaded the URL
+        """
+        row = session.execute(
+            sa.select(cls.etag, cls.last_modified).where(cls.url == url)
+        ).one_or_none()
+        if row is None:
+            return {}
+
+        return {
+            header: value
+            for header, value in (
+                ("ETag", row.etag),
+                ("Last-Modified", row.last_modified),
+            )
+            if value is not None
+        }
+
+    @classmethod
+    def save(cls, session, url, headers):
+        """Replace the headers of the last download of a URL.
+
+        :param session: DB session to execute within
+        :param url: The URL which was downloaded
+        :param headers: A dict of header names to values
+        """
+        stmt = insert(cls).values(
+            url=url,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["url"],
+            set_={
+                "etag": stmt.excluded.etag,
+                "last_modified": stmt.excluded.last_modified,
+            },
+        )
+
+        session.execute(stmt)
+        mark_changed(session)
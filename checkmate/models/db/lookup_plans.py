@@ -0,0 +1,104 @@
+"""Check the DB can answer our rule lookups from its indexes alone."""
+
+from functools import partial
+
+import sqlalchemy as sa
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from checkmate.exceptions import SlowLookup
+from checkmate.models.db.allow_rule import AllowRule
+from checkmate.models.db.custom_rule import CustomRule
+from checkmate.models.db.rule_index import RuleIndex
+from checkmate.models.db.url_haus_rule import URLHausRule
+
+LOOKUPS = {
+    "url_haus": URLHausRule.exists_statement,
+    "block_list": partial(CustomRule.matching_statement, CustomRule.tags),
+    "allow_list": AllowRule.exists_statement,
+    "rule_index": partial(
+        RuleIndex.matching_statement,
+        RuleIndex.source,
+        RuleIndex.hash,
+        RuleIndex.tags,
+    ),
+}
+"""The statements used to check URLs, which must only read indexes."""
+
+INDEX_ONLY_SCAN = "Index Only Scan"
+
+
+class _Explain(Executable, ClauseElement):
+    """An `EXPLAIN` of another statement."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kwargs):
+    sql = "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+    # The result is the plan, not the columns of the statement, so don't try
+    # to convert it like one
+    compiler._result_columns = []  # pylint:disable=protected-access
+
+    return sql
+
+
+def find_scans(session, hex_hashes=("00" * 32,)):
+    """Get the way the DB plans to read each table for each lookup.
+
+    The tables may be too small for the DB to bother with an index, so this
+    asks it to avoid other scans where it can. If it still can't answer the
+    lookup from an index, it will have to visit the table.
+
+    :param session: DB session to execute within
+    :param hex_hashes: The hashes to plan the lookups for
+    :return: A dict of lookup names to lists of (table, scan type) tuples
+    """
+    session.execute(sa.text("SET LOCAL enable_seqscan = off"))
+    session.execute(sa.text("SET LOCAL enable_bitmapscan = off"))
+
+    scans = {}
+    for name, statement in LOOKUPS.items():
+        plan = session.execute(
+            _Explain(statement()), {"hex_hashes": list(hex_hashes)}
+        ).scalar()
+        scans[name] = list(_scans(plan[0]["Plan"]))
+
+    return scans
+
+
+def verify_lookup_plans(session, scans=None):
+    """Check every lookup can be answered by an index only scan.
+
+    Index only scans don't need to read the table, which keeps lookups fast
+    even when the table isn't in memory, like after a URLHaus re-sync.
+
+    :param session: DB session to execute within
+    :param scans: The result of `find_scans()`, if you already have it
+    :raise SlowLookup: If any lookups need to read a table
+    """
+    if scans is None:
+        scans = find_scans(session)
+
+    problems = [
+        f"{name} reads {table} using {scan_type}"
+        for name, lookup_scans in scans.items()
+        for table, scan_type in lookup_scans
+        if scan_type != INDEX_ONLY_SCAN
+    ]
+
+    if problems:
+        raise SlowLookup("; ".join(problems))
+
+
+def _scans(plan):
+    if "Relation Name" in plan:
+        yield plan["Relation Name"], plan["Node Type"]
+
+    for child in plan.get("Plans", ()):
+        yield from _scans(child)
@@ -1,9 +1,14 @@
 """Mixins to enhance model objects."""
 
+from functools import cache
+from itertools import chain
+
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from zope.sqlalchemy import mark_changed
 
+from checkmate.models.db.types import HexDigest
+
 
 class HashMatchMixin:
     """A mixin for models which want to support hash based URL comparisons.
@@ -12,17 +17,46 @@ class HashMatchMixin:
         hash = HashMatchMixin.hash_column()
     """
 
+    HASH_PARTITIONED = False
+    """Whether the table is partitioned by hash, which changes our lookups.
+
+    Lookups normally send the hashes as a single array, so the SQL is the
+    same however many there are, and the DB can reuse its plan for it. When
+    the DB reuses a plan for a partitioned table it reads every partition, so
+    for those each hash is sent as its own parameter instead. The DB can then
+    skip partitions which can't hold any of them, at the cost of different
+    SQL for each number of hashes.
+    """
+
     @staticmethod
-    def hash_column(unique=False):
-        """Return a column suitable for hashing which you must call "hash"."""
-
-        # The C collation here allows the B-Tree default indexing type to be
-        # used for prefix matching. This makes searching for 'ab2d23d45a%'
-        # very quick: https://www.postgresql.org/docs/11/indexes-types.html
-        return sa.Column(
-            sa.String(collation="C"), nullable=False, index=True, unique=unique
+    def hash_column(unique=False, index=True):
+        """Return a column suitable for hashing which you must call "hash".
+
+        The column holds raw digests, but is read and written as hex strings.
+
+        :param unique: Make the index on the column unique
+        :param index: Index the column. Turn this off to add your own index,
+            for example one which includes other columns.
+        """
+        return sa.Column(HexDigest, nullable=False, index=index, unique=unique)
+
+    @classmethod
+    def table_named(cls, table_name):
+        """Get another table with the same columns, like a copy of this one.
+
+        :param table_name: The name of the other table
+        """
+        return sa.table(
+            table_name,
+            *(sa.column(column.name, column.type) for column in cls.__table__.columns),
         )
 
+    @classmethod
+    def hash_digest(cls):
+        """Get the hash column as raw digests, skipping the conversion to hex."""
+
+        return sa.type_coerce(cls.hash, sa.LargeBinary).label("hash")
+
     @classmethod
     def find_matches(cls, session, hex_hashes, limit=None):
         """Find matching rules for the specified hashes.
@@ -33,13 +67,124 @@ class HashMatchMixin:
         :return: Iterable of matching CustomRule objects
         """
 
-        query = session.query(cls).filter(cls.hash.in_(hex_hashes))
+        query = session.query(cls).filter(cls.hash_in(hex_hashes))
 
         if limit:
             query = query.limit(limit)
 
         return query
 
+    @classmethod
+    def has_matches(cls, session, hex_hashes):
+        """Check if any rules match the specified hashes.
+
+        :param session: DB session to execute within
+        :param hex_hashes: List of URL hashes to find
+        """
+        return (
+            session.execute(
+                cls.exists_statement(), {"hex_hashes": list(hex_hashes)}
+            ).first()
+            is not None
+        )
+
+    @classmethod
+    def find_matching_rows(cls, session, columns, hex_hashes):
+        """Get some columns for each rule matching the hashes.
+
+        This reads just the columns we need, rather than loading whole rows
+        into model objects.
+
+        :param session: DB session to execute within
+        :param columns: List of columns to read
+        :param hex_hashes: List of URL hashes to find
+        :return: Iterable of rows
+        """
+        return session.execute(
+            cls.matching_statement(*columns), {"hex_hashes": list(hex_hashes)}
+        )
+
+    @classmethod
+    def find_matching_values(cls, session, column, hex_hashes):
+        """Get the value of a column for each rule matching the hashes.
+
+        :param session: DB session to execute within
+        :param column: The column to read
+        :param hex_hashes: List of URL hashes to find
+        :return: Iterable of values
+        """
+        return cls.find_matching_rows(session, [column], hex_hashes).scalars()
+
+    @classmethod
+    def hash_in(cls, hex_hashes):
+        """Get a condition matching any of the given hashes.
+
+        The hashes are sent as a single array, unless the table is
+        `HASH_PARTITIONED`, when they are sent as a parameter each.
+
+        :param hex_hashes: List of URL hashes to find
+        """
+        return cls._hashes_condition(value=list(hex_hashes), unique=True)
+
+    # These statements are used for every check, so we build them once and
+    # pass the hashes in when executing them. Unless the table is
+    # `HASH_PARTITIONED`, the SQL is the same for any number of hashes too.
+
+    @classmethod
+    @cache
+    def exists_statement(cls):
+        """Get a statement which finds whether any rules match `:hex_hashes`."""
+
+        # Selecting a column from the model, rather than using `EXISTS`,
+        # lets the ORM know to flush any pending rules first
+        return sa.select(cls.hash).where(cls._hashes_condition()).limit(1)
+
+    @classmethod
+    @cache
+    def matching_statement(cls, *columns):
+        """Get a statement reading columns of the rules matching `:hex_hashes`."""
+
+        return sa.select(*columns).where(cls._hashes_condition())
+
+    @classmethod
+    def _hashes_condition(cls, **kwargs):
+        """Get a condition matching any of the hashes in `:hex_hashes`.
+
+        :param kwargs: Any other arguments for the bind parameter
+        """
+        if cls.HASH_PARTITIONED:
+            return cls.hash.in_(
+                sa.bindparam("hex_hashes", type_=HexDigest, expanding=True, **kwargs)
+            )
+
+        return cls.hash == sa.any_(
+            sa.bindparam("hex_hashes", type_=_HASH_ARRAY, **kwargs)
+        )
+
+    @classmethod
+    def hash_prefix_condition(cls, prefixes):
+        """Get a condition matching hashes which start with any of the prefixes.
+
+        This is written as a range for each prefix, which the B-Tree index on
+        the hash can answer with a short scan.
+
+        :param prefixes: List of lower case hex prefixes
+        """
+        # Digests are all the same length, so every hash starting with the
+        # prefix lies between the prefix padded with the lowest and highest
+        # hex digits. This also works for prefixes of half a byte
+        length = HexDigest.DIGEST_SIZE * 2
+
+        return sa.or_(
+            *(
+                cls.hash.between(prefix.ljust(length, "0"), prefix.ljust(length, "f"))
+                for prefix in prefixes
+            )
+        )
+
+
+_HASH_ARRAY = ARRAY(HexDigest)
+
 
 class BulkUpsertMixin:
     """A mixin for models that want to support bulk upserting."""
@@ -53,6 +198,13 @@ class BulkUpsertMixin:
     BLOCK_SIZE = 1000
     """Numer of elements to attempt to update in one go."""
 
+    BULK_UPSERT_WITH_COPY = False
+    """Stream the rows into a staging table with `COPY` and merge them in one go.
+
+    This is much faster than a statement for each block for large numbers of
+    rows, but only works with psycopg2 and columns of scalar values.
+    """
+
     @classmethod
     def bulk_upsert(cls, session, values):
         """Create or update a number of rows at once.
@@ -71,6 +223,14 @@ class BulkUpsertMixin:
                 "You must provide the correct elements for this mixin to work"
             )
 
+        if cls.BULK_UPSERT_WITH_COPY:
+            return cls._copy_upsert(
+                session,
+                values,
+                index_elements=cls.BULK_UPSERT_INDEX_ELEMENTS,
+                update_elements=cls.BULK_UPSERT_UPDATE_ELEMENTS,
+            )
+
         total_items = 0
         for block in cls._chunk(values):
             total_items += len(block)
@@ -117,3 +277,177 @@ class BulkUpsertMixin:
         # never commit the transaction we are working on and it will get rolled
         # back
         mark_changed(session)
+
+    @classmethod
+    def bulk_load(cls, session, values, table_name):
+        """Load a number of rows into an empty copy of this table.
+
+        This always streams the rows in with `COPY`, so the table doesn't
+        need any indexes until they've all been loaded. As with
+        `bulk_upsert()`, only the last of any values with the same key are
+        kept.
+
+        :param session: DB session to execute within
+        :param values: An iterable of dicts of columns to insert
+        :param table_name: The table to load into, with the same columns as
+            this one
+        """
+        staged = cls._copy_to_staging(session, values)
+        if staged is None:
+            return 0
+
+        staging, columns, rows = staged
+        table = sa.table(table_name, *(sa.column(column) for column in columns))
+        session.execute(
+            sa.insert(table).from_select(
+                columns,
+                cls._latest(staging, columns, cls.BULK_UPSERT_INDEX_ELEMENTS),
+            )
+        )
+        session.execute(sa.text(f"DROP TABLE {staging.name}"))
+
+        mark_changed(session)
+
+        return rows
+
+    @classmethod
+    def _copy_upsert(cls, session, values, index_elements, update_elements):
+        staged = cls._copy_to_staging(session, values)
+        if staged is None:
+            return 0
+
+        staging, columns, rows = staged
+        stmt = insert(cls).from_select(
+            columns, cls._latest(staging, columns, index_elements)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                element: getattr(stmt.excluded, element) for element in update_elements
+            },
+        )
+        session.execute(stmt)
+        session.execute(sa.text(f"DROP TABLE {staging.name}"))
+
+        mark_changed(session)
+
+        return rows
+
+    @classmethod
+    def _copy_to_staging(cls, session, values):
+        """Stream values into a temporary table with `COPY`.
+
+        :return: A tuple of the staging table, the columns copied and the
+            number of rows, or None if there were no values
+        """
+        values = iter(values)
+        first = next(values, None)
+        if first is None:
+            return None
+
+        columns = list(first)
+        staging_name = f"{cls.__tablename__}_staging"
+        preparer = session.get_bind().dialect.identifier_preparer
+
+        # Temporary tables aren't written to the WAL, and only we can see it.
+        # The position lets us keep the last of any rows with the same key,
+        # like separate statements would.
+        session.execute(
+            sa.text(
+                f"CREATE TEMPORARY TABLE {staging_name} "
+                f"(LIKE {preparer.quote(cls.__tablename__)}, _position BIGSERIAL)"
+            )
+        )
+
+        stream = _CSVStream(
+            [cls.__table__.c[column] for column in columns],
+            chain([first], values),
+            session.get_bind().dialect,
+        )
+        with session.connection().connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {staging_name} "
+                f"({', '.join(preparer.quote(column) for column in columns)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                stream,
+                size=_CSVStream.CHUNK_SIZE,
+            )
+
+        staging = sa.table(
+            staging_name, *(sa.column(column) for column in [*columns, "_position"])
+        )
+
+        return staging, columns, stream.rows
+
+    @staticmethod
+    def _latest(staging, columns, index_elements):
+        """Select the last row staged for each key."""
+
+        return (
+            sa.select(*(staging.c[column] for column in columns))
+            .distinct(*(staging.c[element] for element in index_elements))
+            .order_by(
+                *(staging.c[element] for element in index_elements),
+                staging.c._position.desc(),
+            )
+        )
+
+
+class _CSVStream:
+    """A file-like object of rows as CSV, to pass to `COPY ... FROM STDIN`.
+
+    Rows are only read from the iterable as they're needed, so they don't all
+    have to be held in memory at once.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    """How much `COPY` reads at a time."""
+
+    def __init__(self, columns, rows, dialect):
+        """Initialise the stream.
+
+        :param columns: List of the columns in each row
+        :param rows: Iterable of dicts of column names to values
+        :param dialect: The SQLAlchemy dialect to convert values with
+        """
+        self._columns = [(column.name, column.type) for column in columns]
+        self._dialect = dialect
+        self._rows = rows
+        self._buffer = ""
+
+        self.rows = 0
+        """The number of rows read so far."""
+
+    def read(self, size):
+        while len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+
+            self._buffer += self._line(row)
+            self.rows += 1
+
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+
+        return chunk
+
+    def _line(self, row):
+        return (
+            ",".join(self._field(row[name], type_) for name, type_ in self._columns)
+            + "\n"
+        )
+
+    def _field(self, value, type_):
+        # We only want our own conversions, like hex to bytes, rather than the
+        # DB driver's, which are for putting values in SQL
+        if isinstance(type_, sa.types.TypeDecorator):
+            value = type_.process_bind_param(value, self._dialect)
+
+        # Unquoted empty fields are NULL, so we quote everything else
+        if value is None:
+            return ""
+
+        if isinstance(value, (bytes, memoryview)):
+            value = "\\x" + bytes(value).hex()
+
+        return '"' + str(value).replace('"', '""') + '"'
@@ -0,0 +1,116 @@
+"""Model for a combined index of all of the rule tables."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+from zope.sqlalchemy import mark_changed
+
+from checkmate.db import Base
+from checkmate.models.db.allow_rule import AllowRule
+from checkmate.models.db.custom_rule import CustomRule
+from checkmate.models.db.mixins import HashMatchMixin
+from checkmate.models.db.types import HexDigest
+from checkmate.models.db.url_haus_rule import URLHausRule
+from checkmate.models.source import Source
+
+
+class RuleIndex(Base, HashMatchMixin):
+    """A copy of the hashes of every rule table, with their tags.
+
+    This lets us find every rule matching a URL with a single index scan,
+    rather than a query per table. The rule tables are still the source of
+    truth, and anything which changes them should call `update()` to keep
+    this in step.
+    """
+
+    __tablename__ = "rule_index"
+    __table_args__ = (
+        # Including the tags lets lookups be answered from the index alone
+        sa.PrimaryKeyConstraint("hash", "source", postgresql_include=["tags"]),
+    )
+
+    CHUNK_SIZE = 1000
+    """The most hashes to update in one statement."""
+
+    hash = sa.Column(HexDigest, nullable=False)
+    """The hash of the rule."""
+
+    source = sa.Column(sa.String, nullable=False)
+    """The `Source` value of the table the rule comes from."""
+
+    tags = sa.Column(ARRAY(sa.String, dimensions=1))
+    """The tags of a custom rule, in the order the rule has them.
+
+    The order matters, as checks which stop at the first mandatory reason
+    must stop at the same one as when checking the rule table itself.
+    """
+
+    @classmethod
+    def update(cls, session, source, hex_hashes=None):
+        """Copy rules from one of the rule tables.
+
+        :param session: DB session to execute within
+        :param source: The `Source` to copy the rules of
+        :param hex_hashes: Only update the entries for these hashes, or all
+            of them if this is None
+        """
+        if hex_hashes is None:
+            cls._update(session, source)
+        else:
+            hex_hashes = list(hex_hashes)
+            for start in range(0, len(hex_hashes), cls.CHUNK_SIZE):
+                cls._update(session, source, hex_hashes[start : start + cls.CHUNK_SIZE])
+
+        mark_changed(session)
+
+    @classmethod
+    def rebuild(cls, session):
+        """Regenerate the whole index from the rule tables.
+
+        :param session: DB session to execute within
+        """
+        session.execute(sa.delete(cls))
+
+        for source in Source:
+            cls.update(session, source)
+
+    @classmethod
+    def _update(cls, session, source, hex_hashes=None):
+        delete = sa.delete(cls).where(cls.source == source.value)
+        rows = _SOURCE_ROWS[source]()
+        if hex_hashes is not None:
+            delete = delete.where(cls.hash.in_(hex_hashes))
+            rows = rows.where(rows.selected_columns.hash.in_(hex_hashes))
+
+        session.execute(delete)
+        session.execute(sa.insert(cls).from_select(["hash", "source", "tags"], rows))
+
+
+def _url_haus_rows():
+    # Every URLHaus rule is malicious, so they don't need tags
+    return sa.select(
+        URLHausRule.hash,
+        sa.literal(Source.URL_HAUS.value),
+        sa.null(),
+    ).group_by(URLHausRule.hash)
+
+
+def _custom_rule_rows():
+    # Hashes are unique here, so there's nothing to merge. The tags are kept
+    # as they are, and parsed into reasons when they are read.
+    return sa.select(
+        CustomRule.hash, sa.literal(Source.BLOCK_LIST.value), CustomRule.tags
+    )
+
+
+def _allow_rule_rows():
+    # Allow rules don't have reasons, they only need to be present
+    return sa.select(
+        AllowRule.hash, sa.literal(Source.ALLOW_LIST.value), sa.null()
+    ).group_by(AllowRule.hash)
+
+
+_SOURCE_ROWS = {
+    Source.URL_HAUS: _url_haus_rows,
+    Source.BLOCK_LIST: _custom_rule_rows,
+    Source.ALLOW_LIST: _allow_rule_rows,
+}
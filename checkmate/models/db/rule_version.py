@@ -0,0 +1,55 @@
+"""Model for tracking changes to the rule tables."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from zope.sqlalchemy import mark_changed
+
+from checkmate.db import Base
+
+
+class RuleVersion(Base):
+    """A counter which goes up every time any of the rules change.
+
+    Anything which keeps a copy of the rules outside of the DB can compare
+    this value with the version it was built from to tell if it's stale.
+    """
+
+    __tablename__ = "rule_version"
+
+    ROW_ID = 1
+    """There is only ever one row in this table."""
+
+    id = sa.Column(sa.Integer, primary_key=True)
+
+    version = sa.Column(sa.BigInteger, nullable=False, server_default="0")
+    """The current version of the rules."""
+
+    @classmethod
+    def current(cls, session):
+        """Get the current version of the rules.
+
+        :param session: DB session to execute within
+        :return: An integer version (0 if the rules have never changed)
+        """
+        return (
+            session.execute(sa.select(cls.version).where(cls.id == cls.ROW_ID)).scalar()
+            or 0
+        )
+
+    @classmethod
+    def bump(cls, session):
+        """Record that the rules have changed.
+
+        This takes a row lock which is held until the transaction ends, so
+        call it as the last thing you do after changing the rules, rather than
+        before a long running update.
+
+        :param session: DB session to execute within
+        """
+        stmt = insert(cls).values(id=cls.ROW_ID, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"], set_={"version": cls.version + 1}
+        )
+
+        session.execute(stmt)
+        mark_changed(session)
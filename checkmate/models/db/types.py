@@ -0,0 +1,32 @@
+"""Custom column types."""
+
+import sqlalchemy as sa
+
+
+class HexDigest(sa.types.TypeDecorator):
+    """A SHA-256 digest stored as raw bytes, but read and written as hex.
+
+    Storing 32 bytes rather than 64 characters halves the size of the column
+    and its indexes, while the rest of the app can keep using hex strings.
+    """
+
+    impl = sa.LargeBinary
+    cache_ok = True
+
+    DIGEST_SIZE = 32
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        digest = bytes.fromhex(value)
+        if len(digest) != self.DIGEST_SIZE:
+            raise ValueError(f"Expected a {self.DIGEST_SIZE} byte digest: {value}")
+
+        return digest
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return bytes(value).hex()
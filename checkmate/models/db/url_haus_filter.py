@@ -0,0 +1,65 @@
+"""Model for storing a pre-filter of the URLHaus rules."""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from zope.sqlalchemy import mark_changed
+
+from checkmate.db import Base
+
+
+class URLHausFilter(Base):
+    """A serialised `CuckooFilter` of the hashes in `URLHausRule`.
+
+    This is built when syncing URLHaus and read by each web process, so they
+    can avoid querying the DB for URLs which definitely aren't present.
+    """
+
+    __tablename__ = "urlhaus_filter"
+
+    ROW_ID = 1
+    """There is only ever one row in this table."""
+
+    id = sa.Column(sa.Integer, primary_key=True)
+
+    version = sa.Column(sa.BigInteger, nullable=False, server_default="0")
+    """A counter which goes up every time the filter is saved."""
+
+    data = sa.Column(sa.LargeBinary, nullable=False)
+    """The serialised filter."""
+
+    @classmethod
+    def current_version(cls, session):
+        """Get the version of the stored filter.
+
+        :param session: DB session to execute within
+        :return: An integer version (0 if there is no filter)
+        """
+        return (
+            session.execute(sa.select(cls.version).where(cls.id == cls.ROW_ID)).scalar()
+            or 0
+        )
+
+    @classmethod
+    def load(cls, session):
+        """Get the stored filter data.
+
+        :param session: DB session to execute within
+        :return: The serialised filter or None if there isn't one
+        """
+        return session.execute(sa.select(cls.data).where(cls.id == cls.ROW_ID)).scalar()
+
+    @classmethod
+    def save(cls, session, data):
+        """Replace the stored filter.
+
+        :param session: DB session to execute within
+        :param data: The serialised filter
+        """
+        stmt = insert(cls).values(id=cls.ROW_ID, version=1, data=data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"version": cls.version + 1, "data": stmt.excluded.data},
+        )
+
+        session.execute(stmt)
+        mark_changed(session)
@@ -1,28 +1,172 @@
 """Model for blocking based on URLHaus."""
 
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from zope.sqlalchemy import mark_changed
 
 from checkmate.db import Base
 from checkmate.models.db.mixins import BulkUpsertMixin, HashMatchMixin
+from checkmate.models.db.types import HexDigest
 
 
 class URLHausRule(Base, HashMatchMixin, BulkUpsertMixin):
-    """Rule about blocking a particular resource."""
+    """Rule about blocking a particular resource.
 
-    BULK_UPSERT_INDEX_ELEMENTS = ["id"]
-    BULK_UPSERT_UPDATE_ELEMENTS = ["rule", "hash"]
+    This is by far our largest table, so it's split into partitions by hash.
+    Lookups by hash only read the partition which could hold it, and each
+    partition can be deleted from or vacuumed on its own.
+    """
+
+    PARTITIONS = 8
+    """The number of partitions the table is split into."""
+
+    HASH_PARTITIONED = True
+
+    # Postgres needs the partition key in every unique constraint, so rows are
+    # matched on their hash as well as their id. See `sync()` for how we keep
+    # the ids unique.
+    BULK_UPSERT_INDEX_ELEMENTS = ["hash", "id"]
+    BULK_UPSERT_UPDATE_ELEMENTS = ["rule"]
+
+    SHADOW_TABLE = "urlhaus_rule_new"
+    """The table a full sync can be built in before it's swapped in."""
 
     __tablename__ = "urlhaus_rule"
+    __table_args__ = (
+        # With the hash first, this also serves lookups by hash
+        sa.PrimaryKeyConstraint("hash", "id"),
+        {"postgresql_partition_by": "HASH (hash)"},
+    )
 
-    id = sa.Column(sa.Integer, primary_key=True)
+    id = sa.Column(sa.Integer, nullable=False, autoincrement=False)
     """The ID provided by URLHaus."""
 
-    hash = HashMatchMixin.hash_column()
+    hash = HashMatchMixin.hash_column(index=False)
     """A hash for quick comparison."""
 
     rule = sa.Column(sa.String, nullable=False)
     """The text of the rule."""
 
+    @classmethod
+    def partitions(cls, table_name=None):
+        """Get the names of the partitions of the table.
+
+        :param table_name: The table to get the partitions of, if not this one
+        """
+        table_name = table_name or cls.__tablename__
+
+        return [f"{table_name}_p{remainder}" for remainder in range(cls.PARTITIONS)]
+
+    @classmethod
+    def create_partitions_sql(cls, table_name=None):
+        """Get the SQL to create the partitions of the table.
+
+        :param table_name: The table to create the partitions of, if not this
+            one
+        """
+        table_name = table_name or cls.__tablename__
+
+        return ";\n".join(
+            f"CREATE TABLE {partition} PARTITION OF {table_name} "
+            f"FOR VALUES WITH (MODULUS {cls.PARTITIONS}, REMAINDER {remainder})"
+            for remainder, partition in enumerate(cls.partitions(table_name))
+        )
+
+    @classmethod
+    def all_hashes(cls, session, table_name=None):
+        """Get the hash of every rule.
+
+        :param session: DB session to execute within
+        :param table_name: The copy of the table to read, if not this one
+        :return: A list of hex hashes
+        """
+        # Selecting the mapped column writes any pending rules first
+        hash_column = (
+            cls.hash if table_name is None else cls.table_named(table_name).c.hash
+        )
+
+        return session.execute(sa.select(hash_column)).scalars().all()
+
+    @classmethod
+    def bulk_upsert(cls, session, values):
+        """Create or update rules, matching them by their URLHaus id.
+
+        :param session: DB session to execute within
+        :param values: An iterable of dicts of columns to upsert
+        :return: The number of values
+        """
+        synced, _, _ = cls.sync(session, values, find_added=False)
+
+        return synced
+
+    @classmethod
+    def sync(cls, session, values, find_added=True):
+        """Create or update rules like `bulk_upsert()`, and say what changed.
+
+        Postgres can't keep the ids unique for us, as every unique constraint
+        has to include the hash. If the hash for an id changes, for example
+        because we canonicalise URLs differently, the rule with the old hash
+        is deleted here. Otherwise it would keep blocking its URL until the
+        next full sync.
+
+        The values are streamed into a staging table with `COPY`, so this is
+        quick even for a full sync.
+
+        :param session: DB session to execute within
+        :param values: An iterable of dicts of columns to upsert
+        :param find_added: Find which rules are new. Turn this off when
+            loading every rule into an empty table, where they all are.
+        :return: A tuple of the number of values, a list of the hex hashes of
+            the rules which were added (or None if we didn't look), and a list
+            of the hex hashes of the rules which were deleted
+        """
+        staged = cls._copy_to_staging(session, values)
+        if staged is None:
+            return 0, [] if find_added else None, []
+
+        staging, columns, rows = staged
+        # Only the last rule for each id is kept, so ids stay unique
+        latest = cls._latest(staging, columns, ["id"]).subquery()
+
+        replaced = (
+            session.execute(
+                sa.delete(cls)
+                .where(cls.id == latest.c.id, cls.hash != latest.c.hash)
+                .returning(cls.hash)
+            )
+            .scalars()
+            .all()
+        )
+
+        added = None
+        if find_added:
+            added = (
+                session.execute(
+                    sa.select(sa.type_coerce(latest.c.hash, HexDigest)).where(
+                        ~sa.exists().where(
+                            cls.hash == latest.c.hash, cls.id == latest.c.id
+                        )
+                    )
+                )
+                .scalars()
+                .all()
+            )
+
+        stmt = insert(cls).from_select(columns, sa.select(latest))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=cls.BULK_UPSERT_INDEX_ELEMENTS,
+            set_={
+                element: getattr(stmt.excluded, element)
+                for element in cls.BULK_UPSERT_UPDATE_ELEMENTS
+            },
+        )
+        session.execute(stmt)
+        session.execute(sa.text(f"DROP TABLE {staging.name}"))
+
+        mark_changed(session)
+
+        return rows, added, replaced
+
     @classmethod
     def delete_all(cls, session):
         """Remove all rows from this table."""
@@ -33,4 +177,103 @@ class URLHausRule(Base, HashMatchMixin, BulkUpsertMixin):
         # Or for a slightly friendlier summary:
         # https://www.citusdata.com/blog/2018/02/15/when-postgresql-blocks/
 
-        session.query(cls).delete()
+        # We delete from the partitions directly, which the ORM doesn't know
+        # about, so it needs to write anything pending first
+        session.flush()
+
+        # Deleting from each partition in turn keeps each statement small
+        for partition in cls.partitions():
+            session.execute(sa.text(f"DELETE FROM {partition}"))
+
+        mark_changed(session)
+
+    @classmethod
+    def build_shadow(cls, session, values):
+        """Load rules into a new copy of the table, ready to swap in.
+
+        Nothing reads from the copy, so it's loaded without any indexes, and
+        they're built once at the end. Any copy left from an earlier attempt
+        is replaced.
+
+        :param session: DB session to execute within
+        :param values: An iterable of dicts of columns to insert
+        :return: The number of values loaded
+        """
+        session.execute(sa.text(f"DROP TABLE IF EXISTS {cls.SHADOW_TABLE}"))
+        session.execute(
+            sa.text(
+                f"CREATE TABLE {cls.SHADOW_TABLE} (LIKE {cls.__tablename__}) "
+                "PARTITION BY HASH (hash)"
+            )
+        )
+        session.execute(sa.text(cls.create_partitions_sql(cls.SHADOW_TABLE)))
+
+        loaded = cls.bulk_load(session, values, cls.SHADOW_TABLE)
+
+        session.execute(
+            sa.text(
+                f"ALTER TABLE {cls.SHADOW_TABLE} "
+                f"ADD CONSTRAINT pk__{cls.SHADOW_TABLE} PRIMARY KEY (hash, id)"
+            )
+        )
+        # Otherwise the planner knows nothing about the table until autovacuum
+        # gets round to it
+        session.execute(sa.text(f"ANALYZE {cls.SHADOW_TABLE}"))
+
+        mark_changed(session)
+
+        return loaded
+
+    @classmethod
+    def swap_shadow(cls, session):
+        """Replace the table with the copy made by `build_shadow()`.
+
+        This only renames things, so it's quick, but readers will wait for
+        it. Dropping the old table gives its space straight back, without
+        leaving dead rows for vacuum to clean up.
+
+        :param session: DB session to execute within
+        """
+        # The ORM doesn't know we're swapping the table out from under it
+        session.flush()
+
+        session.execute(sa.text(f"DROP TABLE {cls.__tablename__}"))
+        session.execute(
+            sa.text(f"ALTER TABLE {cls.SHADOW_TABLE} RENAME TO {cls.__tablename__}")
+        )
+        session.execute(
+            sa.text(
+                f"ALTER TABLE {cls.__tablename__} RENAME CONSTRAINT "
+                f"pk__{cls.SHADOW_TABLE} TO {cls.__table__.primary_key.name}"
+            )
+        )
+        for shadow, partition in zip(
+            cls.partitions(cls.SHADOW_TABLE), cls.partitions()
+        ):
+            session.execute(sa.text(f"ALTER TABLE {shadow} RENAME TO {partition}"))
+            session.execute(
+                sa.text(f"ALTER INDEX {shadow}_pkey RENAME TO {partition}_pkey")
+            )
+
+        mark_changed(session)
+
+    @classmethod
+    def vacuum(cls, engine):
+        """Vacuum and analyze the table one partition at a time.
+
+        After a full sync every row is new, and until the table has been
+        vacuumed lookups can't be answered from the index alone.
+
+        :param engine: SQLAlchemy engine to vacuum with. This can't be done
+            within a transaction, so it uses its own connection.
+        """
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            for partition in cls.partitions():
+                connection.execute(sa.text(f"VACUUM (ANALYZE) {partition}"))
+
+
+sa.event.listen(
+    URLHausRule.__table__, "after_create", sa.DDL(URLHausRule.create_partitions_sql())
+)
@@ -8,6 +8,8 @@ def add_routes(config):
 
     config.add_route("status", "/_status")
     config.add_route("check_url", "/api/check")
+    config.add_route("check_url_batch", "/api/check/batch", request_method="POST")
+    config.add_route("check_url_prefixes", "/api/check/prefixes")
 
     # Serve content from the static/static directory at /static
     config.add_static_view("static", "static/static", cache_max_age=3600)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Check the DB can answer rule lookups from its indexes alone.
+
+Usage:
+
+    python3 -m checkmate.scripts.verify_lookup_plans
+
+This exits with an error if any of the lookups used to check URLs would
+need to read a table rather than just an index.
+"""
+import sys
+from os import environ
+
+from sqlalchemy.orm import Session
+
+from checkmate.db import create_engine
+from checkmate.exceptions import SlowLookup
+from checkmate.models.db.lookup_plans import find_scans, verify_lookup_plans
+
+
+def main():
+    engine = create_engine(environ["DATABASE_URL"])
+
+    with Session(engine) as session:
+        scans = find_scans(session)
+        for name, lookup_scans in scans.items():
+            for table, scan_type in lookup_scans:
+                print(f"{name}: {scan_type} on {table}")
+
+        try:
+            verify_lookup_plans(session, scans)
+        except SlowLookup as err:
+            sys.exit(f"Lookups aren't index only: {err}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
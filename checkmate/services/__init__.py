@@ -1,11 +1,23 @@
+from pyramid.settings import asbool
+
+from checkmate.services.circuit_breaker import CircuitBreakerService
 from checkmate.services.custom_rule import CustomRuleService
+from checkmate.services.digest_file import DigestFileService
+from checkmate.services.hash_index import HashIndexService
+from checkmate.services.last_known_good import LastKnownGoodService
+from checkmate.services.parallel_check import ParallelCheckService
+from checkmate.services.result_cache import ResultCacheService
 from checkmate.services.rule import RuleService
 from checkmate.services.secure_link import SecureLinkService
 from checkmate.services.signature import SignatureService
 from checkmate.services.url_checker import URLCheckerService
+from checkmate.services.url_hasher import URLHasherService
+from checkmate.services.url_haus_filter import URLHausFilterService
 
 
 def includeme(config):  # pragma: no cover
+    settings = config.registry.settings
+
     config.register_service_factory(
         "checkmate.services.secure_link.factory", iface=SecureLinkService
     )
@@ -13,12 +25,74 @@ def includeme(config):  # pragma: no cover
         "checkmate.services.url_checker.factory", iface=URLCheckerService
     )
     config.register_service(
-        SignatureService(secret=config.registry.settings["checkmate_secret"]),
+        SignatureService(secret=settings["checkmate_secret"]),
         iface=SignatureService,
     )
     config.register_service_factory(
         "checkmate.services.rule.factory", iface=RuleService
     )
+    config.register_service(
+        URLHasherService(max_size=int(settings["url_hash_cache_size"])),
+        iface=URLHasherService,
+    )
     config.register_service_factory(
         "checkmate.services.custom_rule.factory", iface=CustomRuleService
     )
+    if asbool(settings["hash_index"]):
+        config.register_service(
+            HashIndexService(
+                engine=config.registry["database_engine"],
+                refresh_interval=int(settings["hash_index_refresh"]),
+            ),
+            iface=HashIndexService,
+        )
+    elif settings["digest_file"]:
+        config.register_service(
+            DigestFileService(
+                engine=config.registry["database_engine"],
+                path=settings["digest_file"],
+                refresh_interval=int(settings["hash_index_refresh"]),
+            ),
+            iface=DigestFileService,
+        )
+    if asbool(settings["url_haus_filter"]):
+        config.register_service(
+            URLHausFilterService(
+                engine=config.registry["database_engine"],
+                refresh_interval=int(settings["hash_index_refresh"]),
+            ),
+            iface=URLHausFilterService,
+        )
+    if asbool(settings["result_cache"]):
+        config.register_service(
+            ResultCacheService(
+                max_size=int(settings["result_cache_size"]),
+                ttl=int(settings["result_cache_ttl"]),
+            ),
+            iface=ResultCacheService,
+        )
+    if asbool(settings["parallel_checks"]):
+        config.register_service(
+            ParallelCheckService(
+                engine=config.registry["database_engine"],
+                max_workers=int(settings["parallel_checks_workers"]),
+                timeout=int(settings["parallel_checks_timeout"]) / 1000,
+            ),
+            iface=ParallelCheckService,
+        )
+    if asbool(settings["circuit_breaker"]):
+        config.register_service(
+            CircuitBreakerService(
+                failure_threshold=int(settings["circuit_breaker_failures"]),
+                reset_timeout=int(settings["circuit_breaker_reset"]),
+            ),
+            iface=CircuitBreakerService,
+        )
+        if settings["last_known_good_file"]:
+            config.register_service(
+                LastKnownGoodService(
+                    path=settings["last_known_good_file"],
+                    refresh_interval=int(settings["hash_index_refresh"]),
+                ),
+                iface=LastKnownGoodService,
+            )
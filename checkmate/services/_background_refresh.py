@@ -0,0 +1,113 @@
+"""A base for services which keep a copy of something from the DB in memory."""
+
+import os
+from logging import getLogger
+from threading import Event, Lock, Thread
+
+import sqlalchemy as sa
+
+from checkmate.db import SESSION
+
+LOG = getLogger(__name__)
+
+
+class BackgroundRefreshService:
+    """A per-process value which is rebuilt from the DB when it changes.
+
+    The value is built and refreshed in a background thread. While a new
+    value is being built the previous one continues to be served, and is only
+    replaced once the new one is complete.
+
+    Subclasses must implement `_get_version()` and `_load()`.
+    """
+
+    name = None
+    """A name for the background thread and log messages."""
+
+    def __init__(self, engine, refresh_interval=30):
+        """Initialise the service.
+
+        :param engine: SQLAlchemy engine to read from
+        :param refresh_interval: Seconds between checks for changes
+        """
+        self._engine = engine
+        self._refresh_interval = refresh_interval
+
+        self._value = None
+        self._version = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def value(self):
+        """Get the current value, or None if it hasn't been built yet.
+
+        The first access starts the background thread which builds it.
+        """
+        self._ensure_running()
+
+        return self._value
+
+    def refresh(self):
+        """Rebuild the value if it has changed since it was built."""
+
+        session = SESSION(bind=self._engine)
+        try:
+            # Our connections have the time limit for checking URLs, which
+            # reading every rule could easily go over
+            session.execute(
+                sa.select(sa.func.set_config("statement_timeout", "0", True))
+            )
+
+            # We read the version before the value, so if it changes while we
+            # are loading, the worst case is that we rebuild again next time
+            # around.
+            version = self._get_version(session)
+            if self._value is not None and self._version == version:
+                return
+
+            LOG.info("Building %s for version %s", self.name, version)
+            value = self._load(session, version)
+        finally:
+            session.close()
+
+        # Swapping a reference is atomic, so readers will either see the old
+        # value or the new one, but never a partially built one
+        self._value, self._version = value, version
+
+    def stop(self):
+        """Stop the background thread."""
+
+        self._stop.set()
+
+    def _get_version(self, session):
+        """Get a value which changes whenever the value needs rebuilding."""
+
+        raise NotImplementedError()
+
+    def _load(self, session, version):
+        """Build a new value from the DB."""
+
+        raise NotImplementedError()
+
+    def _ensure_running(self):
+        # Threads don't survive forking, so if we've been forked into a new
+        # worker process we need to start another one
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._thread = Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:  # pylint:disable=broad-except
+                LOG.exception("Could not refresh the %s", self.name)
+
+            self._stop.wait(self._refresh_interval)
@@ -0,0 +1,98 @@
+"""Stop sending checks to the DB while it's failing."""
+
+import time
+from logging import getLogger
+from threading import Lock
+
+LOG = getLogger(__name__)
+
+
+class CircuitBreakerService:
+    """A per-process circuit breaker around DB lookups.
+
+    After enough failures in a row the breaker opens, and callers are told
+    not to try the DB at all until the reset timeout has passed. After that
+    a single caller is let through to try it again: if it succeeds the
+    breaker closes, and if it fails the breaker stays open for another
+    timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """Initialise the service.
+
+        :param failure_threshold: Failures in a row which open the breaker
+        :param reset_timeout: Seconds to wait before trying the DB again
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+
+        self._lock = Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._times_opened = 0
+
+    def allow(self):
+        """Get whether the caller should try the DB."""
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if time.monotonic() - self._opened_at < self._reset_timeout:
+                return False
+
+            # Let one caller through to try the DB again, and restart the
+            # clock so everyone else waits to see how they get on
+            self._state = self.HALF_OPEN
+            self._opened_at = time.monotonic()
+
+            return True
+
+    def record_success(self):
+        """Record that a lookup worked."""
+
+        with self._lock:
+            if self._state != self.CLOSED:
+                LOG.info("DB lookups are working again, closing the breaker")
+
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Record that a lookup failed."""
+
+        with self._lock:
+            self._failures += 1
+
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self._failure_threshold
+            ):
+                LOG.warning("DB lookups are failing, opening the breaker")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._times_opened += 1
+
+    def metrics(self):
+        """Get a dict of statistics about the breaker."""
+
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "failures": self._failures,
+                "times_opened": self._times_opened,
+            }
+
+    def _current_state(self):
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self._reset_timeout
+        ):
+            return self.HALF_OPEN
+
+        return self._state
@@ -1,12 +1,16 @@
+from pyramid.settings import asbool
 from sqlalchemy import select
 
 from checkmate.checker import url
-from checkmate.models import CustomRule, Reason
+from checkmate.models import CustomRule, Reason, RuleIndex, RuleVersion, Source
+from checkmate.services import digest_file
 
 
 class CustomRuleService:
-    def __init__(self, db):
+    def __init__(self, db, rule_index=False, transaction_manager=None):
         self._db = db
+        self._rule_index = rule_index
+        self._transaction_manager = transaction_manager
 
     def set_block_list(self, text: str) -> list[str]:
         rules, errors = self._parse_text(text)
@@ -31,6 +35,11 @@ class CustomRuleService:
     def _set_custom_rules(self, rules: list[CustomRule]) -> None:
         self._db.query(CustomRule).delete()
         CustomRule.bulk_upsert(self._db, values=rules)
+        if self._rule_index:
+            RuleIndex.update(self._db, Source.BLOCK_LIST)
+        RuleVersion.bump(self._db)
+        if self._transaction_manager:
+            digest_file.write_after_commit(self._transaction_manager)
 
     def _parse_text(self, text: str) -> tuple[list[CustomRule], list[str]]:
         rules, errors = [], []
@@ -63,4 +72,14 @@ class CustomRuleService:
 
 
 def factory(_context, request):
-    return CustomRuleService(request.db)
+    settings = request.registry.settings
+
+    return CustomRuleService(
+        request.db,
+        rule_index=asbool(settings.get("rule_index")),
+        transaction_manager=(
+            request.tm
+            if settings.get("digest_file") or settings.get("last_known_good_file")
+            else None
+        ),
+    )
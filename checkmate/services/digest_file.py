@@ -0,0 +1,66 @@
+"""Keep a memory mapped digest file open in each process."""
+
+from checkmate.celery_async.tasks import write_digest_file
+from checkmate.checker.url import DigestFile
+from checkmate.models import RuleVersion
+from checkmate.services._background_refresh import BackgroundRefreshService
+
+
+class DigestFileService(BackgroundRefreshService):
+    """A per-process holder of a `DigestFile` written by the Celery tasks.
+
+    This is a drop in alternative to `HashIndexService`, which shares a
+    single copy of the rules between all of the processes on a machine
+    rather than building one for each of them.
+    """
+
+    name = "digest-file"
+
+    def __init__(self, engine, path, refresh_interval=30):
+        """Initialise the service.
+
+        :param engine: SQLAlchemy engine to read from
+        :param path: The digest file to open
+        :param refresh_interval: Seconds between checks for changes
+        """
+        super().__init__(engine, refresh_interval=refresh_interval)
+
+        self._path = path
+
+    @property
+    def index(self):
+        """Get the current index, or None if the file is missing or stale."""
+
+        return self.value
+
+    def _get_version(self, session):
+        return RuleVersion.current(session)
+
+    def _load(self, session, version):
+        try:
+            digest_file = DigestFile(self._path)
+        except FileNotFoundError:
+            return None
+
+        # We'd rather use the DB than give out of date answers, so we'll wait
+        # until the file has been rewritten with the latest rules
+        if digest_file.version != version:
+            return None
+
+        return digest_file.as_index()
+
+
+def write_after_commit(transaction_manager):
+    """Have the Celery workers rewrite the digest files after a commit.
+
+    Every change to the rules leaves the files stale, and the web processes
+    fall back to the DB until they've been rewritten.
+
+    :param transaction_manager: The transaction manager of the change
+    """
+    transaction_manager.get().addAfterCommitHook(_write_digest_file)
+
+
+def _write_digest_file(success):
+    if success:
+        write_digest_file.delay()
@@ -0,0 +1,23 @@
+"""Keep an in-memory index of the rules up to date in each process."""
+
+from checkmate.checker.url import HashIndex
+from checkmate.models import RuleVersion
+from checkmate.services._background_refresh import BackgroundRefreshService
+
+
+class HashIndexService(BackgroundRefreshService):
+    """A per-process holder of a `HashIndex` which rebuilds it as rules change."""
+
+    name = "hash-index"
+
+    @property
+    def index(self):
+        """Get the current index, or None if it hasn't been built yet."""
+
+        return self.value
+
+    def _get_version(self, session):
+        return RuleVersion.current(session)
+
+    def _load(self, session, version):
+        return HashIndex.load(session, version)
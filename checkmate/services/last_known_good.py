@@ -0,0 +1,61 @@
+"""Keep a copy of the rules on disk to check against when the DB is down."""
+
+from checkmate.checker.url import DigestFile
+from checkmate.services._background_refresh import BackgroundRefreshService
+
+
+class LastKnownGoodService(BackgroundRefreshService):
+    """A per-process copy of the last rules written by the Celery tasks.
+
+    Unlike `DigestFileService`, this will happily give out of date answers.
+    It's only used when the DB can't answer at all, when old rules are
+    better than none. The rules are kept in a `DigestFile` which the Celery
+    tasks rewrite after every change, so this never reads from the DB. It
+    only watches for a new version of the file.
+    """
+
+    name = "last-known-good"
+
+    def __init__(self, path, refresh_interval=30):
+        """Initialise the service.
+
+        :param path: The file the rules are kept in
+        :param refresh_interval: Seconds between checks for changes
+        """
+        # We never use the DB, so we don't need an engine
+        super().__init__(None, refresh_interval=refresh_interval)
+
+        self._path = path
+        self._from_disk = None
+
+    @property
+    def index(self):
+        """Get the latest index we have, or None if we've never had one."""
+
+        if index := self.value:
+            return index
+
+        # The background thread might not have got round to opening the
+        # file yet, so we'll do it ourselves
+        if self._from_disk is None:
+            digest_file = self._open_file()
+            if digest_file is not None:
+                self._from_disk = digest_file.as_index()
+
+        return self._from_disk
+
+    def _get_version(self, session):
+        digest_file = self._open_file()
+
+        return digest_file.version if digest_file is not None else None
+
+    def _load(self, session, version):
+        digest_file = self._open_file()
+
+        return digest_file.as_index() if digest_file is not None else None
+
+    def _open_file(self):
+        try:
+            return DigestFile(self._path)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,93 @@
+"""Run DB lookups at the same time on separate connections."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from logging import getLogger
+from threading import Lock
+
+import sqlalchemy as sa
+
+from checkmate.db import SESSION
+
+LOG = getLogger(__name__)
+
+
+class ParallelCheckService:
+    """A per-process pool of threads, each of which gets its own DB session.
+
+    Tasks which don't finish within the timeout are left out of the results
+    rather than holding up the caller, and their queries are cancelled by a
+    matching statement timeout in the DB.
+    """
+
+    def __init__(self, engine, max_workers=8, timeout=0.5):
+        """Initialise the service.
+
+        :param engine: SQLAlchemy engine to create sessions with
+        :param max_workers: The most tasks to run at once
+        :param timeout: Seconds each task has to complete in
+        """
+        self._engine = engine
+        self._max_workers = max_workers
+        self._timeout = timeout
+
+        self._executor = None
+        self._pid = None
+        self._lock = Lock()
+
+    def run(self, tasks, engine=None):
+        """Run tasks at the same time and wait for them to finish.
+
+        :param tasks: A dict of keys to functions which accept a DB session
+        :param engine: SQLAlchemy engine to use instead of the default, for
+            example a replica chosen for this request
+        :return: A tuple of a dict of keys to results of the tasks which
+            completed in time, and a list of the keys of those which didn't
+        """
+        executor = self._get_executor()
+        futures = {
+            executor.submit(self._run_task, task, engine or self._engine): key
+            for key, task in tasks.items()
+        }
+
+        done, not_done = wait(futures, timeout=self._timeout)
+
+        results, incomplete = {}, []
+        for future, key in futures.items():
+            if future in not_done:
+                future.cancel()
+                LOG.warning("Check %s didn't complete in %ss", key, self._timeout)
+                incomplete.append(key)
+            elif future.exception():
+                LOG.error("Check %s failed", key, exc_info=future.exception())
+                incomplete.append(key)
+            else:
+                results[key] = future.result()
+
+        return results, incomplete
+
+    def _run_task(self, task, engine):
+        session = SESSION(bind=engine)
+        try:
+            # Stop the query in the DB if we've stopped waiting for it
+            session.execute(
+                sa.select(
+                    sa.func.set_config(
+                        "statement_timeout", str(int(self._timeout * 1000)), True
+                    )
+                )
+            )
+            return task(session)
+        finally:
+            session.close()
+
+    def _get_executor(self):
+        # Threads don't survive forking, so each worker needs its own pool
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="parallel-check"
+                )
+                self._pid = os.getpid()
+
+            return self._executor
@@ -0,0 +1,76 @@
+"""Cache the results of URL checks in each process."""
+
+from checkmate.lru_cache import LRUCache
+
+
+class ResultCacheService:
+    """A per-process cache of URL check results.
+
+    Every result is tied to the `RuleVersion` it was calculated at, and the
+    whole cache is emptied when a different version is seen, so changes to
+    the rules take effect immediately rather than when entries expire.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        """Initialise the service.
+
+        :param max_size: The most results to keep
+        :param ttl: Seconds to keep each result for
+        """
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+        self._version = None
+        self.invalidations = 0
+
+    def get(self, version, key):
+        """Get a cached result.
+
+        :param version: The current `RuleVersion`
+        :param key: The key the result was stored with
+        :return: The result or None if there isn't one
+        """
+        with self._cache.lock:
+            if not self._check_version(version):
+                return None
+
+            return self._cache.get(key)
+
+    def set(self, version, key, result):
+        """Store a result.
+
+        :param version: The `RuleVersion` the result was calculated at
+        :param key: A hashable key for the check which was performed
+        :param result: The result to store
+        """
+        with self._cache.lock:
+            if self._check_version(version):
+                self._cache.set(key, result)
+
+    def metrics(self):
+        """Get a dict of statistics about the cache."""
+
+        return {
+            **self._cache.metrics(),
+            "version": self._version,
+            "invalidations": self.invalidations,
+        }
+
+    def _check_version(self, version):
+        """Empty the cache if the version has moved on.
+
+        Call this holding the cache's lock, along with whatever you do to the
+        cache based on the result. Otherwise another thread could see a new
+        version and empty the cache between the two, and we'd put an old
+        result back into it.
+
+        :return: True if results for this version can be cached
+        """
+        if self._version is None or version > self._version:
+            if self._version is not None:
+                self.invalidations += 1
+
+            self._cache.clear()
+            self._version = version
+
+        # A request which started before the rules changed can still be
+        # running, but we don't want it to put old results back in the cache
+        return version == self._version
@@ -1,8 +1,17 @@
-from checkmatelib.url import hash_for_rule
+from pyramid.settings import asbool
 
 from checkmate.exceptions import ResourceConflict
-from checkmate.models import AllowRule, Detection, Reason, Source
+from checkmate.models import (
+    AllowRule,
+    Detection,
+    Reason,
+    RuleIndex,
+    RuleVersion,
+    Source,
+)
+from checkmate.services import digest_file
 from checkmate.services.url_checker import URLCheckerService
+from checkmate.services.url_hasher import URLHasherService
 
 
 class RuleService:
@@ -10,14 +19,23 @@ class RuleService:
 
     _ALLOW_LIST_DETECTION = Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST)
 
-    def __init__(self, checker, db):
+    def __init__(  # pylint:disable=too-many-arguments
+        self, checker, db, url_hasher, rule_index=False, transaction_manager=None
+    ):
         """Initialise the service.
 
         :param checker: Instance of URLCheckerService
         :param db: DB session object
+        :param url_hasher: Instance of URLHasherService
+        :param rule_index: Keep the `RuleIndex` table up to date
+        :param transaction_manager: The request's transaction manager, to
+            rewrite the digest files once a change commits
         """
         self._checker = checker
         self._db = db
+        self._url_hasher = url_hasher
+        self._rule_index = rule_index
+        self._transaction_manager = transaction_manager
 
     def add_to_allow_list(self, url):
         """Add a given URL to the allow list.
@@ -30,7 +48,9 @@ class RuleService:
         :param url: URL to allow
         :raises ResourceConflict: If the URL cannot be allowed for any reason
         """
-        reasons = list(self._checker.check_url(url, fail_fast=False))
+        # We're about to change the rules, so we need to see them as they are
+        # now, not as any cache or index last saw them
+        reasons = list(self._checker.check_url(url, fail_fast=False, db_only=True))
 
         try:
             reasons.remove(self._ALLOW_LIST_DETECTION)
@@ -42,14 +62,31 @@ class RuleService:
                 f"Cannot allow URL as reasons to block found: {reasons}"
             )
 
-        rule_string, hex_hash = hash_for_rule(url)
+        rule_string, hex_hash = self._url_hasher.hash_for_rule(url)
 
         rule = AllowRule(rule=rule_string, hash=hex_hash, tags=["manual"])
         self._db.add(rule)
         self._db.flush()
+        if self._rule_index:
+            RuleIndex.update(self._db, Source.ALLOW_LIST, [hex_hash])
+        RuleVersion.bump(self._db)
+        if self._transaction_manager:
+            digest_file.write_after_commit(self._transaction_manager)
 
         return rule
 
 
 def factory(_context, request):
-    return RuleService(request.find_service(URLCheckerService), request.db)
+    settings = request.registry.settings
+
+    return RuleService(
+        request.find_service(URLCheckerService),
+        request.db,
+        request.find_service(URLHasherService),
+        rule_index=asbool(settings.get("rule_index")),
+        transaction_manager=(
+            request.tm
+            if settings.get("digest_file") or settings.get("last_known_good_file")
+            else None
+        ),
+    )
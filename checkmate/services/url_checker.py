@@ -1,50 +1,391 @@
+from functools import partial
+from itertools import chain
+from logging import getLogger
 from operator import attrgetter
 
-from checkmatelib.url import hash_url
+import sqlalchemy as sa
+from pyramid.settings import asbool
 
-from checkmate.checker.url import AllowRules, CustomRules, URLHaus
-from checkmate.models import Detection, Severity, Source
+from checkmate.checker.url import AllowRules, CustomRules, HashIndex, URLHaus
+from checkmate.exceptions import BadURL
+from checkmate.models import CheckFunction, Detection, RuleVersion, Severity, Source
+from checkmate.services.circuit_breaker import CircuitBreakerService
+from checkmate.services.digest_file import DigestFileService
+from checkmate.services.hash_index import HashIndexService
+from checkmate.services.last_known_good import LastKnownGoodService
+from checkmate.services.parallel_check import ParallelCheckService
+from checkmate.services.result_cache import ResultCacheService
+from checkmate.services.url_hasher import URLHasherService
+from checkmate.services.url_haus_filter import URLHausFilterService
+
+LOG = getLogger(__name__)
 
 
 class URLCheckerService:
     """A wrapper around other checking rules."""
 
-    def __init__(self, db_session):
+    degraded = False
+    """Whether any check couldn't use the DB, or only got some of the rules.
+
+    This happens when we check against older rules because the DB is down,
+    or when some rule tables didn't answer in time during a parallel check.
+    """
+
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        db_session,
+        hash_index=None,
+        combined_lookup=False,
+        rule_index=False,
+        check_function=False,
+        url_haus_filter=None,
+        result_cache=None,
+        url_hasher=None,
+        parallel_check=None,
+        circuit_breaker=None,
+        last_known_good=None,
+    ):
         """Create a new CompoundRules object.
 
         :param db_session: A DB session to work in
+        :param hash_index: A `HashIndexService` or `DigestFileService` to
+            check against instead of the DB when it has an index ready
+        :param combined_lookup: Read from all rule tables in a single query
+        :param rule_index: Read from the `RuleIndex` table rather than the
+            rule tables
+        :param check_function: Check each URL with a single call to the
+            `checkmate_check()` SQL function
+            rather than one query per checker
+        :param url_haus_filter: A `CuckooFilter` of URLHaus hashes to check
+            before querying the DB for URLHaus rules
+        :param result_cache: A `ResultCacheService` to store results in
+        :param url_hasher: A `URLHasherService` to hash URLs with
+        :param parallel_check: A `ParallelCheckService` to run the DB
+            checkers at the same time with
+        :param circuit_breaker: A `CircuitBreakerService` to stop checking
+            against the DB with while it's failing
+        :param last_known_good: A `LastKnownGoodService` to check against
+            when the DB isn't available
         """
         self._db_session = db_session
+        self._url_haus_filter = url_haus_filter
+        self._url_hasher = url_hasher or URLHasherService()
+        self._result_cache = result_cache
+        self._hash_index = hash_index
+        self._combined_lookup = combined_lookup
+        self._rule_index = rule_index
+        self._check_function = check_function
+        self._parallel_check = parallel_check
+        self._circuit_breaker = circuit_breaker
+        self._last_known_good = last_known_good
+
+        self._blocking_checker_classes = {
+            Source.URL_HAUS: partial(URLHaus, url_haus_filter=url_haus_filter),
+            Source.BLOCK_LIST: CustomRules,
+        }
+        self._allowing_checker_classes = {Source.ALLOW_LIST: AllowRules}
+
         self._blocking_checkers = {
-            Source.URL_HAUS: URLHaus(db_session),
-            Source.BLOCK_LIST: CustomRules(db_session),
+            source: checker_class(db_session)
+            for source, checker_class in self._blocking_checker_classes.items()
         }
         self._allowing_checkers = {
-            Source.ALLOW_LIST: AllowRules(db_session),
+            source: checker_class(db_session)
+            for source, checker_class in self._allowing_checker_classes.items()
         }
 
-    def check_url(self, url, allow_all=False, fail_fast=True, ignore_reasons=None):
+        self.incomplete_sources = []
+        """Sources which didn't answer in time during the last parallel check."""
+
+    def check_url(  # pylint:disable=too-many-arguments
+        self, url, allow_all=False, fail_fast=True, ignore_reasons=None, db_only=False
+    ):
         """Check for reasons to block a URL based on it's hashes.
 
         :param url: URL to check
         :param allow_all: Disable the allow list protection
         :param fail_fast: Stop at the first mandatory reason we get
         :param ignore_reasons: Ignore this list of reasons
+        :param db_only: Read the rule tables directly, rather than anything
+            which could be older than them
         :returns: A generator of Detection objects (most severe first)
         """
 
-        url_hashes = list(hash_url(url))
+        return self.check_hashes(
+            self._url_hasher.hash_url(url),
+            allow_all,
+            fail_fast,
+            ignore_reasons,
+            db_only=db_only,
+        )
+
+    def check_hashes(  # pylint:disable=too-many-arguments
+        self,
+        url_hashes,
+        allow_all=False,
+        fail_fast=True,
+        ignore_reasons=None,
+        db_only=False,
+    ):
+        """Check for reasons to block a URL from hashes the caller has made.
+
+        :param url_hashes: List of hex hashes from `checkmatelib`'s `hash_url`
+        :param allow_all: Disable the allow list protection
+        :param fail_fast: Stop at the first mandatory reason we get
+        :param ignore_reasons: Ignore this list of reasons
+        :param db_only: Read the rule tables directly, rather than anything
+            which could be older than them. This skips the result cache, any
+            index and the URLHaus filter, and never falls back to the last
+            known good rules. Use it before changing the rules.
+        :returns: A generator of Detection objects (most severe first)
+        """
+        ignore_reasons = ignore_reasons or []
+
+        if db_only:
+            return self._check_db_only(url_hashes, allow_all, fail_fast, ignore_reasons)
+
+        def check():
+            if self._result_cache:
+                return self._check_hashes_cached(
+                    url_hashes, allow_all, fail_fast, ignore_reasons
+                )
+
+            return self._check_hashes(
+                url_hashes,
+                self._get_index(url_hashes),
+                allow_all,
+                fail_fast,
+                ignore_reasons,
+            )
+
+        return self._with_fallback(
+            check,
+            partial(
+                self._check_hashes,
+                url_hashes,
+                allow_all=allow_all,
+                fail_fast=fail_fast,
+                ignore_reasons=ignore_reasons,
+            ),
+        )
+
+    def check_urls(self, urls, allow_all=False, fail_fast=True, ignore_reasons=None):
+        """Check many URLs at once.
+
+        This reads the rules for every URL in a single lookup, rather than
+        reading them for each URL in turn.
+
+        :param urls: List of URLs to check
+        :param allow_all: Disable the allow list protection
+        :param fail_fast: Stop at the first mandatory reason we get
+        :param ignore_reasons: Ignore this list of reasons
+        :returns: A dict of URL to a list of Detection objects (most severe
+            first), or None if the URL is invalid
+        """
+        hashes_by_url = {}
+        for url in urls:
+            try:
+                hashes_by_url[url] = self._url_hasher.hash_url(url)
+            except BadURL:
+                hashes_by_url[url] = None
+
+        return dict(
+            zip(
+                hashes_by_url,
+                self.check_many_hashes(
+                    list(hashes_by_url.values()), allow_all, fail_fast, ignore_reasons
+                ),
+            )
+        )
+
+    def check_many_hashes(
+        self, hash_lists, allow_all=False, fail_fast=True, ignore_reasons=None
+    ):
+        """Check many URLs at once from hashes the caller has made.
+
+        :param hash_lists: A list of lists of hex hashes, one for each URL.
+            Any which are None are skipped.
+        :param allow_all: Disable the allow list protection
+        :param fail_fast: Stop at the first mandatory reason we get
+        :param ignore_reasons: Ignore this list of reasons
+        :returns: A list of lists of Detection objects (most severe first) in
+            the same order as `hash_lists`, with None for any skipped
+        """
+        check_all = partial(
+            self._check_many_hashes,
+            hash_lists,
+            allow_all=allow_all,
+            fail_fast=fail_fast,
+            ignore_reasons=ignore_reasons or [],
+        )
+        all_hashes = set(chain.from_iterable(filter(None, hash_lists)))
+
+        return self._with_fallback(
+            lambda: check_all(index=self._get_index(sorted(all_hashes), batch=True)),
+            check_all,
+        )
+
+    def find_prefix_matches(self, prefixes):
+        """Find every rule with a hash starting with any of the prefixes.
+
+        This allows clients to check URLs themselves without telling us what
+        they are.
+
+        :param prefixes: List of lower case hex prefixes
+        :returns: A dict of full hex hashes to a tuple of a list of Detection
+            objects (most severe first), and whether the hash is on the allow
+            list
+        """
+        index = HashIndex.load_prefixes(self._db_session, prefixes)
+
+        matches = {}
+        for hex_hash in sorted(index.hashes()):
+            detections = self._get_detections(
+                [hex_hash],
+                index.blocking_checkers.items(),
+                fail_fast=False,
+                ignore_reasons=[],
+            )
+            allowed = not any(
+                list(checker.check_url([hex_hash]))
+                for checker in index.allowing_checkers.values()
+            )
+
+            matches[hex_hash] = (sorted(detections, key=attrgetter("reason")), allowed)
+
+        return matches
+
+    def _check_db_only(self, url_hashes, allow_all, fail_fast, ignore_reasons):
+        # These are new checkers, as ours could be given an older URLHaus
+        # filter. They all read in this session, so see any pending changes.
+        checkers = {
+            Source.URL_HAUS: URLHaus(self._db_session),
+            Source.BLOCK_LIST: CustomRules(self._db_session),
+        }
+        if not allow_all:
+            checkers[Source.ALLOW_LIST] = AllowRules(self._db_session)
+
         detections = self._get_detections(
-            url_hashes, allow_all, fail_fast, ignore_reasons or []
+            url_hashes, checkers.items(), fail_fast, ignore_reasons
         )
 
+        return sorted(detections, key=attrgetter("reason"))
+
+    def _with_fallback(self, check, fallback):
+        """Run a check against the DB, or the last known good rules if we can't.
+
+        :param check: A function which checks against the DB
+        :param fallback: A function which checks against an `index` it's
+            given instead
+        """
+        if self._circuit_breaker and not self._circuit_breaker.allow():
+            return self._check_degraded(fallback)
+
+        try:
+            result = check()
+        except (sa.exc.OperationalError, sa.exc.TimeoutError):
+            if not self._circuit_breaker:
+                raise
+
+            LOG.warning("Could not check against the DB", exc_info=True)
+            self._circuit_breaker.record_failure()
+
+            return self._check_degraded(fallback)
+
+        if self._circuit_breaker:
+            self._circuit_breaker.record_success()
+
+        return result
+
+    def _check_degraded(self, fallback):
+        self.degraded = True
+
+        index = self._last_known_good.index if self._last_known_good else None
+        if not index:
+            # We'd rather let everything through than fail every request, so
+            # with no rules to hand nothing is detected
+            index = _CheckResults(blocking_checkers={}, allowing_checkers={})
+
+        return fallback(index=index)
+
+    def _check_many_hashes(  # pylint:disable=too-many-arguments
+        self, hash_lists, index, allow_all, fail_fast, ignore_reasons
+    ):
+        return [
+            (
+                self._check_hashes(
+                    url_hashes, index, allow_all, fail_fast, ignore_reasons
+                )
+                if url_hashes is not None
+                else None
+            )
+            for url_hashes in hash_lists
+        ]
+
+    def _check_hashes_cached(self, url_hashes, allow_all, fail_fast, ignore_reasons):
+        # Different URLs can canonicalise to the same thing, so we key on the
+        # hashes rather than the URL itself
+        key = (
+            tuple(url_hashes),
+            bool(allow_all),
+            fail_fast,
+            frozenset(ignore_reasons),
+            # The filter is refreshed separately from the rules, so results
+            # which used it are only reused with the same filter
+            (
+                self._url_haus_filter.version
+                if self._url_haus_filter is not None
+                else None
+            ),
+        )
+        version = RuleVersion.current(self._db_session)
+
+        detections = self._result_cache.get(version, key)
+        if detections is None:
+            self.incomplete_sources = []
+            index = self._get_index(url_hashes)
+            detections = tuple(
+                self._check_hashes(
+                    url_hashes, index, allow_all, fail_fast, ignore_reasons
+                )
+            )
+            # A partial result could be missing a block, or the allow list,
+            # and an index from before the latest rules could be missing the
+            # changes. So we only keep these for this request.
+            stale = getattr(index, "version", None) is not None and (
+                index.version < version
+            )
+            if not self.incomplete_sources and not stale:
+                self._result_cache.set(version, key, detections)
+
+        return list(detections)
+
+    def _check_hashes(  # pylint:disable=too-many-arguments
+        self, url_hashes, index, allow_all, fail_fast, ignore_reasons
+    ):
+        if not index and self._check_function:
+            detections = CheckFunction.check(
+                self._db_session, url_hashes, allow_all, fail_fast, ignore_reasons
+            )
+        else:
+            if not index and self._parallel_check:
+                index = self._check_in_parallel(url_hashes, allow_all)
+
+            detections = self._get_detections(
+                url_hashes,
+                self._get_checkers(index, allow_all),
+                fail_fast,
+                ignore_reasons,
+            )
+
         # Sort the detections by worst first (based on Reason order)
         return sorted(detections, key=attrgetter("reason"))
 
-    def _get_detections(self, url_hashes, allow_all, fail_fast, ignore_reasons):
+    @staticmethod
+    def _get_detections(url_hashes, checkers, fail_fast, ignore_reasons):
         detections = []
 
-        for source, checker in self._get_checkers(allow_all):
+        for source, checker in checkers:
             for reason in checker.check_url(url_hashes):
                 if reason in ignore_reasons:
                     continue
@@ -58,12 +399,125 @@ class URLCheckerService:
 
         return detections
 
-    def _get_checkers(self, allow_all):
-        yield from self._blocking_checkers.items()
+    def _get_checkers(self, index, allow_all):
+        if index:
+            blocking_checkers = index.blocking_checkers
+            allowing_checkers = index.allowing_checkers
+        else:
+            blocking_checkers = self._blocking_checkers
+            allowing_checkers = self._allowing_checkers
+
+        yield from blocking_checkers.items()
+
+        if not allow_all:
+            yield from allowing_checkers.items()
+
+    def _check_in_parallel(self, url_hashes, allow_all):
+        """Run each of the DB checkers at the same time.
 
+        :return: An object like a `HashIndex` with the results of each
+            checker which finished in time
+        """
+        checker_classes = dict(self._blocking_checker_classes)
         if not allow_all:
-            yield from self._allowing_checkers.items()
+            checker_classes.update(self._allowing_checker_classes)
+
+        results, self.incomplete_sources = self._parallel_check.run(
+            {
+                source: partial(_run_checker, checker_class, url_hashes)
+                for source, checker_class in checker_classes.items()
+            },
+            # Read from the same DB as the rest of the request
+            engine=self._db_session.get_bind(),
+        )
+        if self.incomplete_sources:
+            self.degraded = True
+
+        return _CheckResults(
+            blocking_checkers={
+                source: _FixedReasons(results[source])
+                for source in self._blocking_checker_classes
+                if source in results
+            },
+            allowing_checkers={
+                source: _FixedReasons(results[source])
+                for source in self._allowing_checker_classes
+                if source in results
+            },
+        )
+
+    def _get_index(self, url_hashes, batch=False):
+        if self._hash_index and (index := self._hash_index.index):
+            return index
+
+        if self._rule_index:
+            return HashIndex.load_from_rule_index(self._db_session, url_hashes)
+
+        # Batches always read all of their rules in one go
+        if self._combined_lookup or batch:
+            return HashIndex.load_matching(self._db_session, url_hashes)
+
+        return None
+
+
+def _run_checker(checker_class, url_hashes, session):
+    return list(checker_class(session).check_url(url_hashes))
+
+
+class _CheckResults:
+    """The results of running checkers, which look like a `HashIndex`."""
+
+    def __init__(self, blocking_checkers, allowing_checkers):
+        self.blocking_checkers = blocking_checkers
+        self.allowing_checkers = allowing_checkers
+
+
+class _FixedReasons:
+    """A checker which gives the results another checker already gave."""
+
+    def __init__(self, reasons):
+        self._reasons = reasons
+
+    def check_url(self, _url_hashes):
+        return self._reasons
 
 
 def factory(_context, request):
-    return URLCheckerService(db_session=request.db)
+    hash_index = None
+    if asbool(request.registry.settings.get("hash_index")):
+        hash_index = request.find_service(HashIndexService)
+    elif request.registry.settings.get("digest_file"):
+        hash_index = request.find_service(DigestFileService)
+
+    url_haus_filter = None
+    if asbool(request.registry.settings.get("url_haus_filter")):
+        url_haus_filter = request.find_service(URLHausFilterService).filter
+
+    result_cache = None
+    if asbool(request.registry.settings.get("result_cache")):
+        result_cache = request.find_service(ResultCacheService)
+
+    parallel_check = None
+    if asbool(request.registry.settings.get("parallel_checks")):
+        parallel_check = request.find_service(ParallelCheckService)
+
+    circuit_breaker = last_known_good = None
+    if asbool(request.registry.settings.get("circuit_breaker")):
+        circuit_breaker = request.find_service(CircuitBreakerService)
+
+        if request.registry.settings.get("last_known_good_file"):
+            last_known_good = request.find_service(LastKnownGoodService)
+
+    return URLCheckerService(
+        db_session=request.db,
+        hash_index=hash_index,
+        combined_lookup=asbool(request.registry.settings.get("combined_lookup")),
+        rule_index=asbool(request.registry.settings.get("rule_index")),
+        check_function=asbool(request.registry.settings.get("check_function")),
+        url_haus_filter=url_haus_filter,
+        result_cache=result_cache,
+        url_hasher=request.find_service(URLHasherService),
+        parallel_check=parallel_check,
+        circuit_breaker=circuit_breaker,
+        last_known_good=last_known_good,
+    )
@@ -0,0 +1,55 @@
+"""Memoised URL canonicalisation and hashing."""
+
+from checkmatelib.url import hash_for_rule, hash_url
+
+from checkmate.asgi import run_off_the_loop
+from checkmate.lru_cache import LRUCache
+
+
+class URLHasherService:
+    """A per-process cache in front of the `checkmatelib` URL hashing.
+
+    Canonicalising and hashing URLs is relatively slow, and we see the same
+    URLs over and over again, so we remember the results for the most
+    recently seen ones.
+    """
+
+    def __init__(self, max_size=10000):
+        """Initialise the service.
+
+        :param max_size: The most URLs to remember results for
+        """
+        self._cache = LRUCache(max_size=max_size)
+
+    def hash_url(self, url):
+        """Get the hashes to check a URL against rules with.
+
+        :param url: URL to hash
+        :return: A list of hex hashes
+        :raise BadURL: If the URL is invalid
+        """
+        return list(self._memoize("hash_url", url, lambda: tuple(hash_url(url))))
+
+    def hash_for_rule(self, url):
+        """Get the canonical rule and hash to store a rule for a URL with.
+
+        :param url: URL to create a rule for
+        :return: A tuple of rule string and hex hash
+        :raise BadURL: If the URL is invalid
+        """
+        return self._memoize("hash_for_rule", url, lambda: hash_for_rule(url))
+
+    def metrics(self):
+        """Get a dict of statistics about the cache."""
+
+        return self._cache.metrics()
+
+    def _memoize(self, kind, url, calculate):
+        key = (kind, url)
+
+        value = self._cache.get(key)
+        if value is None:
+            value = run_off_the_loop(calculate)
+            self._cache.set(key, value)
+
+        return value
@@ -0,0 +1,34 @@
+"""Keep an in-memory copy of the URLHaus pre-filter up to date in each process."""
+
+from checkmate.checker.url import CuckooFilter
+from checkmate.models import URLHausFilter
+from checkmate.services._background_refresh import BackgroundRefreshService
+
+
+class URLHausFilterService(BackgroundRefreshService):
+    """A per-process holder of the `CuckooFilter` built by the URLHaus sync."""
+
+    name = "urlhaus-filter"
+
+    @property
+    def filter(self):
+        """Get the current filter, or None if there isn't one yet."""
+
+        return self.value
+
+    def metrics(self):
+        """Get a dict of statistics about the current filter."""
+
+        url_haus_filter = self.filter
+        if url_haus_filter is None:
+            return {"ready": False}
+
+        return {"ready": True, "version": self._version, **url_haus_filter.metrics()}
+
+    def _get_version(self, session):
+        return URLHausFilter.current_version(session)
+
+    def _load(self, session, version):
+        data = URLHausFilter.load(session)
+
+        return CuckooFilter.from_bytes(data, version=version) if data else None
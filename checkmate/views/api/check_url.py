@@ -1,68 +1,282 @@
 """URL checking."""
 
+import re
+
+from marshmallow import ValidationError, validate, validates_schema
+from marshmallow_jsonapi import Schema, fields
 from pyramid.httpexceptions import HTTPNoContent
 from pyramid.view import view_config
 
 from checkmate.exceptions import BadURL, BadURLParameter
 from checkmate.models import BlockedFor, Reason
 from checkmate.security import Permissions
-from checkmate.services import SecureLinkService, URLCheckerService
+from checkmate.services import SecureLinkService, URLCheckerService, URLHasherService
 
 
 @view_config(route_name="check_url", renderer="json", permission=Permissions.CHECK_URL)
 def check_url(request):
-    """Check a given URL for any reasons we might want to block it."""
+    """Check a given URL for any reasons we might want to block it.
 
-    try:
-        url = request.GET["url"]
-    except KeyError as err:
-        raise BadURLParameter("url", "Parameter 'url' is required") from err
+    Callers who have already hashed the URL with `checkmatelib` can send the
+    hashes instead. The URL is then optional, and only used to link to the
+    block page if its hashes are the ones sent.
+    """
+
+    url = request.GET.get("url")
+    hashes = request.GET.get("hashes")
+    if not url and not hashes:
+        raise BadURLParameter("url", "Parameter 'url' or 'hashes' is required")
 
     ignore_reasons = request.GET.get("ignore_reasons", [])
     if ignore_reasons:
+        ignore_reasons = _parse_ignore_reasons(ignore_reasons.split(","))
+
+    url_checker = request.find_service(URLCheckerService)
+    options = {
+        "allow_all": request.GET.get("allow_all"),
+        "ignore_reasons": ignore_reasons,
+    }
+
+    if hashes:
+        hashes = _parse_hashes(hashes.split(","))
+        detections = list(url_checker.check_hashes(hashes, **options))
+    else:
         try:
-            ignore_reasons = set(
-                Reason.parse(reason, default=None)
-                for reason in ignore_reasons.split(",")
-            )
-        except ValueError as err:
-            raise BadURLParameter(
-                "ignored_reasons", "Parameter 'ignored_reasons' contains unknown value"
-            ) from err
+            detections = list(url_checker.check_url(url, **options))
+        except BadURL as err:
+            raise BadURLParameter("url", "Parameter 'url' isn't valid") from err
+
+    if not detections:
+        # If everything is fine give a 204 which is successful, but has no body
+        response = HTTPNoContent()
+        _mark_degraded(response, url_checker)
+        return response
+
+    blocked_for = request.GET.get("blocked_for", BlockedFor.GENERAL.value)
+
+    document = _detections_document(request, url, detections, blocked_for, hashes)
+    if _mark_degraded(request.response, url_checker):
+        document["meta"]["degraded"] = True
+
+    return document
+
+
+class BatchCheckSchema(Schema):
+    MAX_URLS = 100
+    """The most URLs which can be checked in one request."""
+
+    MAX_HASHES = 100
+    """The most hashes which can be sent for each URL."""
+
+    id = fields.Str(dump_only=True)
+
+    urls = fields.List(fields.Str(), validate=validate.Length(min=1, max=MAX_URLS))
+    hashes = fields.List(
+        fields.List(fields.Str(), validate=validate.Length(min=1, max=MAX_HASHES)),
+        validate=validate.Length(min=1, max=MAX_URLS),
+    )
+    ignore_reasons = fields.List(fields.Str(), load_default=list)
+    allow_all = fields.Bool(load_default=False)
+    blocked_for = fields.Str(load_default=BlockedFor.GENERAL.value)
 
+    @validates_schema
+    def validate_urls_or_hashes(self, data, **_kwargs):
+        if "urls" not in data and "hashes" not in data:
+            raise ValidationError("One of 'urls' or 'hashes' is required", "urls")
+
+        if "urls" in data and "hashes" in data:
+            if len(data["urls"]) != len(data["hashes"]):
+                raise ValidationError(
+                    "There must be a list of 'hashes' for each of the 'urls'",
+                    "hashes",
+                )
+
+    class Meta:
+        type_ = "BatchCheck"
+        strict = True
+
+
+@view_config(
+    route_name="check_url_batch",
+    request_method="POST",
+    jsonapi={"schema": BatchCheckSchema()},
+    permission=Permissions.CHECK_URL,
+)
+def check_url_batch(request):
+    """Check a list of URLs for any reasons we might want to block them.
+
+    Each URL gets the same body `check_url` would give it, in the same order
+    as they were sent. As with `check_url`, callers can send lists of hashes
+    instead of, or as well as, the URLs.
+    """
+    attributes = request.jsonapi.attributes
     url_checker = request.find_service(URLCheckerService)
+    options = {
+        "allow_all": attributes["allow_all"],
+        "ignore_reasons": _parse_ignore_reasons(attributes["ignore_reasons"]),
+    }
 
-    try:
-        detections = list(
-            url_checker.check_url(
-                url,
-                allow_all=request.GET.get("allow_all"),
-                ignore_reasons=ignore_reasons,
+    urls = attributes.get("urls")
+    hash_lists = attributes.get("hashes")
+    if hash_lists:
+        checked_hash_lists = [_parse_hashes(hashes) for hashes in hash_lists]
+        results = url_checker.check_many_hashes(checked_hash_lists, **options)
+        urls = urls or [None] * len(hash_lists)
+    else:
+        results_by_url = url_checker.check_urls(urls, **options)
+        results = [results_by_url[url] for url in urls]
+        hash_lists = checked_hash_lists = [None] * len(urls)
+
+    documents = []
+    for url, hashes, checked_hashes, detections in zip(
+        urls, hash_lists, checked_hash_lists, results
+    ):
+        if detections is None:
+            document = BadURLParameter(
+                "urls", "Parameter 'urls' contains an invalid URL"
+            ).normalized_messages()
+        elif detections:
+            document = _detections_document(
+                request, url, detections, attributes["blocked_for"], checked_hashes
             )
+        else:
+            document = {"data": []}
+
+        documents.append(
+            {"url": url, **document} if url else {"hashes": hashes, **document}
         )
-    except BadURL as err:
-        raise BadURLParameter("url", "Parameter 'url' isn't valid") from err
 
-    if not detections:
-        # If everything is fine give a 204 which is successful, but has no body
-        return HTTPNoContent()
+    # This isn't creating anything, so override the JSON:API default of 201
+    request.response.status_code = 200
+
+    if _mark_degraded(request.response, url_checker):
+        return {"data": documents, "meta": {"degraded": True}}
+
+    return {"data": documents}
+
+
+PREFIX_PATTERN = re.compile(r"^[0-9a-f]{8,64}$")
+"""Prefixes must be 4 bytes or more, so one doesn't match half of URLHaus."""
+
+MAX_PREFIXES = 100
+"""The most prefixes which can be looked up in one request."""
+
+
+@view_config(
+    route_name="check_url_prefixes", renderer="json", permission=Permissions.CHECK_URL
+)
+def check_url_prefixes(request):
+    """Get every rule with a hash starting with any of the given prefixes.
+
+    Clients can send the first few bytes of the hashes of a URL and check the
+    results themselves, so we never see the URL, and they can reuse the
+    results for other URLs with the same prefixes.
+    """
+    prefixes = [
+        prefix.strip().lower()
+        for prefix in request.GET.get("prefixes", "").split(",")
+        if prefix.strip()
+    ]
+    if not prefixes:
+        raise BadURLParameter("prefixes", "Parameter 'prefixes' is required")
 
+    if len(prefixes) > MAX_PREFIXES:
+        raise BadURLParameter(
+            "prefixes", f"Parameter 'prefixes' can have at most {MAX_PREFIXES} items"
+        )
+
+    if not all(PREFIX_PATTERN.match(prefix) for prefix in prefixes):
+        raise BadURLParameter(
+            "prefixes",
+            "Parameter 'prefixes' must contain hex strings of 8 to 64 characters",
+        )
+
+    matches = request.find_service(URLCheckerService).find_prefix_matches(prefixes)
+
+    # https://jsonapi.org/format/#document-resource-objects
+    return {
+        "data": [
+            {
+                "type": "hash",
+                "id": hex_hash,
+                "attributes": {
+                    # Reasons are in severity order, worst first
+                    "reasons": list(
+                        dict.fromkeys(
+                            detection.reason.value for detection in detections
+                        )
+                    ),
+                    "allowed": allowed,
+                },
+            }
+            for hex_hash, (detections, allowed) in matches.items()
+        ]
+    }
+
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _parse_hashes(values):
+    hashes = [value.strip().lower() for value in values]
+
+    if not 1 <= len(hashes) <= BatchCheckSchema.MAX_HASHES or not all(
+        HASH_PATTERN.match(value) for value in hashes
+    ):
+        raise BadURLParameter(
+            "hashes",
+            "Parameter 'hashes' must contain 1 to "
+            f"{BatchCheckSchema.MAX_HASHES} hex SHA-256 hashes",
+        )
+
+    return hashes
+
+
+def _parse_ignore_reasons(values):
+    try:
+        return set(Reason.parse(reason, default=None) for reason in values)
+    except ValueError as err:
+        raise BadURLParameter(
+            "ignored_reasons", "Parameter 'ignored_reasons' contains unknown value"
+        ) from err
+
+
+def _mark_degraded(response, url_checker):
+    """Tell the caller if we couldn't check against the latest rules.
+
+    :return: True if the response was marked as degraded
+    """
+    if not url_checker.degraded:
+        return False
+
+    # A 204 has no body to put this in, so it goes in a header too
+    response.headers["X-Checkmate-Degraded"] = "true"
+
+    return True
+
+
+def _detections_document(  # pylint:disable=too-many-arguments
+    request, url, detections, blocked_for, hashes=None
+):
     # Get unique reasons mapped to corresponding detections
     reasons = {detection.reason: detection for detection in detections}
 
     # Reasons are ordered, worst first
     worst_reason = min(reasons)
 
-    blocked_for = request.GET.get("blocked_for", BlockedFor.GENERAL.value)
-
     # https://jsonapi.org/format/#document-top-level
-    return {
+    document = {
         "data": [reason.serialise() for reason in sorted(reasons)],
         "meta": {
             # Reasons are in severity order, worst first
             "maxSeverity": worst_reason.severity.value,
         },
-        "links": {
+    }
+
+    # We can only link to the block page if we know what the URL is, and we
+    # only sign a link for a URL which we've actually checked
+    if url and (hashes is None or _hashes_match(request, url, hashes)):
+        document["links"] = {
             "html": request.find_service(SecureLinkService).route_url(
                 "present_block",
                 _scheme=request.registry.settings["public_scheme"],
@@ -74,5 +288,17 @@ def check_url(request):
                     "blocked_for": blocked_for,
                 },
             )
-        },
-    }
+        }
+
+    return document
+
+
+def _hashes_match(request, url, hashes):
+    """Check the hashes a caller sent are the hashes of the URL they sent."""
+
+    try:
+        url_hashes = request.find_service(URLHasherService).hash_url(url)
+    except BadURL:
+        return False
+
+    return set(url_hashes) == set(hashes)
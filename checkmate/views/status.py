@@ -1,10 +1,51 @@
+from pyramid.settings import asbool
 from pyramid.view import view_config
 from sentry_sdk import capture_message
 
+from checkmate.db_pool import pool_metrics
+from checkmate.services import (
+    CircuitBreakerService,
+    ResultCacheService,
+    URLHasherService,
+    URLHausFilterService,
+)
+
 
 @view_config(route_name="status", renderer="json", http_cache=0)
 def status(request):
     if "sentry" in request.params:
         capture_message("Test message from Checkmate's status view")
 
-    return {"status": "okay"}
+    response = {"status": "okay"}
+
+    if "verbose" in request.params:
+        response["metrics"] = _metrics(request)
+
+    return response
+
+
+def _metrics(request):
+    metrics = {"url_hasher": request.find_service(URLHasherService).metrics()}
+
+    if asbool(request.registry.settings.get("url_haus_filter")):
+        metrics["url_haus_filter"] = request.find_service(
+            URLHausFilterService
+        ).metrics()
+
+    if asbool(request.registry.settings.get("result_cache")):
+        metrics["result_cache"] = request.find_service(ResultCacheService).metrics()
+
+    if asbool(request.registry.settings.get("circuit_breaker")):
+        metrics["circuit_breaker"] = request.find_service(
+            CircuitBreakerService
+        ).metrics()
+
+    engine = request.registry.get("database_engine")
+    if engine and (database_pool := pool_metrics(engine)):
+        metrics["database_pool"] = database_pool
+
+    router = request.registry.get("database_router")
+    if router and router.replicas:
+        metrics["database_replicas"] = router.metrics()
+
+    return metrics
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import json
+from urllib.parse import urlencode
+
+import httpretty
+import pytest
+from checkmatelib.url import hash_for_rule, hash_url
+from sqlalchemy.orm import Session
+
+from checkmate.asgi import create_asgi_app
+from checkmate.models import AllowRule, CustomRule, URLHausRule
+
+
+class TestAsyncCheckApp:
+    @pytest.mark.parametrize(
+        "params",
+        (
+            {"url": "http://blocked.example.com/path"},
+            {"url": "http://allowed.example.com"},
+            {"url": "http://example.com", "ignore_reasons": "not-explicitly-allowed"},
+            {"url": "http://example.com]"},
+            {"hashes": ",".join(hash_url("http://blocked.example.com"))},
+            {},
+        ),
+    )
+    def test_check_matches_the_pyramid_app(self, app, call, params):
+        expected = app.get("/api/check", params, expect_errors=True)
+
+        status, body = call("GET", "/api/check", params=params)
+
+        assert status == expected.status_code
+        assert body == (expected.json if expected.body else None)
+
+    def test_it_finds_the_rules(self, call):
+        _, body = call(
+            "GET", "/api/check", params={"url": "http://blocked.example.com"}
+        )
+
+        assert [reason["id"] for reason in body["data"]] == ["malicious"]
+
+    def test_batch_check_matches_the_pyramid_app(self, app, call):
+        body = {
+            "data": {
+                "type": "BatchCheck",
+                "attributes": {
+                    "urls": [
+                        "http://blocked.example.com",
+                        "http://allowed.example.com",
+                        "http://example.com]",
+                    ]
+                },
+            }
+        }
+        expected = app.post_json("/api/check/batch", body)
+
+        assert call("POST", "/api/check/batch", body=body) == (
+            expected.status_code,
+            expected.json,
+        )
+
+    def test_prefixes_match_the_pyramid_app(self, app, call):
+        params = {"prefixes": next(hash_url("http://blocked.example.com"))[:8]}
+        expected = app.get("/api/check/prefixes", params)
+        assert expected.json["data"]
+
+        assert call("GET", "/api/check/prefixes", params=params) == (
+            expected.status_code,
+            expected.json,
+        )
+
+    def test_it_requires_auth(self, call):
+        status, body = call("GET", "/api/check", auth=False)
+
+        assert status == 403
+        assert body == {"error": "invalid_token"}
+
+    def test_it_only_serves_the_check_api(self, call):
+        status, _ = call("GET", "/admin/")
+
+        assert status == 404
+
+    @pytest.fixture
+    def call(self, asgi_app):
+        def call(method, path, params=None, body=None, auth=True):
+            headers = [(b"host", b"localhost:443")]
+            if auth:
+                headers.append(
+                    (b"authorization", b"Basic " + base64.b64encode(b"dev_api_key:"))
+                )
+            if body is not None:
+                headers.append((b"content-type", b"application/json"))
+                body = json.dumps(body).encode("utf-8")
+
+            scope = {
+                "type": "http",
+                "method": method,
+                "path": path,
+                "query_string": urlencode(params or {}).encode("latin-1"),
+                "headers": headers,
+                "scheme": "https",
+                "server": ("localhost", 443),
+            }
+            sent = []
+
+            async def receive():
+                return {"type": "http.request", "body": body or b""}
+
+            async def send(message):
+                sent.append(message)
+
+            async def run():
+                await asgi_app(scope, receive, send)
+                # Close the DB connections before the event loop goes away
+                await _shutdown(asgi_app)
+
+            asyncio.run(run())
+
+            start, response = sent
+            return (
+                start["status"],
+                json.loads(response["body"]) if response["body"] else None,
+            )
+
+        return call
+
+    @pytest.fixture
+    def app(self, app):
+        app.authorization = ("Basic", ("dev_api_key", ""))
+        return app
+
+    @pytest.fixture
+    def asgi_app(self, pyramid_settings):
+        return create_asgi_app(**pyramid_settings)
+
+    @pytest.fixture(autouse=True)
+    def rules(self, db_engine):
+        def rule(model, url, **kwargs):
+            rule, hex_hash = hash_for_rule(url)
+            return model(rule=rule, hash=hex_hash, **kwargs)
+
+        with Session(db_engine) as session:
+            session.add_all(
+                [
+                    rule(URLHausRule, "http://blocked.example.com", id=1),
+                    rule(
+                        CustomRule,
+                        "blocked.example.com",
+                        tags=["high-io", "not-a-reason"],
+                    ),
+                    rule(AllowRule, "allowed.example.com"),
+                ]
+            )
+            session.commit()
+
+
+async def _shutdown(asgi_app):
+    messages = [{"type": "lifespan.shutdown"}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(_message):
+        pass
+
+    await asgi_app({"type": "lifespan"}, receive, send)
+
+
+@pytest.fixture(autouse=True)
+def httpretty_():
+    """Let asyncpg open real sockets to the DB."""
+    httpretty.disable()
@@ -0,0 +1,63 @@
+import pytest
+import sqlalchemy as sa
+from checkmatelib.url import hash_for_rule
+from h_matchers import Any
+
+from checkmate.models import URLHausRule
+
+
+class TestCheckURLBatch:
+    def test_it_requires_auth(self, app, json_body):
+        app.post_json("/api/check/batch", json_body, status=403)
+
+    def test_it(self, app, json_body):
+        app.authorization = ("Basic", ("dev_api_key", ""))
+
+        res = app.post_json("/api/check/batch", json_body, status=200)
+
+        assert res.json == {
+            "data": [
+                {
+                    "url": "http://example.com",
+                    "data": [Any.dict.containing({"id": "not-explicitly-allowed"})],
+                    "meta": {"maxSeverity": "advisory"},
+                    "links": {"html": Any.string()},
+                },
+                {
+                    "url": "http://example.com]",
+                    "errors": [Any.dict.containing({"id": "BadURLParameter"})],
+                },
+            ]
+        }
+
+    def test_it_blocks_every_url_haus_url(self, app, db_engine):
+        urls = ["http://bad-1.example.com/", "http://bad-2.example.com/"]
+        with db_engine.begin() as connection:
+            connection.execute(
+                sa.insert(URLHausRule),
+                [
+                    {"id": id_, "rule": rule, "hash": hex_hash}
+                    for id_, (rule, hex_hash) in enumerate(map(hash_for_rule, urls))
+                ],
+            )
+        app.authorization = ("Basic", ("dev_api_key", ""))
+
+        res = app.post_json(
+            "/api/check/batch",
+            {"data": {"type": "BatchCheck", "attributes": {"urls": urls}}},
+            status=200,
+        )
+
+        assert [result["data"][0]["id"] for result in res.json["data"]] == [
+            "malicious",
+            "malicious",
+        ]
+
+    @pytest.fixture
+    def json_body(self):
+        return {
+            "data": {
+                "type": "BatchCheck",
+                "attributes": {"urls": ["http://example.com", "http://example.com]"]},
+            }
+        }
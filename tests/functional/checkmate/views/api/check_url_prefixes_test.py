@@ -0,0 +1,21 @@
+from checkmatelib.url import hash_url
+
+
+class TestCheckURLPrefixes:
+    def test_it_requires_auth(self, app):
+        app.get("/api/check/prefixes", params={"prefixes": "01234567"}, status=403)
+
+    def test_it(self, app):
+        app.authorization = ("Basic", ("dev_api_key", ""))
+        prefixes = [url_hash[:8] for url_hash in hash_url("http://example.com")]
+
+        res = app.get(
+            "/api/check/prefixes", params={"prefixes": ",".join(prefixes)}, status=200
+        )
+
+        assert res.json == {"data": []}
+
+    def test_it_rejects_bad_prefixes(self, app):
+        app.authorization = ("Basic", ("dev_api_key", ""))
+
+        app.get("/api/check/prefixes", params={"prefixes": "0123"}, status=400)
@@ -1,3 +1,4 @@
+from checkmatelib.url import hash_url
 from h_matchers import Any
 
 from checkmate.models import BlockedFor
@@ -31,3 +32,15 @@ class TestAPIAuth:
                 "blocked_for": BlockedFor.GENERAL.value,
             }
         )
+
+    def test_it_accepts_hashes(self, app):
+        app.authorization = ("Basic", ("dev_api_key", ""))
+
+        res = app.get(
+            "/api/check",
+            {"hashes": ",".join(hash_url("http://example.com"))},
+            status=200,
+        )
+
+        assert res.json["data"][0]["id"] == "not-explicitly-allowed"
+        assert "links" not in res.json
@@ -16,8 +16,39 @@ REQUIRED_APP_SETTINGS = {
 }
 
 OPTIONAL_APP_SETTINGS = {
+    "database_pool_size": "5",
+    "database_pool_max_overflow": "10",
+    "database_pool_timeout": "30",
+    "database_pool_recycle": "-1",
+    "database_pool_pre_ping": "false",
+    "database_replica_url": "replica_db",
+    "database_replica_stale_after": "5",
+    "database_replica_health_check": "10",
     "public_scheme": "localhost",
     "public_port": "9099",
+    "hash_index": "true",
+    "hash_index_refresh": "30",
+    "combined_lookup": "true",
+    "rule_index": "true",
+    "check_function": "true",
+    "result_cache": "true",
+    "result_cache_size": "10000",
+    "result_cache_ttl": "60",
+    "url_hash_cache_size": "10000",
+    "parallel_checks": "true",
+    "parallel_checks_workers": "8",
+    "parallel_checks_timeout": "500",
+    "check_statement_timeout": "250",
+    "circuit_breaker": "true",
+    "circuit_breaker_failures": "5",
+    "circuit_breaker_reset": "30",
+    "last_known_good_file": "/tmp/last_known_good",
+    "digest_file": "/tmp/digests",
+    "url_haus_filter": "true",
+    "url_haus_filter_capacity": "2000000",
+    "url_haus_filter_fingerprint_bits": "12",
+    "url_haus_swap_tables": "true",
+    "url_haus_hash_processes": "4",
 }
 
 DIFFERENT_ENVVAR_NAME_APP_SETTINGS = {
@@ -126,6 +157,7 @@ class TestCheckmateConfigurator:
         )
 
         config.scan.assert_not_called()
+        config.add_settings.assert_any_call({"database_replica_url": ""})
 
     @pytest.mark.usefixtures("with_clear_environ")
     def test_it_sets_api_keys_blank_if_not_specified(self, config):
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import threading
+from unittest.mock import create_autospec, sentinel
+
+import httpretty
+import pyramid_tm
+import pytest
+import sqlalchemy as sa
+from pyramid import threadlocal
+from pyramid.config import Configurator
+from pyramid.threadlocal import get_current_request
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from checkmate.asgi import (
+    AsyncCheckApp,
+    ContextLocalManager,
+    async_database_url,
+    run_off_the_loop,
+)
+from checkmate.models import DownloadValidator
+
+
+class TestAsyncCheckApp:
+    def test_it_runs_views_with_an_async_session(self, call):
+        status, headers, body = call(
+            "GET",
+            "/check",
+            query_string=b"value=1",
+            headers=[(b"x-test", b"a"), (b"x-test", b"b")],
+        )
+
+        assert status == 200
+        assert (b"content-type", b"application/json") in headers
+        assert json.loads(body) == {
+            "driver": "asyncpg",
+            "result": 1,
+            "params": {"value": "1"},
+            "header": "a,b",
+            "body": "",
+        }
+
+    def test_it_reads_the_whole_body(self, call):
+        _, _, body = call(
+            "POST",
+            "/check",
+            body_chunks=[b'{"a"', b": 1}"],
+            # The length of the first chunk
+            headers=[(b"content-type", b"application/json"), (b"content-length", b"4")],
+        )
+
+        assert json.loads(body)["body"] == '{"a": 1}'
+
+    def test_it_only_serves_its_paths(self, call):
+        status, _, body = call("GET", "/admin")
+
+        assert status == 404
+        assert not body
+
+    def test_it_keeps_the_current_request_of_each_request(self, app):
+        async def call_concurrently():
+            return await asyncio.gather(
+                *(
+                    _call(app, "GET", "/slow", query_string=b"value=" + value)
+                    for value in (b"a", b"b")
+                )
+            )
+
+        responses = asyncio.run(call_concurrently())
+
+        assert [json.loads(body) for _, _, body in responses] == [
+            {"value": "a", "current": ["a", "a"]},
+            {"value": "b", "current": ["b", "b"]},
+        ]
+
+    def test_it_runs_slow_work_off_the_loop(self, call):
+        _, _, body = call("GET", "/thread")
+
+        thread, loop_thread = json.loads(body)
+        assert thread != loop_thread
+
+    def test_it_commits_the_request_transaction(self, call, db_engine):
+        status, _, _ = call("POST", "/write")
+
+        assert status == 200
+        with db_engine.connect() as connection:
+            assert (
+                connection.scalar(
+                    sa.select(DownloadValidator.etag).where(
+                        DownloadValidator.url == "http://example.com"
+                    )
+                )
+                == "written"
+            )
+            connection.execute(sa.delete(DownloadValidator))
+            connection.commit()
+
+    def test_lifespan(self, pyramid_app):
+        engine = create_autospec(AsyncEngine, instance=True)
+        app = AsyncCheckApp(pyramid_app, engine)
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(app({"type": "lifespan"}, receive, send))
+
+        assert sent == [
+            {"type": "lifespan.startup.complete"},
+            {"type": "lifespan.shutdown.complete"},
+        ]
+        engine.dispose.assert_awaited_once_with()
+
+    @pytest.fixture
+    def call(self, app):
+        def call(*args, **kwargs):
+            return asyncio.run(_call(app, *args, **kwargs))
+
+        return call
+
+    @pytest.fixture
+    def app(self, pyramid_app, engine, manager):  # pylint:disable=unused-argument
+        return AsyncCheckApp(
+            pyramid_app, engine, paths={"/check", "/slow", "/thread", "/write"}
+        )
+
+    @pytest.fixture
+    def manager(self, monkeypatch):
+        manager = ContextLocalManager(threadlocal.manager)
+        monkeypatch.setattr(threadlocal, "manager", manager)
+        return manager
+
+    @pytest.fixture
+    def engine(self, db_engine):
+        return create_async_engine(
+            async_database_url(db_engine.url), poolclass=sa.pool.NullPool
+        )
+
+    @pytest.fixture
+    def pyramid_app(self):
+        def view(request):
+            return {
+                "driver": request.db.bind.dialect.driver,
+                "result": request.db.scalar(sa.select(sa.literal(1))),
+                "params": dict(request.GET),
+                "header": request.headers.get("X-Test"),
+                "body": request.text,
+            }
+
+        def slow_view(request):
+            current = [get_current_request().GET["value"]]
+            # Give the other requests a chance to start while we wait
+            request.db.execute(sa.select(sa.func.pg_sleep(0.1)))
+            current.append(get_current_request().GET["value"])
+
+            return {"value": request.GET["value"], "current": current}
+
+        def thread_view(_request):
+            return [run_off_the_loop(threading.get_ident), threading.get_ident()]
+
+        def write_view(request):
+            request.db.execute(
+                sa.insert(DownloadValidator).values(
+                    url="http://example.com", etag="written"
+                )
+            )
+            return {}
+
+        with Configurator(
+            settings={"tm.manager_hook": pyramid_tm.explicit_manager}
+        ) as config:
+            config.include("pyramid_tm")
+            config.add_route("check", "/check")
+            config.add_view(view, route_name="check", renderer="json")
+            config.add_route("slow", "/slow")
+            config.add_view(slow_view, route_name="slow", renderer="json")
+            config.add_route("thread", "/thread")
+            config.add_view(thread_view, route_name="thread", renderer="json")
+            config.add_route("write", "/write")
+            config.add_view(write_view, route_name="write", renderer="json")
+
+        return config.make_wsgi_app()
+
+
+async def _call(  # pylint:disable=too-many-arguments
+    app, method, path, query_string=b"", headers=(), body_chunks=(b"",)
+):
+    chunks = list(body_chunks)
+    sent = []
+
+    async def receive():
+        body = chunks.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": list(headers),
+    }
+    await app(scope, receive, send)
+
+    start, body = sent
+    return start["status"], start["headers"], body["body"]
+
+
+@pytest.fixture(autouse=True)
+def httpretty_():
+    """Let asyncpg open real sockets to the test DB."""
+    httpretty.disable()
+
+
+class TestContextLocalManager:
+    def test_it_passes_everything_on_outside_of_a_request(self):
+        thread_local = threadlocal.ThreadLocalManager(default=lambda: sentinel.default)
+        manager = ContextLocalManager(thread_local)
+
+        assert manager.get() == sentinel.default
+        manager.push(sentinel.info)
+        assert thread_local.get() == manager.get() == sentinel.info
+        assert manager.pop() == sentinel.info
+        manager.set(sentinel.info)
+        manager.clear()
+        assert thread_local.get() == sentinel.default
+
+    def test_it_keeps_a_stack_for_each_request(self):
+        thread_local = threadlocal.ThreadLocalManager(default=lambda: sentinel.default)
+        manager = ContextLocalManager(thread_local)
+
+        async def request(info):
+            with manager.request_stack():
+                current = [manager.get()]
+                manager.push(info)
+                await asyncio.sleep(0)
+                current.append(manager.get())
+                manager.clear()
+                current.append(manager.pop())
+                return current
+
+        async def call_concurrently():
+            return await asyncio.gather(*(request(info) for info in ("a", "b")))
+
+        assert asyncio.run(call_concurrently()) == [
+            [sentinel.default, "a", None],
+            [sentinel.default, "b", None],
+        ]
+        assert thread_local.get() == sentinel.default
+
+
+class TestRunOffTheLoop:
+    def test_it_calls_the_function_outside_of_a_request(self):
+        assert run_off_the_loop(threading.get_ident) == threading.get_ident()
+
+
+class TestAsyncDatabaseURL:
+    def test_it(self):
+        url = async_database_url("postgresql://user@host:5432/db")
+
+        assert url.render_as_string() == "postgresql+asyncpg://user@host:5432/db"
@@ -1,18 +1,61 @@
 from contextlib import contextmanager
+from unittest.mock import call, sentinel
 
 import pytest
+from h_matchers import Any
 
 from checkmate.app import CheckmateConfigurator
-from checkmate.celery_async.tasks import initialize_urlhaus, sync_urlhaus
+from checkmate.celery_async.tasks import (
+    initialize_urlhaus,
+    rebuild_rule_index,
+    sync_urlhaus,
+    vacuum_urlhaus,
+    write_digest_file,
+)
+from checkmate.checker.pipeline import UNCHANGED
 
 
 @pytest.mark.usefixtures("URLHaus")
 class TestInitializeURLHaus:
-    def test_it(self, pyramid_request, URLHaus):
+    def test_it(self, pyramid_request, URLHaus, DigestFile, URLHausRule):
         initialize_urlhaus()
 
-        URLHaus.assert_called_once_with(pyramid_request.db)
+        URLHaus.assert_called_once_with(
+            pyramid_request.db, filter_settings=None, hash_processes=1, rule_index=False
+        )
         URLHaus.return_value.reinitialize_db.assert_called_once_with()
+        DigestFile.write.assert_not_called()
+        URLHausRule.vacuum.assert_called_once_with(sentinel.database_engine)
+
+    def test_it_swapping_tables(self, pyramid_request, URLHaus):
+        pyramid_request.registry.settings["url_haus_swap_tables"] = "true"
+
+        initialize_urlhaus()
+
+        URLHaus.return_value.reinitialize_db.assert_called_once_with(
+            transaction_manager=pyramid_request.tm
+        )
+
+    def test_it_with_the_filter(self, pyramid_request, URLHaus):
+        pyramid_request.registry.settings["url_haus_filter"] = "true"
+
+        initialize_urlhaus()
+
+        URLHaus.assert_called_once_with(
+            pyramid_request.db,
+            filter_settings={"capacity": 2000000, "fingerprint_bits": 12},
+            hash_processes=1,
+            rule_index=False,
+        )
+
+    def test_it_with_a_hashing_pool(self, pyramid_request, URLHaus):
+        pyramid_request.registry.settings["url_haus_hash_processes"] = "4"
+
+        initialize_urlhaus()
+
+        URLHaus.assert_called_once_with(
+            pyramid_request.db, filter_settings=None, hash_processes=4, rule_index=False
+        )
 
 
 @pytest.mark.usefixtures("URLHaus")
@@ -20,17 +63,108 @@ class TestSyncURLHaus:
     def test_it(self, pyramid_request, URLHaus):
         sync_urlhaus()
 
-        URLHaus.assert_called_once_with(pyramid_request.db)
+        URLHaus.assert_called_once_with(
+            pyramid_request.db, filter_settings=None, hash_processes=1, rule_index=False
+        )
         URLHaus.return_value.update_db.assert_called_once_with()
 
+    def test_it_writes_the_digest_file(self, pyramid_request, DigestFile):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+
+        sync_urlhaus()
+
+        DigestFile.write.assert_called_once()
+
+    def test_it_does_nothing_more_if_nothing_has_changed(
+        self, pyramid_request, URLHaus, DigestFile
+    ):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+        URLHaus.return_value.update_db.return_value = UNCHANGED
+
+        sync_urlhaus()
+
+        DigestFile.write.assert_not_called()
+
+
+class TestWriteDigestFile:
+    def test_it(self, pyramid_request, DigestFile, RuleVersion):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+
+        write_digest_file()
+
+        RuleVersion.current.assert_called_once_with(pyramid_request.db)
+        DigestFile.write.assert_called_once_with(
+            pyramid_request.db, "/tmp/digests", RuleVersion.current.return_value
+        )
+
+    def test_it_writes_the_last_known_good_file(self, pyramid_request, DigestFile):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+        pyramid_request.registry.settings["last_known_good_file"] = "/tmp/lkg"
+
+        write_digest_file()
+
+        assert DigestFile.write.call_args_list == [
+            call(pyramid_request.db, "/tmp/digests", Any()),
+            call(pyramid_request.db, "/tmp/lkg", Any()),
+        ]
+
+    def test_it_writes_the_same_file_once(self, pyramid_request, DigestFile):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+        pyramid_request.registry.settings["last_known_good_file"] = "/tmp/digests"
+
+        write_digest_file()
+
+        DigestFile.write.assert_called_once()
+
+    def test_it_does_nothing_without_a_path(self, DigestFile):
+        write_digest_file()
+
+        DigestFile.write.assert_not_called()
+
+
+class TestVacuumURLHaus:
+    def test_it(self, URLHausRule):
+        vacuum_urlhaus()
+
+        URLHausRule.vacuum.assert_called_once_with(sentinel.database_engine)
+
+
+class TestRebuildRuleIndex:
+    def test_it(self, pyramid_request, RuleIndex, RuleVersion):
+        rebuild_rule_index()
+
+        RuleIndex.rebuild.assert_called_once_with(pyramid_request.db)
+        RuleVersion.bump.assert_called_once_with(pyramid_request.db)
+
 
 @pytest.fixture
 def pyramid_config(pyramid_config):
     CheckmateConfigurator(pyramid_config, celery_worker=True)
+    pyramid_config.registry["database_engine"] = sentinel.database_engine
 
     return pyramid_config
 
 
+@pytest.fixture(autouse=True)
+def DigestFile(patch):
+    return patch("checkmate.celery_async.tasks.DigestFile")
+
+
+@pytest.fixture(autouse=True)
+def RuleVersion(patch):
+    return patch("checkmate.celery_async.tasks.RuleVersion")
+
+
+@pytest.fixture
+def RuleIndex(patch):
+    return patch("checkmate.celery_async.tasks.RuleIndex")
+
+
+@pytest.fixture(autouse=True)
+def URLHausRule(patch):
+    return patch("checkmate.celery_async.tasks.URLHausRule")
+
+
 @pytest.fixture()
 def URLHaus(patch):
     return patch("checkmate.celery_async.tasks.URLHaus")
@@ -1,10 +1,11 @@
 import os
+from io import BytesIO
 from unittest.mock import create_autospec, sentinel
 
 import pytest
 
-from checkmate.checker.pipeline.core import Pipeline, Stage
-from checkmate.exceptions import StageException
+from checkmate.checker.pipeline.core import UNCHANGED, Pipeline, Stage
+from checkmate.exceptions import SourceUnchanged, StageException
 
 
 class TestStage:
@@ -35,6 +36,14 @@ class TestStage:
 
         Stage.check_file(str(filename))  # Ok!
 
+    def test_check_source_accepts_file_objects(self):
+        Stage.check_source(BytesIO(b"content"))  # Ok!
+
+    @pytest.mark.parametrize("not_a_file", [1234, "/tmp/not_a_valid_file"])
+    def test_check_source_failures(self, not_a_file):
+        with pytest.raises(StageException):
+            Stage.check_source(not_a_file)
+
     @pytest.mark.parametrize("not_a_file", [1234, "/tmp/not_a_valid_file"])
     def test_check_file_failures(self, not_a_file):
         with pytest.raises(StageException):
@@ -55,3 +64,13 @@ class TestPipeline:
         stage_1.assert_called_once_with(sentinel.working_dir, sentinel.initial_source)
         stage_2.assert_called_once_with(sentinel.working_dir, stage_1.return_value)
         assert result == stage_2.return_value
+
+    def test_it_stops_if_the_source_is_unchanged(self):
+        stage_1 = create_autospec(Stage, instance=True, spec_set=True)
+        stage_1.side_effect = SourceUnchanged
+        stage_2 = create_autospec(Stage, instance=True, spec_set=True)
+
+        result = Pipeline([stage_1, stage_2])(working_dir=sentinel.working_dir)
+
+        stage_2.assert_not_called()
+        assert result is UNCHANGED
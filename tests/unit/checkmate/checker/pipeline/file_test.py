@@ -1,4 +1,5 @@
 import os
+from io import BytesIO
 from unittest.mock import sentinel
 
 import importlib_resources
@@ -20,6 +21,14 @@ class TestReadTextFile:
 
         assert result == Any.generator().containing(["line1\n", "line2"]).only()
 
+    def test_it_reads_from_a_file_object(self):
+        source = BytesIO("line1\nlïne2".encode("utf8"))
+
+        result = ReadTextFile()(sentinel.working_dir, source=source)
+
+        assert result == Any.generator().containing(["line1\n", "lïne2"]).only()
+        assert source.closed
+
     def test_it_raises_if_not_given_a_file(self):
         with pytest.raises(StageException):
             list(ReadTextFile()(sentinel.working_dir, source=1234))
@@ -71,6 +80,22 @@ class TestUnzipFile:
 
         assert content == "good"
 
+    def test_it_streams_the_file(self, tmpdir):
+        with open(self.ZIP_FILE, "rb") as handle:
+            source = BytesIO(handle.read())
+
+        result = UnzipFile("target.txt", stream=True)(tmpdir, source=source)
+
+        assert result.read() == b"good"
+        assert not os.listdir(tmpdir)
+        result.close()
+        assert source.closed
+
+    def test_it_streams_the_file_from_a_file_name(self, tmpdir):
+        result = UnzipFile("target.txt", stream=True)(tmpdir, source=self.ZIP_FILE)
+
+        assert list(ReadTextFile()(tmpdir, source=result)) == ["good"]
+
     def test_it_raises_when_the_expected_file_is_missing(self, tmpdir):
         with pytest.raises(StageException):
             UnzipFile("missing.txt")(tmpdir, source=self.ZIP_FILE)
@@ -7,7 +7,11 @@ from httpretty import httprettified
 from requests.exceptions import HTTPError, ReadTimeout
 
 from checkmate.checker.pipeline import Download
-from checkmate.exceptions import StageException, StageRetryableException
+from checkmate.exceptions import (
+    SourceUnchanged,
+    StageException,
+    StageRetryableException,
+)
 
 
 class TestDownload:
@@ -24,6 +28,56 @@ class TestDownload:
 
         assert content == "some content"
 
+    @httprettified
+    def test_it_streams_a_file(self, tmpdir):
+        url = "https://example.com"
+        httpretty.register_uri(httpretty.GET, url, body="some content")
+
+        with Download(url, stream=True)(tmpdir) as result:
+            assert result.read() == b"some content"
+
+        # Small files are kept in memory
+        assert not os.listdir(tmpdir)
+
+    @httprettified
+    def test_it_keeps_the_validators_of_the_file(self, tmpdir):
+        url = "https://example.com"
+        httpretty.register_uri(
+            httpretty.GET,
+            url,
+            body="some content",
+            adding_headers={
+                "ETag": '"abc"',
+                "Last-Modified": "Sun, 18 Oct 2026 12:00:00 GMT",
+            },
+        )
+        download = Download(url, validators={"ETag": '"old"'})
+
+        download(tmpdir)
+
+        assert download.validators == {
+            "ETag": '"abc"',
+            "Last-Modified": "Sun, 18 Oct 2026 12:00:00 GMT",
+        }
+
+    @httprettified
+    def test_it_only_downloads_the_file_if_its_changed(self, tmpdir):
+        url = "https://example.com"
+        httpretty.register_uri(httpretty.GET, url, status=304)
+        validators = {
+            "ETag": '"abc"',
+            "Last-Modified": "Sun, 18 Oct 2026 12:00:00 GMT",
+        }
+        download = Download(url, validators=validators)
+
+        with pytest.raises(SourceUnchanged):
+            download(tmpdir)
+
+        request = httpretty.last_request()
+        assert request.headers["If-None-Match"] == '"abc"'
+        assert request.headers["If-Modified-Since"] == "Sun, 18 Oct 2026 12:00:00 GMT"
+        assert download.validators == validators
+
     @pytest.mark.parametrize(
         "exception,expected",
         (
@@ -40,12 +94,14 @@ class TestDownload:
         with pytest.raises(expected):
             Download(url)(tmpdir)
 
-        requests.get.assert_called_once_with(url, timeout=10)
+        requests.get.assert_called_once_with(url, timeout=10, headers={})
 
     def test_it_uses_the_timeout_value(self, tmpdir, requests):
         Download(sentinel.url, timeout=sentinel.timeout)(tmpdir)
 
-        requests.get.assert_called_once_with(sentinel.url, timeout=sentinel.timeout)
+        requests.get.assert_called_once_with(
+            sentinel.url, timeout=sentinel.timeout, headers={}
+        )
 
     @pytest.fixture
     def requests(self, patch):
@@ -0,0 +1,101 @@
+from hashlib import sha256
+
+import pytest
+
+from checkmate.checker.url import CuckooFilter
+from checkmate.exceptions import FilterFull
+
+
+class TestCuckooFilter:
+    def test_it_contains_what_was_added(self, digests):
+        cuckoo_filter = CuckooFilter(capacity=len(digests))
+
+        for digest in digests:
+            cuckoo_filter.add(digest)
+
+        assert len(cuckoo_filter) == len(digests)
+        assert all(digest in cuckoo_filter for digest in digests)
+
+    def test_it_has_few_false_positives(self, digests):
+        cuckoo_filter = CuckooFilter(capacity=len(digests))
+        for digest in digests:
+            cuckoo_filter.add(digest)
+
+        others = [_digest(f"other_{i}") for i in range(10000)]
+        false_positives = sum(digest in cuckoo_filter for digest in others)
+
+        assert false_positives / len(others) <= cuckoo_filter.false_positive_rate
+
+    def test_remove(self, digests):
+        cuckoo_filter = CuckooFilter(capacity=len(digests))
+        for digest in digests:
+            cuckoo_filter.add(digest)
+
+        assert cuckoo_filter.remove(digests[0])
+
+        assert digests[0] not in cuckoo_filter
+        assert len(cuckoo_filter) == len(digests) - 1
+        assert all(digest in cuckoo_filter for digest in digests[1:])
+
+    def test_remove_with_a_missing_digest(self):
+        cuckoo_filter = CuckooFilter(capacity=10)
+
+        assert not cuckoo_filter.remove(_digest("missing"))
+
+    def test_add_raises_when_full_without_losing_anything(self):
+        # This has a single bucket of 4 slots
+        cuckoo_filter = CuckooFilter(capacity=1)
+        added = [_digest(i) for i in range(4)]
+        for digest in added:
+            cuckoo_filter.add(digest)
+
+        with pytest.raises(FilterFull):
+            cuckoo_filter.add(_digest("one too many"))
+
+        assert len(cuckoo_filter) == len(added)
+        assert all(digest in cuckoo_filter for digest in added)
+
+    @pytest.mark.parametrize("fingerprint_bits,itemsize", ((8, 1), (12, 2), (16, 2)))
+    def test_memory_bytes(self, fingerprint_bits, itemsize):
+        cuckoo_filter = CuckooFilter(capacity=100, fingerprint_bits=fingerprint_bits)
+
+        assert cuckoo_filter.capacity == 128
+        assert cuckoo_filter.memory_bytes == 128 * itemsize
+
+    @pytest.mark.parametrize("fingerprint_bits", (0, 17))
+    def test_it_rejects_bad_fingerprint_sizes(self, fingerprint_bits):
+        with pytest.raises(ValueError):
+            CuckooFilter(capacity=100, fingerprint_bits=fingerprint_bits)
+
+    def test_metrics(self):
+        cuckoo_filter = CuckooFilter(capacity=100, fingerprint_bits=8)
+        cuckoo_filter.add(_digest("item"))
+
+        assert cuckoo_filter.metrics() == {
+            "items": 1,
+            "capacity": 128,
+            "load_factor": 1 / 128,
+            "fingerprint_bits": 8,
+            "false_positive_rate": 8 / 256,
+            "memory_bytes": 128,
+        }
+
+    def test_serialisation(self, digests):
+        cuckoo_filter = CuckooFilter(capacity=len(digests), fingerprint_bits=10)
+        for digest in digests:
+            cuckoo_filter.add(digest)
+
+        loaded = CuckooFilter.from_bytes(cuckoo_filter.to_bytes(), version=3)
+
+        assert loaded.version == 3
+        assert loaded.metrics() == cuckoo_filter.metrics()
+        assert all(digest in loaded for digest in digests)
+        assert loaded.to_bytes() == cuckoo_filter.to_bytes()
+
+    @pytest.fixture
+    def digests(self):
+        return [_digest(i) for i in range(1000)]
+
+
+def _digest(value):
+    return sha256(str(value).encode()).digest()
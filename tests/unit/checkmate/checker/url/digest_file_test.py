@@ -0,0 +1,113 @@
+import pytest
+from checkmatelib.url import hash_for_rule, hash_url
+from h_matchers import Any
+
+from checkmate.checker.url import DigestFile, HashIndex
+from checkmate.models import Reason, Source, URLHausRule
+from tests import factories
+
+
+class TestDigestFile:
+    def test_url_haus(self, index):
+        checker = index.blocking_checkers[Source.URL_HAUS]
+
+        assert list(checker.check_url(hash_url("http://malicious.example.com"))) == [
+            Reason.MALICIOUS
+        ]
+        assert not list(checker.check_url(hash_url("http://example.com")))
+
+    def test_block_list(self, index):
+        checker = index.blocking_checkers[Source.BLOCK_LIST]
+
+        hits = checker.check_url(hash_url("http://sub.blocked.example.com/path"))
+
+        assert (
+            hits
+            == Any.generator().containing([Reason.HIGH_IO, Reason.MEDIA_VIDEO]).only()
+        )
+        assert not list(checker.check_url(hash_url("http://example.com")))
+
+    def test_allow_list(self, index):
+        checker = index.allowing_checkers[Source.ALLOW_LIST]
+
+        assert not list(checker.check_url(hash_url("http://allowed.example.com/a")))
+        # This is also in URLHaus, so there are two records with its digest
+        assert not list(checker.check_url(hash_url("http://malicious.example.com")))
+        assert list(checker.check_url(hash_url("http://example.com"))) == [
+            Reason.NOT_ALLOWED
+        ]
+
+    def test_it_records_the_version_and_count(self, digest_file):
+        assert digest_file.version == 42
+        assert len(digest_file) == 5
+
+    @pytest.mark.parametrize(
+        "url",
+        (
+            "http://malicious.example.com",
+            "http://sub.blocked.example.com/path",
+            "http://allowed.example.com/a",
+            "http://example.com",
+        ),
+    )
+    def test_it_matches_a_hash_index(self, index, db_session, url):
+        url_hashes = list(hash_url(url))
+        hash_index = HashIndex.load(db_session, version=42)
+
+        for checkers, expected_checkers in (
+            (index.blocking_checkers, hash_index.blocking_checkers),
+            (index.allowing_checkers, hash_index.allowing_checkers),
+        ):
+            for source, checker in checkers.items():
+                assert list(checker.check_url(url_hashes)) == list(
+                    expected_checkers[source].check_url(url_hashes)
+                )
+
+    def test_it_replaces_existing_files(self, db_session, path, digest_file):
+        DigestFile.write(db_session, path, version=43)
+
+        assert DigestFile(path).version == 43
+        # Anything which already had the old file open can carry on using it
+        assert digest_file.version == 42
+        assert len(list(path.parent.iterdir())) == 1
+
+    def test_it_cleans_up_if_writing_fails(self, db_session, path):
+        for i in range(257):
+            factories.CustomRule(
+                url=f"http://{i}.example.com", reasons=[Reason.HIGH_IO] * (i + 1)
+            )
+
+        with pytest.raises(ValueError):
+            DigestFile.write(db_session, path, version=43)
+
+        assert not list(path.parent.iterdir())
+
+    def test_it_rejects_other_files(self, path):
+        path.write_bytes(b"\0" * 100)
+
+        with pytest.raises(ValueError):
+            DigestFile(path)
+
+    @pytest.fixture
+    def index(self, digest_file):
+        return digest_file.as_index()
+
+    @pytest.fixture
+    def digest_file(self, db_session, path):
+        factories.CustomRule(url="http://blocked.example.com", reasons=[Reason.HIGH_IO])
+        factories.CustomRule(
+            url="http://sub.blocked.example.com", reasons=[Reason.MEDIA_VIDEO]
+        )
+        factories.AllowRule(url="http://allowed.example.com")
+        factories.AllowRule(url="http://malicious.example.com")
+        rule, hex_hash = hash_for_rule("http://malicious.example.com")
+        db_session.add(URLHausRule(id=1, rule=rule, hash=hex_hash))
+        db_session.flush()
+
+        assert DigestFile.write(db_session, path, version=42) == 5
+
+        return DigestFile(path)
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return tmp_path / "digests"
@@ -0,0 +1,126 @@
+import pytest
+from checkmatelib.url import hash_for_rule, hash_url
+from h_matchers import Any
+
+from checkmate.checker.url import HashIndex
+from checkmate.models import Reason, RuleIndex, Source, URLHausRule
+from tests import factories
+
+
+class TestHashIndex:
+    def test_url_haus(self, index):
+        checker = index.blocking_checkers[Source.URL_HAUS]
+
+        assert list(checker.check_url(hash_url("http://malicious.example.com"))) == [
+            Reason.MALICIOUS
+        ]
+        assert not list(checker.check_url(hash_url("http://example.com")))
+
+    def test_block_list(self, index):
+        checker = index.blocking_checkers[Source.BLOCK_LIST]
+
+        hits = checker.check_url(hash_url("http://sub.blocked.example.com/path"))
+
+        assert (
+            hits
+            == Any.generator().containing([Reason.HIGH_IO, Reason.MEDIA_VIDEO]).only()
+        )
+        assert not list(checker.check_url(hash_url("http://example.com")))
+
+    def test_allow_list(self, index):
+        checker = index.allowing_checkers[Source.ALLOW_LIST]
+
+        assert not list(checker.check_url(hash_url("http://allowed.example.com/a")))
+        assert list(checker.check_url(hash_url("http://example.com"))) == [
+            Reason.NOT_ALLOWED
+        ]
+
+    def test_it_records_the_version(self, index):
+        assert index.version == 42
+
+    @pytest.mark.parametrize("loader", ("load_matching", "load_from_rule_index"))
+    @pytest.mark.parametrize(
+        "url",
+        (
+            "http://malicious.example.com",
+            "http://sub.blocked.example.com/path",
+            "http://allowed.example.com/a",
+            "http://example.com",
+        ),
+    )
+    def test_partial_indexes_match_a_full_index(self, index, db_session, url, loader):
+        url_hashes = list(hash_url(url))
+        RuleIndex.rebuild(db_session)
+
+        partial_index = getattr(HashIndex, loader)(db_session, url_hashes)
+
+        for source, checker in index.blocking_checkers.items():
+            assert (
+                list(partial_index.blocking_checkers[source].check_url(url_hashes))
+                == Any.list.containing(list(checker.check_url(url_hashes))).only()
+            )
+        assert list(
+            partial_index.allowing_checkers[Source.ALLOW_LIST].check_url(url_hashes)
+        ) == list(index.allowing_checkers[Source.ALLOW_LIST].check_url(url_hashes))
+
+    @pytest.mark.parametrize("loader", ("load_matching", "load_from_rule_index"))
+    def test_partial_indexes_keep_the_order_of_the_tags(self, db_session, loader):
+        # Checks which stop at the first mandatory reason depend on the order
+        factories.CustomRule(
+            url="http://mixed.example.com", reasons=[Reason.HIGH_IO, Reason.MALICIOUS]
+        )
+        db_session.flush()
+        RuleIndex.rebuild(db_session)
+        url_hashes = list(hash_url("http://mixed.example.com"))
+
+        partial_index = getattr(HashIndex, loader)(db_session, url_hashes)
+
+        assert list(
+            partial_index.blocking_checkers[Source.BLOCK_LIST].check_url(url_hashes)
+        ) == [Reason.HIGH_IO, Reason.MALICIOUS]
+
+    def test_load_matching_finds_every_url_haus_rule(self, db_session):
+        urls = ["http://bad-1.example.com", "http://bad-2.example.com"]
+        for id_, url in enumerate(urls):
+            rule, hex_hash = hash_for_rule(url)
+            db_session.add(URLHausRule(id=id_, rule=rule, hash=hex_hash))
+        db_session.flush()
+
+        partial_index = HashIndex.load_matching(
+            db_session, [url_hash for url in urls for url_hash in hash_url(url)]
+        )
+
+        checker = partial_index.blocking_checkers[Source.URL_HAUS]
+        for url in urls:
+            assert list(checker.check_url(hash_url(url))) == [Reason.MALICIOUS]
+
+    def test_load_prefixes(self, index, db_session):
+        url_hashes = list(hash_url("http://sub.blocked.example.com/path"))
+        _, allowed_hash = hash_for_rule("http://allowed.example.com")
+
+        partial_index = HashIndex.load_prefixes(
+            db_session, [url_hash[:8] for url_hash in url_hashes] + [allowed_hash[:8]]
+        )
+
+        assert partial_index.hashes() == Any.set.containing(
+            {hash_for_rule("http://sub.blocked.example.com")[1], allowed_hash}
+        )
+        assert list(
+            partial_index.blocking_checkers[Source.BLOCK_LIST].check_url(url_hashes)
+        ) == list(index.blocking_checkers[Source.BLOCK_LIST].check_url(url_hashes))
+        assert not list(
+            partial_index.allowing_checkers[Source.ALLOW_LIST].check_url([allowed_hash])
+        )
+
+    @pytest.fixture
+    def index(self, db_session):
+        factories.CustomRule(url="http://blocked.example.com", reasons=[Reason.HIGH_IO])
+        factories.CustomRule(
+            url="http://sub.blocked.example.com", reasons=[Reason.MEDIA_VIDEO]
+        )
+        factories.AllowRule(url="http://allowed.example.com")
+        rule, hex_hash = hash_for_rule("http://malicious.example.com")
+        db_session.add(URLHausRule(id=1, rule=rule, hash=hex_hash))
+        db_session.flush()
+
+        return HashIndex.load(db_session, version=42)
@@ -1,64 +1,374 @@
-from unittest.mock import sentinel
+from unittest.mock import MagicMock, call, sentinel
 
 import importlib_resources
 import pytest
+from checkmatelib.url import hash_for_rule
 from h_matchers import Any
 from httpretty import httprettified, httpretty
 
-from checkmate.checker.url import URLHaus
-from checkmate.models import Reason
+from checkmate.checker.pipeline import UNCHANGED
+from checkmate.checker.url import CuckooFilter, URLHaus
+from checkmate.exceptions import FilterFull
+from checkmate.models import Reason, Source
+
+HASH_1 = "7d93a7a785da3bb7fc67b08cda3368745eb7cf6155e4d8b26415680e69a3f5c6"
+HASH_2 = "f1991c232fda31acdfb50bf118458ddfd31140649218f4774f9c98e50317a59c"
 
 
 class TestURLHaus:
     def test_check_url_with_hits(self, URLHausRule):
-        URLHausRule.find_matches.return_value.count.return_value = 2
+        URLHausRule.has_matches.return_value = True
 
         response = URLHaus(sentinel.db_session).check_url(["hex_hash"])
 
         assert response == Any.generator().containing([Reason.MALICIOUS]).only()
         # The above will exhaust the generator and allow us to make assertions
         # about the call
-        URLHausRule.find_matches.assert_called_once_with(
-            sentinel.db_session, ["hex_hash"], limit=1
+        URLHausRule.has_matches.assert_called_once_with(
+            sentinel.db_session, ["hex_hash"]
         )
 
     def test_check_url_with_no_hits(self, URLHausRule):
-        URLHausRule.find_matches.return_value.count.return_value = 0
+        URLHausRule.has_matches.return_value = False
 
         response = URLHaus(sentinel.db_session).check_url(["hex_hash"])
 
         assert response == Any.generator().containing([]).only()
 
+    def test_check_url_skips_the_db_when_not_in_the_filter(
+        self, URLHausRule, url_haus_filter
+    ):
+        response = URLHaus(
+            sentinel.db_session, url_haus_filter=url_haus_filter
+        ).check_url([HASH_2])
+
+        assert response == Any.generator().containing([]).only()
+        URLHausRule.has_matches.assert_not_called()
+
+    def test_check_url_checks_the_db_when_in_the_filter(
+        self, URLHausRule, url_haus_filter
+    ):
+        URLHausRule.has_matches.return_value = True
+
+        response = URLHaus(
+            sentinel.db_session, url_haus_filter=url_haus_filter
+        ).check_url([HASH_2, HASH_1])
+
+        assert response == Any.generator().containing([Reason.MALICIOUS]).only()
+        URLHausRule.has_matches.assert_called_once_with(
+            sentinel.db_session, [HASH_2, HASH_1]
+        )
+
     @httprettified
-    def test_reinitialize_db(self, URLHausRule):
+    def test_reinitialize_db(self, URLHausRule, RuleVersion, RuleIndex):
         httpretty.register_uri(
             httpretty.GET,
             "https://urlhaus.abuse.ch/downloads/csv/",
             body=self.read_fixture("csv.txt.zip"),
         )
 
-        response = URLHaus(sentinel.db_session).reinitialize_db()
+        response = URLHaus(sentinel.db_session, rule_index=True).reinitialize_db()
 
         URLHausRule.delete_all.assert_called_once_with(sentinel.db_session)
-        self.assert_expected_sync(response, URLHausRule)
+        self.assert_expected_sync(response, URLHausRule, RuleVersion, find_added=False)
+        RuleIndex.update.assert_called_once_with(
+            sentinel.db_session, Source.URL_HAUS, None
+        )
+
+    @httprettified
+    def test_reinitialize_db_swapping_tables(
+        self, URLHausRule, RuleVersion, RuleIndex, URLHausFilter, saved_filter
+    ):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv/",
+            body=self.read_fixture("csv.txt.zip"),
+        )
+        calls = MagicMock()
+        calls.attach_mock(URLHausRule.build_shadow, "build_shadow")
+        calls.attach_mock(URLHausRule.swap_shadow, "swap_shadow")
+        calls.attach_mock(RuleIndex.update, "update_rule_index")
+        calls.attach_mock(URLHausFilter.save, "save_filter")
+        calls.attach_mock(RuleVersion.bump, "bump")
+
+        response = URLHaus(
+            sentinel.db_session, filter_settings=FILTER_SETTINGS, rule_index=True
+        ).reinitialize_db(transaction_manager=calls.transaction_manager)
+
+        # The filter is saved with the swap, and the rule index is rebuilt
+        # from the new rules once they're live
+        assert calls.mock_calls == [
+            call.transaction_manager.__enter__(),
+            call.build_shadow(sentinel.db_session, Any.generator()),
+            call.transaction_manager.__exit__(None, None, None),
+            call.transaction_manager.__enter__(),
+            call.swap_shadow(sentinel.db_session),
+            call.save_filter(sentinel.db_session, Any.instance_of(bytes)),
+            call.bump(sentinel.db_session),
+            call.transaction_manager.__exit__(None, None, None),
+            call.transaction_manager.__enter__(),
+            call.update_rule_index(sentinel.db_session, Source.URL_HAUS),
+            call.bump(sentinel.db_session),
+            call.transaction_manager.__exit__(None, None, None),
+        ]
+        URLHausRule.delete_all.assert_not_called()
+        assert response == URLHausRule.build_shadow.return_value
+        assert len(URLHausRule.updated_values) == 2
+        assert len(saved_filter()) == 2
+
+    @httprettified
+    def test_reinitialize_db_swapping_tables_without_a_filter_or_rule_index(
+        self, URLHausRule, RuleVersion, RuleIndex, URLHausFilter
+    ):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv/",
+            body=self.read_fixture("csv.txt.zip"),
+        )
+        transaction_manager = MagicMock()
+
+        URLHaus(sentinel.db_session).reinitialize_db(
+            transaction_manager=transaction_manager
+        )
+
+        assert transaction_manager.__enter__.call_count == 2
+        URLHausRule.swap_shadow.assert_called_once_with(sentinel.db_session)
+        RuleVersion.bump.assert_called_once_with(sentinel.db_session)
+        URLHausFilter.save.assert_not_called()
+        RuleIndex.update.assert_not_called()
+
+    @httprettified
+    def test_reinitialize_db_swapping_tables_builds_a_full_filter_from_the_new_table(
+        self, URLHausRule, CuckooFilter
+    ):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv/",
+            body=self.read_fixture("csv.txt.zip"),
+        )
+        CuckooFilter.return_value.add.side_effect = [FilterFull]
+        URLHausRule.all_hashes.return_value = []
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).reinitialize_db(
+            transaction_manager=MagicMock()
+        )
 
-    def test_partial_update(self, URLHausRule):
+        URLHausRule.all_hashes.assert_called_once_with(
+            sentinel.db_session, table_name=URLHausRule.SHADOW_TABLE
+        )
+
+    def test_partial_update(self, URLHausRule, RuleVersion, RuleIndex):
         httpretty.register_uri(
             httpretty.GET,
             "https://urlhaus.abuse.ch/downloads/csv_recent/",
             body=self.read_fixture("csv.txt"),
         )
 
-        response = URLHaus(sentinel.db_session).update_db()
+        response = URLHaus(sentinel.db_session, rule_index=True).update_db()
 
         URLHausRule.delete_all.assert_not_called()
-        self.assert_expected_sync(response, URLHausRule)
+        self.assert_expected_sync(response, URLHausRule, RuleVersion, find_added=True)
+        RuleIndex.update.assert_called_once_with(
+            sentinel.db_session,
+            Source.URL_HAUS,
+            {
+                "7d93a7a785da3bb7fc67b08cda3368745eb7cf6155e4d8b26415680e69a3f5c6",
+                "f1991c232fda31acdfb50bf118458ddfd31140649218f4774f9c98e50317a59c",
+            },
+        )
+
+    def test_partial_update_removes_replaced_rules_from_the_rule_index(
+        self, URLHausRule, RuleIndex
+    ):
+        URLHausRule.replaced_hashes = ["aa" * 32]
+        self.register_update()
 
-    def assert_expected_sync(self, response, URLHausRule):
-        URLHausRule.bulk_upsert.assert_called_once_with(
-            session=sentinel.db_session, values=Any.generator()
+        URLHaus(sentinel.db_session, rule_index=True).update_db()
+
+        RuleIndex.update.assert_called_once_with(
+            sentinel.db_session,
+            Source.URL_HAUS,
+            {HASH_1, HASH_2, "aa" * 32},
         )
-        assert response == URLHausRule.bulk_upsert.return_value
+
+    @pytest.mark.parametrize("method", ("reinitialize_db", "update_db"))
+    def test_it_leaves_the_rule_index_alone_without_it(
+        self, URLHausRule, RuleIndex, method
+    ):
+        for feed, fixture in (("csv", "csv.txt.zip"), ("csv_recent", "csv.txt")):
+            httpretty.register_uri(
+                httpretty.GET,
+                f"https://urlhaus.abuse.ch/downloads/{feed}/",
+                body=self.read_fixture(fixture),
+            )
+
+        getattr(URLHaus(sentinel.db_session), method)()
+
+        RuleIndex.update.assert_not_called()
+
+    def test_partial_update_only_downloads_changes(self, DownloadValidator):
+        DownloadValidator.load.return_value = {"ETag": '"old"'}
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv_recent/",
+            body=self.read_fixture("csv.txt"),
+            adding_headers={"ETag": '"new"'},
+        )
+
+        URLHaus(sentinel.db_session).update_db()
+
+        DownloadValidator.load.assert_called_once_with(
+            sentinel.db_session, URLHaus.UPDATE_URL
+        )
+        assert httpretty.last_request.headers["If-None-Match"] == '"old"'
+        DownloadValidator.save.assert_called_once_with(
+            sentinel.db_session, URLHaus.UPDATE_URL, {"ETag": '"new"'}
+        )
+
+    def test_partial_update_when_nothing_has_changed(
+        self, URLHausRule, RuleVersion, RuleIndex, URLHausFilter, DownloadValidator
+    ):
+        httpretty.register_uri(
+            httpretty.GET, "https://urlhaus.abuse.ch/downloads/csv_recent/", status=304
+        )
+
+        response = URLHaus(sentinel.db_session).update_db()
+
+        assert response is UNCHANGED
+        URLHausRule.sync.assert_not_called()
+        RuleIndex.update.assert_not_called()
+        URLHausFilter.save.assert_not_called()
+        RuleVersion.bump.assert_not_called()
+        DownloadValidator.save.assert_not_called()
+
+    def test_partial_update_hashing_in_parallel(self, URLHausRule):
+        urls = [f"http://example.com/{i}" for i in range(20)]
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv_recent/",
+            body="".join(f'"{i}","2026-10-18","{url}"\n' for i, url in enumerate(urls)),
+        )
+        url_haus = URLHaus(sentinel.db_session, hash_processes=2)
+        url_haus.HASH_CHUNK_SIZE = 3
+
+        url_haus.update_db()
+
+        # The rules come back in the order we read them
+        assert URLHausRule.updated_values == [
+            {"id": str(i), "rule": rule, "hash": hex_hash}
+            for i, (rule, hex_hash) in enumerate(
+                hash_for_rule(raw_url=url) for url in urls
+            )
+        ]
+
+    @httprettified
+    def test_reinitialize_db_builds_a_new_filter(self, URLHausFilter, saved_filter):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv/",
+            body=self.read_fixture("csv.txt.zip"),
+        )
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).reinitialize_db()
+
+        URLHausFilter.load.assert_not_called()
+        assert len(saved_filter()) == 2
+        assert bytes.fromhex(HASH_1) in saved_filter()
+        assert bytes.fromhex(HASH_2) in saved_filter()
+
+    @httprettified
+    def test_partial_update_adds_new_rules_to_the_stored_filter(
+        self, URLHausRule, URLHausFilter, url_haus_filter, saved_filter
+    ):
+        URLHausFilter.load.return_value = url_haus_filter.to_bytes()
+        # Another rule with a hash already in the filter still gets an entry
+        URLHausRule.added_hashes = [HASH_1, HASH_2]
+        self.register_update()
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).update_db()
+
+        URLHausFilter.load.assert_called_once_with(sentinel.db_session)
+        assert len(saved_filter()) == 3
+        assert bytes.fromhex(HASH_2) in saved_filter()
+
+    @httprettified
+    def test_partial_update_removes_replaced_rules_from_the_stored_filter(
+        self, URLHausRule, URLHausFilter, url_haus_filter, saved_filter
+    ):
+        url_haus_filter.add(bytes.fromhex(HASH_1))
+        URLHausFilter.load.return_value = url_haus_filter.to_bytes()
+        URLHausRule.added_hashes = [HASH_2]
+        URLHausRule.replaced_hashes = [HASH_1]
+        self.register_update()
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).update_db()
+
+        assert len(saved_filter()) == 2
+        # The other rule with the same hash is still there
+        assert bytes.fromhex(HASH_1) in saved_filter()
+        assert bytes.fromhex(HASH_2) in saved_filter()
+
+    @httprettified
+    def test_partial_update_builds_a_filter_if_there_is_none(
+        self, URLHausRule, URLHausFilter, saved_filter
+    ):
+        URLHausFilter.load.return_value = None
+        URLHausRule.all_hashes.return_value = [HASH_1, HASH_1]
+        URLHausRule.added_hashes = [HASH_2]
+        self.register_update()
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).update_db()
+
+        URLHausRule.all_hashes.assert_called_once_with(
+            sentinel.db_session, table_name=None
+        )
+        # There's an entry for each rule
+        assert len(saved_filter()) == 3
+
+    @httprettified
+    def test_partial_update_rebuilds_a_full_filter(
+        self, URLHausRule, URLHausFilter, saved_filter, CuckooFilter
+    ):
+        CuckooFilter.from_bytes.return_value.add.side_effect = FilterFull
+        URLHausRule.all_hashes.return_value = [HASH_1] * 6
+        URLHausRule.added_hashes = [HASH_1, HASH_2]
+        self.register_update()
+
+        URLHaus(sentinel.db_session, filter_settings=FILTER_SETTINGS).update_db()
+
+        # We give up on the first failure
+        CuckooFilter.from_bytes.return_value.add.assert_called_once()
+        CuckooFilter.assert_called_once_with(capacity=12, fingerprint_bits=12)
+        assert (
+            CuckooFilter.return_value.add.call_args_list
+            == [call(bytes.fromhex(HASH_1))] * 6
+        )
+        URLHausFilter.save.assert_called_once_with(
+            sentinel.db_session, CuckooFilter.return_value.to_bytes.return_value
+        )
+
+    @httprettified
+    def test_partial_update_without_a_filter(self, URLHausFilter):
+        self.register_update()
+
+        URLHaus(sentinel.db_session).update_db()
+
+        URLHausFilter.load.assert_not_called()
+        URLHausFilter.save.assert_not_called()
+
+    def register_update(self):
+        httpretty.register_uri(
+            httpretty.GET,
+            "https://urlhaus.abuse.ch/downloads/csv_recent/",
+            body=self.read_fixture("csv.txt"),
+        )
+
+    def assert_expected_sync(self, response, URLHausRule, RuleVersion, find_added):
+        URLHausRule.sync.assert_called_once_with(
+            sentinel.db_session, Any.generator(), find_added=find_added
+        )
+        RuleVersion.bump.assert_called_once_with(sentinel.db_session)
+        assert response == sentinel.synced
         assert URLHausRule.updated_values == [
             {
                 "hash": "7d93a7a785da3bb7fc67b08cda3368745eb7cf6155e4d8b26415680e69a3f5c6",
@@ -77,6 +387,47 @@ class TestURLHaus:
             importlib_resources.files("tests.unit.checkmate.checker.url.fixture") / name
         ).read_bytes()
 
+    @pytest.fixture
+    def url_haus_filter(self):
+        url_haus_filter = CuckooFilter(**FILTER_SETTINGS)
+        url_haus_filter.add(bytes.fromhex(HASH_1))
+
+        return url_haus_filter
+
+    @pytest.fixture
+    def saved_filter(self, URLHausFilter):
+        def saved_filter():
+            URLHausFilter.save.assert_called_once_with(
+                sentinel.db_session, Any.instance_of(bytes)
+            )
+
+            return CuckooFilter.from_bytes(URLHausFilter.save.call_args[0][1])
+
+        return saved_filter
+
+    @pytest.fixture
+    def CuckooFilter(self, patch):
+        return patch("checkmate.checker.url.url_haus.CuckooFilter")
+
+    @pytest.fixture(autouse=True)
+    def URLHausFilter(self, patch):
+        return patch("checkmate.checker.url.url_haus.URLHausFilter")
+
+    @pytest.fixture(autouse=True)
+    def DownloadValidator(self, patch):
+        DownloadValidator = patch("checkmate.checker.url.url_haus.DownloadValidator")
+        DownloadValidator.load.return_value = {}
+
+        return DownloadValidator
+
+    @pytest.fixture(autouse=True)
+    def RuleVersion(self, patch):
+        return patch("checkmate.checker.url.url_haus.RuleVersion")
+
+    @pytest.fixture(autouse=True)
+    def RuleIndex(self, patch):
+        return patch("checkmate.checker.url.url_haus.RuleIndex")
+
     @pytest.fixture(autouse=True)
     def URLHausRule(self, patch):
         URLHausRule = patch("checkmate.checker.url.url_haus.URLHausRule")
@@ -87,10 +438,29 @@ class TestURLHaus:
         def exhaust(
             session,  # pylint:disable=unused-argument
             values,
+            find_added,  # pylint:disable=unused-argument
         ):
             URLHausRule.updated_values = list(values)
-            return URLHausRule.bulk_upsert.return_value
+            return (
+                sentinel.synced,
+                URLHausRule.added_hashes,
+                URLHausRule.replaced_hashes,
+            )
 
-        URLHausRule.bulk_upsert.side_effect = exhaust
+        URLHausRule.added_hashes = []
+        URLHausRule.replaced_hashes = []
+        URLHausRule.sync.side_effect = exhaust
+
+        def exhaust_into_shadow(
+            session,  # pylint:disable=unused-argument
+            values,
+        ):
+            URLHausRule.updated_values = list(values)
+            return URLHausRule.build_shadow.return_value
+
+        URLHausRule.build_shadow.side_effect = exhaust_into_shadow
 
         return URLHausRule
+
+
+FILTER_SETTINGS = {"capacity": 5, "fingerprint_bits": 12}
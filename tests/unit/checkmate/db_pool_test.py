@@ -0,0 +1,133 @@
+import pytest
+import sqlalchemy as sa
+
+from checkmate.db_pool import (
+    InstrumentedQueuePool,
+    connect_args,
+    pool_metrics,
+    pool_options,
+)
+
+
+class TestInstrumentedQueuePool:
+    def test_it_counts_checkouts(self, engine):
+        with engine.connect():
+            metrics = engine.pool.metrics()
+
+        assert metrics == {
+            "size": 1,
+            "checked_in": 0,
+            "checked_out": 1,
+            "overflow": 0,
+            "checkouts": 1,
+            "failures": 0,
+            "timeouts": 0,
+            "wait_seconds_total": pytest.approx(metrics["wait_seconds_max"]),
+            "wait_seconds_max": metrics["wait_seconds_max"],
+        }
+        assert metrics["wait_seconds_max"] > 0
+        assert engine.pool.metrics()["checked_in"] == 1
+
+    def test_it_counts_timeouts(self, engine):
+        with engine.connect():
+            with pytest.raises(sa.exc.TimeoutError):
+                engine.connect()
+
+        metrics = engine.pool.metrics()
+        assert metrics["failures"] == 1
+        assert metrics["timeouts"] == 1
+
+    def test_it_counts_other_failures(self, db_engine):
+        engine = sa.create_engine(
+            db_engine.url.set(port=1), poolclass=InstrumentedQueuePool
+        )
+
+        with pytest.raises(sa.exc.OperationalError):
+            engine.connect()
+
+        assert engine.pool.metrics()["failures"] == 1
+        assert not engine.pool.metrics()["timeouts"]
+
+    def test_it_keeps_counting_when_recreated(self, engine):
+        with engine.connect():
+            pass
+
+        engine.dispose()
+
+        assert engine.pool.metrics()["checkouts"] == 1
+
+    @pytest.fixture
+    def engine(self, db_engine):
+        engine = sa.create_engine(
+            db_engine.url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.01,
+        )
+        yield engine
+        engine.dispose()
+
+
+class TestPoolOptions:
+    def test_defaults(self):
+        assert pool_options({}) == {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": 5,
+            "max_overflow": 10,
+            "pool_timeout": 30,
+            "pool_recycle": -1,
+            "pool_pre_ping": False,
+        }
+
+    def test_it_reads_settings(self):
+        assert pool_options(
+            {
+                "database_pool_size": "2",
+                "database_pool_max_overflow": "3",
+                "database_pool_timeout": "1.5",
+                "database_pool_recycle": "3600",
+                "database_pool_pre_ping": "true",
+            }
+        ) == {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": 2,
+            "max_overflow": 3,
+            "pool_timeout": 1.5,
+            "pool_recycle": 3600,
+            "pool_pre_ping": True,
+        }
+
+
+class TestConnectArgs:
+    def test_defaults(self):
+        assert connect_args({}) == {}
+
+    def test_it_sets_a_statement_timeout(self, db_engine):
+        engine = sa.create_engine(
+            db_engine.url,
+            connect_args=connect_args({"check_statement_timeout": "250"}),
+        )
+
+        with engine.connect() as connection:
+            timeout = connection.execute(sa.text("SHOW statement_timeout")).scalar()
+
+        engine.dispose()
+        assert timeout == "250ms"
+
+    def test_it_sets_a_statement_timeout_for_asyncpg(self):
+        assert connect_args({"check_statement_timeout": "250"}, async_driver=True) == {
+            "server_settings": {"statement_timeout": "250"}
+        }
+
+
+class TestPoolMetrics:
+    def test_it(self, db_engine):
+        engine = sa.create_engine(db_engine.url, poolclass=InstrumentedQueuePool)
+
+        assert pool_metrics(engine) == engine.pool.metrics()
+
+    def test_it_with_another_pool(self, db_engine):
+        engine = sa.create_engine(db_engine.url, poolclass=sa.pool.NullPool)
+
+        assert pool_metrics(engine) is None
@@ -0,0 +1,140 @@
+import logging
+from unittest.mock import Mock, patch
+
+import pytest
+import sqlalchemy as sa
+
+from checkmate.db_replicas import ReplicaRouter
+
+
+class TestReplicaRouter:
+    def test_it_uses_the_primary_for_writes(self, router, primary):
+        assert router.engine() == primary
+
+    def test_it_takes_turns_between_replicas_for_reads(self, router, replicas):
+        engines = [router.engine(read_only=True) for _ in range(4)]
+
+        assert engines == replicas + replicas
+
+    def test_it_uses_the_primary_for_reads_without_replicas(self, primary):
+        router = ReplicaRouter(primary)
+
+        assert router.engine(read_only=True) == primary
+
+    def test_it_reads_from_the_primary_after_a_write(self, router, primary):
+        with primary.begin() as connection:
+            connection.execute(sa.text("CREATE TEMPORARY TABLE test (id INT)"))
+            connection.execute(sa.insert(sa.table("test", sa.column("id"))), {"id": 1})
+
+        assert router.engine(read_only=True) == primary
+
+    def test_it_reads_from_replicas_once_they_have_caught_up(
+        self, primary, replicas, time
+    ):
+        router = ReplicaRouter(primary, replicas, stale_after=5)
+        time.monotonic.return_value = 100
+        router._on_commit(  # pylint:disable=protected-access
+            Mock(info={ReplicaRouter._WROTE: True})  # pylint:disable=protected-access
+        )
+
+        time.monotonic.return_value = 105
+
+        assert router.engine(read_only=True) in replicas
+
+    def test_it_ignores_reads_and_rolled_back_writes(self, router, primary):
+        with primary.connect() as connection:
+            connection.execute(sa.select(1))
+            connection.commit()
+
+            with connection.begin():
+                connection.execute(sa.text("CREATE TEMPORARY TABLE test (id INT)"))
+                connection.execute(
+                    sa.insert(sa.table("test", sa.column("id"))), {"id": 1}
+                )
+                connection.rollback()
+
+        assert router.engine(read_only=True) != primary
+
+    def test_check_health(self, router, replicas, broken_replica):
+        router.replicas.append(broken_replica)
+
+        router.check_health()
+
+        assert router.metrics() == {
+            "replicas": 3,
+            "healthy": 2,
+            "pools": [None, None, None],
+        }
+        assert broken_replica not in [router.engine(read_only=True) for _ in range(4)]
+
+    def test_it_uses_the_primary_if_no_replicas_are_healthy(
+        self, primary, broken_replica
+    ):
+        router = ReplicaRouter(primary, [broken_replica])
+
+        router.check_health()
+
+        assert router.engine(read_only=True) == primary
+
+    def test_it_checks_health_in_the_background(self, router, Thread):
+        router.engine(read_only=True)
+        router.engine(read_only=True)
+
+        Thread.assert_called_once_with(
+            target=router._run,  # pylint:disable=protected-access
+            name="replica-health",
+            daemon=True,
+        )
+        Thread.return_value.start.assert_called_once_with()
+
+    def test_it_checks_health_until_stopped(self, router):
+        with patch.object(
+            router, "check_health", side_effect=router.stop
+        ) as check_health:
+            router._run()  # pylint:disable=protected-access
+
+        check_health.assert_called_once_with()
+
+    def test_it_logs_health_check_errors(self, router, caplog):
+        def check_health():
+            router.stop()
+            raise ValueError("Oh no")
+
+        with patch.object(router, "check_health", side_effect=check_health):
+            with caplog.at_level(logging.ERROR):
+                router._run()  # pylint:disable=protected-access
+
+        assert "Could not check the replicas" in caplog.text
+
+    @pytest.fixture
+    def primary(self, db_engine):
+        engine = sa.create_engine(db_engine.url)
+        yield engine
+        engine.dispose()
+
+    @pytest.fixture
+    def replicas(self, db_engine):
+        engines = [sa.create_engine(db_engine.url) for _ in range(2)]
+        yield engines
+        for engine in engines:
+            engine.dispose()
+
+    @pytest.fixture
+    def broken_replica(self, db_engine):
+        engine = sa.create_engine(db_engine.url.set(port=1))
+        yield engine
+        engine.dispose()
+
+    @pytest.fixture
+    def router(self, primary, replicas):
+        router = ReplicaRouter(primary, replicas, health_check_interval=60)
+        yield router
+        router.stop()
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.db_replicas.Thread")
+
+    @pytest.fixture
+    def time(self, patch):
+        return patch("checkmate.db_replicas.time")
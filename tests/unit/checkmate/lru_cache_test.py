@@ -0,0 +1,78 @@
+import pytest
+
+from checkmate.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    def test_get_and_set(self):
+        cache = LRUCache(max_size=2)
+
+        cache.set("key", "value")
+
+        assert cache.get("key") == "value"
+        assert cache.get("missing", "default") == "default"
+        assert len(cache) == 1
+
+    def test_it_discards_the_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_items_expire(self, monotonic):
+        cache = LRUCache(max_size=2, ttl=10)
+        monotonic.return_value = 100
+        cache.set("key", "value")
+
+        monotonic.return_value = 109
+        assert cache.get("key") == "value"
+
+        monotonic.return_value = 110
+        assert cache.get("key") is None
+        assert not cache
+
+    def test_clear(self):
+        cache = LRUCache(max_size=2)
+        cache.set("key", "value")
+
+        cache.clear()
+
+        assert cache.get("key") is None
+
+    def test_the_lock_can_be_held_around_calls(self):
+        cache = LRUCache(max_size=2)
+
+        with cache.lock:
+            cache.set("key", "value")
+
+            assert cache.get("key") == "value"
+
+    def test_metrics(self):
+        cache = LRUCache(max_size=1)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.get("b")
+
+        assert cache.metrics() == {
+            "size": 1,
+            "max_size": 1,
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5,
+            "evictions": 1,
+        }
+
+    def test_metrics_when_unused(self):
+        assert LRUCache(max_size=1).metrics()["hit_ratio"] is None
+
+    @pytest.fixture
+    def monotonic(self, patch):
+        return patch("checkmate.lru_cache.monotonic")
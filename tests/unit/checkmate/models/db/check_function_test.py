@@ -0,0 +1,70 @@
+import pytest
+import sqlalchemy as sa
+from checkmatelib.url import hash_for_rule, hash_url
+from h_matchers import Any
+
+from checkmate.models import CheckFunction, Detection, Reason, Source, URLHausRule
+from checkmate.services import URLCheckerService
+from tests import factories
+
+
+class TestCheckFunction:
+    def test_it(self, db_session):
+        detections = CheckFunction.check(
+            db_session, hash_url("http://sub.blocked.example.com"), fail_fast=False
+        )
+
+        assert detections == [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS),
+            Detection(Reason.HIGH_IO, Source.BLOCK_LIST),
+            Detection(Reason.OTHER, Source.BLOCK_LIST),
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST),
+        ]
+
+    @pytest.mark.parametrize(
+        "url",
+        (
+            "http://sub.blocked.example.com",
+            "http://blocked.example.com",
+            "http://allowed.example.com",
+            "http://example.com",
+        ),
+    )
+    @pytest.mark.parametrize("allow_all", (True, False))
+    @pytest.mark.parametrize("fail_fast", (True, False))
+    @pytest.mark.parametrize(
+        "ignore_reasons", ([], [Reason.MALICIOUS], [Reason.NOT_ALLOWED, Reason.OTHER])
+    )
+    def test_it_matches_the_url_checker(
+        self, db_session, url, allow_all, fail_fast, ignore_reasons
+    ):
+        options = {
+            "allow_all": allow_all,
+            "fail_fast": fail_fast,
+            "ignore_reasons": ignore_reasons,
+        }
+
+        detections = CheckFunction.check(db_session, hash_url(url), **options)
+
+        assert (
+            detections
+            == Any.list.containing(
+                list(URLCheckerService(db_session).check_url(url, **options))
+            ).only()
+        )
+
+    def test_it_can_be_called_from_sql(self, db_session):
+        rows = db_session.execute(
+            sa.text("SELECT * FROM checkmate_check(:hashes)"),
+            {"hashes": list(hash_url("http://example.com"))},
+        ).all()
+
+        assert rows == [("allow_list", "not-explicitly-allowed")]
+
+    @pytest.fixture(autouse=True)
+    def rules(self, db_session):
+        factories.CustomRule(url="http://blocked.example.com", tags=["high-io", "???"])
+        factories.AllowRule(url="http://allowed.example.com")
+        rule, hex_hash = hash_for_rule("http://sub.blocked.example.com")
+        db_session.add(URLHausRule(id=1, rule=rule, hash=hex_hash))
+        db_session.flush()
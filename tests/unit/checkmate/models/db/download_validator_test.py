@@ -0,0 +1,23 @@
+from checkmate.models import DownloadValidator
+
+
+class TestDownloadValidator:
+    def test_defaults_when_empty(self, db_session):
+        assert DownloadValidator.load(db_session, "http://example.com") == {}
+
+    def test_save(self, db_session):
+        DownloadValidator.save(
+            db_session,
+            "http://example.com",
+            {"ETag": '"abc"', "Last-Modified": "Sun, 18 Oct 2026 12:00:00 GMT"},
+        )
+        assert DownloadValidator.load(db_session, "http://example.com") == {
+            "ETag": '"abc"',
+            "Last-Modified": "Sun, 18 Oct 2026 12:00:00 GMT",
+        }
+
+        DownloadValidator.save(db_session, "http://example.com", {"ETag": '"def"'})
+        assert DownloadValidator.load(db_session, "http://example.com") == {
+            "ETag": '"def"'
+        }
+        assert DownloadValidator.load(db_session, "http://example.net") == {}
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+import pytest
+import sqlalchemy as sa
+from h_matchers import Any
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from checkmate.exceptions import SlowLookup
+from checkmate.models import CustomRule, URLHausRule
+from checkmate.models.db.lookup_plans import LOOKUPS, find_scans, verify_lookup_plans
+
+
+class TestFindScans:
+    def test_it(self, db_session):
+        assert find_scans(db_session) == {
+            # Only the partition which could hold the hash is read
+            "url_haus": [
+                (Any.string.matching(r"^urlhaus_rule_p\d$"), "Index Only Scan")
+            ],
+            "block_list": [("custom_rule", "Index Only Scan")],
+            "allow_list": [("allow_rule", "Index Only Scan")],
+            "rule_index": [("rule_index", "Index Only Scan")],
+        }
+
+    def test_url_haus_lookups_only_read_partitions_for_server_side_parameters(
+        self, db_session
+    ):
+        # asyncpg sends the parameters separately from the SQL, so the DB can
+        # plan the lookup once without the values and reuse the plan. The
+        # partitions to read must still be chosen once the values are known
+        hex_hashes = ["00" * 32, "01" * 32]
+        sql = (
+            URLHausRule.exists_statement()
+            .params(hex_hashes=hex_hashes)
+            .compile(
+                dialect=asyncpg.dialect(), compile_kwargs={"render_postcompile": True}
+            )
+        )
+        connection = db_session.connection()
+        connection.execute(sa.text("SET LOCAL plan_cache_mode = force_generic_plan"))
+        connection.exec_driver_sql(f"PREPARE url_haus_lookup AS {sql}")
+
+        try:
+            plan = connection.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) EXECUTE url_haus_lookup(1, %s, %s)",
+                tuple(bytes.fromhex(hex_hash) for hex_hash in hex_hashes),
+            ).scalar()
+        finally:
+            connection.exec_driver_sql("DEALLOCATE url_haus_lookup")
+
+        append = plan[0]["Plan"]["Plans"][0]
+        assert append["Subplans Removed"] == 6
+        assert [scan["Relation Name"] for scan in append["Plans"]] == [
+            Any.string.matching(r"^urlhaus_rule_p\d$")
+        ] * 2
+
+
+class TestVerifyLookupPlans:
+    def test_it_passes_with_our_indexes(self, db_session):
+        verify_lookup_plans(db_session)
+
+    def test_it_raises_if_a_lookup_reads_a_table(self, db_session):
+        # The rule itself isn't included in any index
+        with patch.dict(
+            LOOKUPS,
+            {"block_list": lambda: CustomRule.matching_statement(CustomRule.rule)},
+        ):
+            with pytest.raises(SlowLookup, match="block_list reads custom_rule"):
+                verify_lookup_plans(db_session)
+
+    def test_it_checks_scans_it_is_given(self, db_session):
+        scans = {"block_list": [("custom_rule", "Seq Scan")]}
+
+        with pytest.raises(SlowLookup, match="block_list reads custom_rule"):
+            verify_lookup_plans(db_session, scans)
@@ -1,12 +1,19 @@
+from functools import partial
 from unittest.mock import sentinel
 
 import pytest
 import sqlalchemy as sa
 from h_matchers import Any
+from sqlalchemy.dialects.postgresql import asyncpg
 
 from checkmate.db import Base
 from checkmate.models.db.mixins import BulkUpsertMixin, HashMatchMixin
 
+HASH_1 = "01" * 32
+HASH_2 = "02" * 32
+HASH_3 = "03" * 32
+HASH_4 = "04" * 32
+
 
 class TestHashMatchMixin:
     class TableWithHash(Base, HashMatchMixin):
@@ -15,35 +22,133 @@ class TestHashMatchMixin:
         id = sa.Column(sa.Integer, autoincrement=True, primary_key=True)
         hash = HashMatchMixin.hash_column()
 
+    class TableWithPartitions(Base, HashMatchMixin):
+        __tablename__ = "test_table_with_partitions"
+
+        HASH_PARTITIONED = True
+
+        id = sa.Column(sa.Integer, autoincrement=True, primary_key=True)
+        hash = HashMatchMixin.hash_column()
+
     def test_it_retrieves_all(self, db_session):
-        items = self.TableWithHash.find_matches(
-            db_session, hex_hashes=["hash_1", "hash_3"]
-        )
+        items = self.TableWithHash.find_matches(db_session, hex_hashes=[HASH_1, HASH_3])
         assert [item.hash for item in items] == Any.list().containing(
-            ["hash_1", "hash_3"]
+            [HASH_1, HASH_3]
         ).only()
 
     def test_it_with_limit(self, db_session):
         items = self.TableWithHash.find_matches(
-            db_session, hex_hashes=["hash_1", "hash_3"], limit=1
+            db_session, hex_hashes=[HASH_1, HASH_3], limit=1
         )
         assert items.count() == 1
-        assert items[0].hash in ["hash_1", "hash_3"]
+        assert items[0].hash in [HASH_1, HASH_3]
+
+    @pytest.mark.parametrize(
+        "hex_hashes,expected",
+        (([HASH_1, HASH_4], True), ([HASH_4], False), ([], False)),
+    )
+    def test_has_matches(self, db_session, hex_hashes, expected):
+        assert self.TableWithHash.has_matches(db_session, hex_hashes) == expected
+
+    def test_find_matching_values(self, db_session):
+        values = self.TableWithHash.find_matching_values(
+            db_session, self.TableWithHash.hash, [HASH_1, HASH_3, HASH_4]
+        )
+
+        assert list(values) == Any.list.containing([HASH_1, HASH_3]).only()
+
+    def test_find_matching_rows(self, db_session):
+        rows = self.TableWithHash.find_matching_rows(
+            db_session,
+            [self.TableWithHash.hash, self.TableWithHash.id],
+            [HASH_2, HASH_4],
+        )
+
+        assert [tuple(row) for row in rows] == [(HASH_2, Any.int())]
+
+    @pytest.mark.parametrize(
+        "statement,same_sql",
+        (
+            (TableWithHash.exists_statement, True),
+            (partial(TableWithHash.matching_statement, TableWithHash.id), True),
+            # Each hash is sent on its own, so partitions can be skipped
+            (TableWithPartitions.exists_statement, False),
+        ),
+    )
+    def test_lookups_have_the_same_sql_for_any_number_of_hashes(
+        self, statement, same_sql
+    ):
+        # As they would be sent to the DB with server-side parameters
+        def sql(hex_hashes):
+            return str(
+                statement()
+                .params(hex_hashes=hex_hashes)
+                .compile(
+                    dialect=asyncpg.dialect(),
+                    compile_kwargs={"render_postcompile": True},
+                )
+            )
+
+        assert (sql([HASH_1]) == sql([HASH_1, HASH_2])) == same_sql
+
+    @pytest.mark.parametrize("table", ("TableWithHash", "TableWithPartitions"))
+    def test_has_matches_with_either_kind_of_table(self, db_session, table):
+        assert getattr(self, table).has_matches(db_session, [HASH_1, HASH_4])
+
+    def test_hash_in(self, db_session):
+        hashes = db_session.scalars(
+            sa.select(self.TableWithHash.hash).where(
+                self.TableWithHash.hash_in([HASH_2, HASH_4])
+            )
+        )
+
+        assert list(hashes) == [HASH_2]
+
+    def test_it_stores_hashes_as_bytes(self, db_session):
+        digests = db_session.scalars(sa.select(self.TableWithHash.hash_digest()))
+
+        assert sorted(digests) == [
+            bytes.fromhex(HASH_1),
+            bytes.fromhex(HASH_2),
+            bytes.fromhex(HASH_3),
+        ]
+
+    def test_hash_prefix_condition(self, db_session):
+        matching = ["abff" + "00" * 30, "ab" + "ff" * 31, "ff" * 32, "fff0" * 16]
+        db_session.add_all(
+            [
+                self.TableWithHash(hash=hex_hash)
+                for hex_hash in matching + ["ac" + "00" * 31, "aa" + "ff" * 31]
+            ]
+        )
+
+        hashes = db_session.scalars(
+            sa.select(self.TableWithHash.hash).where(
+                # Prefixes of an odd length only match half a byte
+                self.TableWithHash.hash_prefix_condition(["ab", "fff", HASH_2])
+            )
+        )
+
+        assert list(hashes) == Any.list.containing(matching + [HASH_2]).only()
 
     @pytest.fixture(autouse=True, scope="class")
     def create_test_table_with_hash(self, db_engine):
-        self.TableWithHash.__table__.drop(db_engine, checkfirst=True)
-        self.TableWithHash.__table__.create(db_engine)
+        tables = [self.TableWithHash.__table__, self.TableWithPartitions.__table__]
+        for table in tables:
+            table.drop(db_engine, checkfirst=True)
+            table.create(db_engine)
         yield
-        self.TableWithHash.__table__.drop(db_engine)
+        for table in tables:
+            table.drop(db_engine)
 
     @pytest.fixture(autouse=True)
     def hashes(self, db_session):
         db_session.add_all(
             [
-                self.TableWithHash(hash="hash_1"),
-                self.TableWithHash(hash="hash_2"),
-                self.TableWithHash(hash="hash_3"),
+                self.TableWithHash(hash=HASH_1),
+                self.TableWithHash(hash=HASH_2),
+                self.TableWithHash(hash=HASH_3),
+                self.TableWithPartitions(hash=HASH_1),
             ]
         )
 
@@ -62,7 +167,8 @@ class TestBulkUpsertMixin:
 
     # Vary the block size to catch an exact multiple and multiple blocks
     @pytest.mark.parametrize("block_size", [2, 3])
-    def test_it_can_be_upserted(self, db_session, block_size):
+    @pytest.mark.parametrize("with_copy", [False, True])
+    def test_it_can_be_upserted(self, db_session, block_size, with_copy):
         db_session.add_all(
             [
                 self.TableWithBulkUpsert(id=1, name="pre_existing_1", other="pre_1"),
@@ -71,6 +177,7 @@ class TestBulkUpsertMixin:
         )
         db_session.flush()
         self.TableWithBulkUpsert.BLOCK_SIZE = block_size
+        self.TableWithBulkUpsert.BULK_UPSERT_WITH_COPY = with_copy
 
         result = self.TableWithBulkUpsert.bulk_upsert(
             db_session,
@@ -102,6 +209,63 @@ class TestBulkUpsertMixin:
             .only()
         )
 
+    @pytest.mark.usefixtures("with_copy")
+    def test_copy_reads_values_as_they_are_needed(self, db_session):
+        values = ({"id": i, "name": f"name_{i}", "other": None} for i in range(10000))
+
+        result = self.TableWithBulkUpsert.bulk_upsert(db_session, values)
+
+        assert result == 10000
+        assert db_session.query(self.TableWithBulkUpsert).count() == 10000
+
+    @pytest.mark.usefixtures("with_copy")
+    def test_copy_keeps_the_last_of_any_duplicates(self, db_session):
+        result = self.TableWithBulkUpsert.bulk_upsert(
+            db_session,
+            [{"id": 1, "name": "first"}, {"id": 1, "name": "last"}],
+        )
+
+        assert result == 2
+        assert db_session.query(self.TableWithBulkUpsert.name).all() == [("last",)]
+
+    @pytest.mark.usefixtures("with_copy")
+    @pytest.mark.parametrize(
+        "name", ["", 'with "quotes"', "with, comma", "with\nnewline", "\\N", None]
+    )
+    def test_copy_keeps_values_intact(self, db_session, name):
+        self.TableWithBulkUpsert.bulk_upsert(db_session, [{"id": 1, "name": name}])
+
+        assert db_session.query(self.TableWithBulkUpsert.name).scalar() == name
+
+    @pytest.mark.usefixtures("with_copy")
+    def test_copy_with_no_values(self, db_session):
+        assert not self.TableWithBulkUpsert.bulk_upsert(db_session, iter([]))
+
+    def test_it_can_be_loaded_into_a_copy_of_the_table(self, db_session):
+        db_session.execute(
+            sa.text("CREATE TABLE test_table_copy (LIKE test_table_with_bulk_upsert)")
+        )
+
+        result = self.TableWithBulkUpsert.bulk_load(
+            db_session,
+            [
+                {"id": 1, "name": "first", "other": "other_1"},
+                {"id": 2, "name": "name_2", "other": "other_2"},
+                {"id": 1, "name": "last", "other": "other_1"},
+            ],
+            "test_table_copy",
+        )
+
+        assert result == 3
+        assert db_session.execute(
+            sa.text("SELECT id, name, other FROM test_table_copy ORDER BY id")
+        ).all() == [(1, "last", "other_1"), (2, "name_2", "other_2")]
+
+    def test_loading_no_values(self, db_session):
+        assert not self.TableWithBulkUpsert.bulk_load(
+            db_session, iter([]), sentinel.table_name
+        )
+
     def test_it_fails_with_badly_configured_host_class(self):
         class BadTable(Base, BulkUpsertMixin):
             __tablename__ = "bad_table"
@@ -110,6 +274,12 @@ class TestBulkUpsertMixin:
         with pytest.raises(NotImplementedError):
             BadTable.bulk_upsert(sentinel.session, [{}])
 
+    @pytest.fixture
+    def with_copy(self):
+        self.TableWithBulkUpsert.BULK_UPSERT_WITH_COPY = True
+        yield
+        self.TableWithBulkUpsert.BULK_UPSERT_WITH_COPY = False
+
     @pytest.fixture(autouse=True, scope="class")
     def create_test_table_with_bulk_upsert(self, db_engine):
         self.TableWithBulkUpsert.__table__.drop(db_engine, checkfirst=True)
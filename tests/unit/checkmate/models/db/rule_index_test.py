@@ -0,0 +1,111 @@
+import pytest
+import sqlalchemy as sa
+from checkmatelib.url import hash_for_rule
+
+from checkmate.models import AllowRule, Reason, RuleIndex, Source, URLHausRule
+from tests import factories
+
+
+class TestRuleIndex:
+    def test_update(self, db_session):
+        db_session.add_all(
+            [
+                URLHausRule(id=1, rule="example.com/1", hash=HASH_1),
+                URLHausRule(id=2, rule="example.com/2", hash=HASH_1),
+                URLHausRule(id=3, rule="example.com/3", hash=HASH_2),
+            ]
+        )
+        db_session.flush()
+
+        RuleIndex.update(db_session, Source.URL_HAUS)
+
+        assert self.entries(db_session) == {
+            (HASH_1, "url_haus"),
+            (HASH_2, "url_haus"),
+        }
+
+    def test_update_with_hashes(self, db_session):
+        db_session.add(URLHausRule(id=1, rule="example.com/1", hash=HASH_1))
+        db_session.flush()
+        RuleIndex.update(db_session, Source.URL_HAUS)
+        db_session.query(URLHausRule).delete()
+        db_session.add(URLHausRule(id=2, rule="example.com/2", hash=HASH_2))
+        db_session.add(URLHausRule(id=3, rule="example.com/3", hash=HASH_3))
+        db_session.flush()
+
+        RuleIndex.update(db_session, Source.URL_HAUS, [HASH_1, HASH_2])
+
+        # The deleted hash is removed, and the one we didn't ask for isn't added
+        assert self.entries(db_session) == {(HASH_2, "url_haus")}
+
+    def test_update_in_chunks(self, db_session):
+        RuleIndex.CHUNK_SIZE = 1
+        db_session.add(AllowRule(rule="example.com/1", hash=HASH_1))
+        db_session.add(AllowRule(rule="example.com/2", hash=HASH_2))
+        db_session.flush()
+
+        RuleIndex.update(db_session, Source.ALLOW_LIST, [HASH_1, HASH_2, HASH_3])
+
+        assert self.entries(db_session) == {
+            (HASH_1, "allow_list"),
+            (HASH_2, "allow_list"),
+        }
+
+    @pytest.mark.usefixtures("rules")
+    def test_rebuild(self, db_session):
+        db_session.add(RuleIndex(hash=HASH_3, source="url_haus"))
+        db_session.flush()
+
+        RuleIndex.rebuild(db_session)
+
+        assert self.entries(db_session) == {
+            # The tags are kept in the same order as the rule has them
+            (
+                hash_for_rule("http://blocked.example.com")[1],
+                "block_list",
+                "high-io",
+                "media-video",
+            ),
+            (
+                hash_for_rule("http://unknown.example.com")[1],
+                "block_list",
+                " unknown ",
+            ),
+            (
+                hash_for_rule("http://untagged.example.com")[1],
+                "block_list",
+            ),
+            (HASH_1, "url_haus"),
+            (HASH_2, "allow_list"),
+        }
+
+    def entries(self, db_session):
+        return {
+            (hex_hash, source, *(tags or ()))
+            for hex_hash, source, tags in db_session.execute(
+                sa.select(RuleIndex.hash, RuleIndex.source, RuleIndex.tags)
+            )
+        }
+
+    @pytest.fixture
+    def rules(self, db_session):
+        factories.CustomRule(
+            url="http://blocked.example.com",
+            reasons=[Reason.HIGH_IO, Reason.MEDIA_VIDEO],
+        )
+        factories.CustomRule(url="http://unknown.example.com", tags=[" unknown "])
+        factories.CustomRule(url="http://untagged.example.com", tags=None)
+        db_session.add(URLHausRule(id=1, rule="example.com/1", hash=HASH_1))
+        db_session.add(AllowRule(rule="example.com/2", hash=HASH_2))
+        db_session.flush()
+
+    @pytest.fixture(autouse=True)
+    def chunk_size(self):
+        chunk_size = RuleIndex.CHUNK_SIZE
+        yield
+        RuleIndex.CHUNK_SIZE = chunk_size
+
+
+HASH_1 = "01" * 32
+HASH_2 = "02" * 32
+HASH_3 = "03" * 32
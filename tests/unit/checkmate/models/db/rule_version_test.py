@@ -0,0 +1,13 @@
+from checkmate.models import RuleVersion
+
+
+class TestRuleVersion:
+    def test_current_defaults_to_zero(self, db_session):
+        assert RuleVersion.current(db_session) == 0
+
+    def test_bump(self, db_session):
+        RuleVersion.bump(db_session)
+        assert RuleVersion.current(db_session) == 1
+
+        RuleVersion.bump(db_session)
+        assert RuleVersion.current(db_session) == 2
@@ -0,0 +1,22 @@
+import pytest
+
+from checkmate.models.db.types import HexDigest
+
+
+class TestHexDigest:
+    def test_it_stores_hex_as_bytes(self):
+        assert HexDigest().process_bind_param("01" * 32, None) == b"\x01" * 32
+
+    def test_it_reads_bytes_as_hex(self):
+        assert HexDigest().process_result_value(memoryview(b"\x01" * 32), None) == (
+            "01" * 32
+        )
+
+    @pytest.mark.parametrize("value", ["0102", "not hex"])
+    def test_it_rejects_values_which_arent_digests(self, value):
+        with pytest.raises(ValueError):
+            HexDigest().process_bind_param(value, None)
+
+    def test_it_passes_nulls_through(self):
+        assert HexDigest().process_bind_param(None, None) is None
+        assert HexDigest().process_result_value(None, None) is None
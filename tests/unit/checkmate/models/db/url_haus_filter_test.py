@@ -0,0 +1,16 @@
+from checkmate.models import URLHausFilter
+
+
+class TestURLHausFilter:
+    def test_defaults_when_empty(self, db_session):
+        assert URLHausFilter.current_version(db_session) == 0
+        assert URLHausFilter.load(db_session) is None
+
+    def test_save(self, db_session):
+        URLHausFilter.save(db_session, b"first")
+        assert URLHausFilter.current_version(db_session) == 1
+        assert URLHausFilter.load(db_session) == b"first"
+
+        URLHausFilter.save(db_session, b"second")
+        assert URLHausFilter.current_version(db_session) == 2
+        assert URLHausFilter.load(db_session) == b"second"
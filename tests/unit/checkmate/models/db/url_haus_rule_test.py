@@ -1,12 +1,169 @@
+import pytest
+import sqlalchemy as sa
+
 from checkmate.models import URLHausRule
 
 
 class TestURLHausRule:
     def test_truncate(self, db_session):
-        db_session.add(URLHausRule(id=1, hash="hash", rule="http://example.com"))
+        db_session.add(URLHausRule(id=1, hash="aa" * 32, rule="http://example.com"))
         db_session.flush()
         assert db_session.query(URLHausRule).count() == 1
 
         URLHausRule.delete_all(db_session)
 
         assert not db_session.query(URLHausRule).count()
+
+    def test_truncate_writes_pending_rules_first(self, db_session):
+        db_session.add(URLHausRule(id=1, hash="aa" * 32, rule="http://example.com"))
+
+        URLHausRule.delete_all(db_session)
+
+        assert not db_session.query(URLHausRule).count()
+
+    def test_all_hashes(self, db_session):
+        db_session.add_all(
+            [
+                URLHausRule(id=1, hash="01" * 32, rule="http://example.com"),
+                URLHausRule(id=2, hash="02" * 32, rule="http://example.net"),
+            ]
+        )
+        db_session.flush()
+
+        assert sorted(URLHausRule.all_hashes(db_session)) == ["01" * 32, "02" * 32]
+
+    def test_rules_are_spread_across_the_partitions(self, db_session):
+        URLHausRule.bulk_upsert(
+            db_session,
+            [
+                {"id": i, "hash": f"{i:064x}", "rule": f"http://example.com/{i}"}
+                for i in range(100)
+            ],
+        )
+
+        counts = [
+            db_session.execute(sa.text(f"SELECT count(*) FROM {partition}")).scalar()
+            for partition in URLHausRule.partitions()
+        ]
+
+        assert sorted(URLHausRule.all_hashes(db_session)) == [
+            f"{i:064x}" for i in range(100)
+        ]
+        assert len(counts) == URLHausRule.PARTITIONS
+        assert sum(counts) == 100
+        assert all(counts)
+
+    def test_bulk_upsert_updates_rules_in_place(self, db_session):
+        values = {"id": 1, "hash": "aa" * 32, "rule": "http://example.com"}
+        URLHausRule.bulk_upsert(db_session, [values])
+
+        URLHausRule.bulk_upsert(db_session, [{**values, "rule": "http://example.org"}])
+
+        assert db_session.execute(
+            sa.select(URLHausRule.hash, URLHausRule.rule)
+        ).all() == [("aa" * 32, "http://example.org")]
+
+    def test_sync_replaces_rules_whose_hash_has_changed(self, db_session):
+        URLHausRule.bulk_upsert(
+            db_session,
+            [
+                {"id": 1, "hash": "aa" * 32, "rule": "http://example.com"},
+                {"id": 2, "hash": "bb" * 32, "rule": "http://example.net"},
+            ],
+        )
+
+        synced, added, replaced = URLHausRule.sync(
+            db_session,
+            [
+                {"id": 1, "hash": "cc" * 32, "rule": "http://example.com/"},
+                {"id": 2, "hash": "bb" * 32, "rule": "http://example.net"},
+                # Only the last rule for an id is kept
+                {"id": 3, "hash": "dd" * 32, "rule": "http://example.org"},
+                {"id": 3, "hash": "ee" * 32, "rule": "http://example.org/"},
+            ],
+        )
+
+        assert synced == 4
+        assert sorted(added) == ["cc" * 32, "ee" * 32]
+        assert replaced == ["aa" * 32]
+        assert sorted(
+            db_session.execute(sa.select(URLHausRule.id, URLHausRule.hash)).all()
+        ) == [(1, "cc" * 32), (2, "bb" * 32), (3, "ee" * 32)]
+
+    def test_sync_without_finding_added_rules(self, db_session):
+        synced, added, _ = URLHausRule.sync(
+            db_session,
+            [{"id": 1, "hash": "aa" * 32, "rule": "http://example.com"}],
+            find_added=False,
+        )
+
+        assert synced == 1
+        assert added is None
+
+    @pytest.mark.parametrize("find_added,added", ((True, []), (False, None)))
+    def test_sync_with_no_values(self, db_session, find_added, added):
+        assert URLHausRule.sync(db_session, iter([]), find_added=find_added) == (
+            0,
+            added,
+            [],
+        )
+
+    def test_build_shadow(self, db_session):
+        db_session.add(URLHausRule(id=1, hash="aa" * 32, rule="http://example.com"))
+        # Anything left from a failed attempt is replaced
+        URLHausRule.build_shadow(db_session, [])
+
+        loaded = URLHausRule.build_shadow(
+            db_session,
+            [
+                {"id": 2, "hash": "bb" * 32, "rule": "http://example.net"},
+                {"id": 2, "hash": "bb" * 32, "rule": "http://example.org"},
+            ],
+        )
+
+        assert loaded == 2
+        assert db_session.execute(
+            sa.text(f"SELECT id, rule FROM {URLHausRule.SHADOW_TABLE}")
+        ).all() == [(2, "http://example.org")]
+        # The live table is left alone
+        assert URLHausRule.all_hashes(db_session) == ["aa" * 32]
+        assert URLHausRule.all_hashes(
+            db_session, table_name=URLHausRule.SHADOW_TABLE
+        ) == ["bb" * 32]
+
+    def test_swap_shadow(self, db_session):
+        db_session.add(URLHausRule(id=1, hash="aa" * 32, rule="http://example.com"))
+        URLHausRule.build_shadow(
+            db_session, [{"id": 2, "hash": "bb" * 32, "rule": "http://example.net"}]
+        )
+
+        URLHausRule.swap_shadow(db_session)
+
+        assert URLHausRule.all_hashes(db_session) == ["bb" * 32]
+        assert not self.relation_exists(db_session, URLHausRule.SHADOW_TABLE)
+        # Everything is named as if the table had been made from scratch
+        for name in [
+            "pk__urlhaus_rule",
+            *URLHausRule.partitions(),
+            *(f"{partition}_pkey" for partition in URLHausRule.partitions()),
+        ]:
+            assert self.relation_exists(db_session, name)
+
+    def test_vacuum(self, db_engine):
+        URLHausRule.vacuum(db_engine)
+
+        with db_engine.connect() as connection:
+            vacuumed = connection.execute(
+                sa.text(
+                    "SELECT count(*) FROM pg_stat_user_tables "
+                    "WHERE relname LIKE 'urlhaus_rule_p%' AND last_vacuum IS NOT NULL"
+                )
+            ).scalar()
+
+        assert vacuumed == URLHausRule.PARTITIONS
+
+    @staticmethod
+    def relation_exists(db_session, name):
+        return db_session.execute(
+            sa.text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+        ).scalar()
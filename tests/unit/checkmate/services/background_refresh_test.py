@@ -0,0 +1,119 @@
+from unittest.mock import Mock, sentinel
+
+import pytest
+
+from checkmate.services._background_refresh import BackgroundRefreshService
+
+
+class TestBackgroundRefreshService:
+    def test_value_starts_the_background_thread(self, svc, Thread):
+        assert svc.value is None
+
+        Thread.assert_called_once_with(
+            target=svc._run,  # pylint:disable=protected-access
+            name="test-value",
+            daemon=True,
+        )
+        Thread.return_value.start.assert_called_once_with()
+
+    def test_value_only_starts_one_thread(self, svc, Thread):
+        svc.value  # pylint:disable=pointless-statement
+        svc.value  # pylint:disable=pointless-statement
+
+        Thread.assert_called_once()
+
+    def test_value_starts_a_new_thread_after_a_fork(self, svc, Thread, os):
+        svc.value  # pylint:disable=pointless-statement
+        os.getpid.return_value = 2
+
+        svc.value  # pylint:disable=pointless-statement
+
+        assert Thread.call_count == 2
+
+    def test_refresh_builds_the_value(self, svc, SESSION):
+        svc.refresh()
+
+        SESSION.assert_called_once_with(bind=sentinel.engine)
+        svc.get_version.assert_called_once_with(SESSION.return_value)
+        svc.load.assert_called_once_with(
+            SESSION.return_value, svc.get_version.return_value
+        )
+        SESSION.return_value.close.assert_called_once_with()
+        assert svc.value == svc.load.return_value
+
+    def test_refresh_lifts_the_statement_timeout(self, svc, SESSION):
+        svc.refresh()
+
+        statement = SESSION.return_value.execute.call_args[0][0]
+        assert str(statement.compile(compile_kwargs={"literal_binds": True})) == (
+            "SELECT set_config('statement_timeout', '0', true) AS set_config_1"
+        )
+
+    def test_refresh_does_nothing_if_the_version_is_unchanged(self, svc):
+        svc.refresh()
+
+        svc.refresh()
+
+        svc.load.assert_called_once()
+
+    def test_refresh_rebuilds_when_the_version_changes(self, svc):
+        svc.get_version.side_effect = [1, 2]
+        svc.refresh()
+
+        svc.refresh()
+
+        assert svc.load.call_count == 2
+
+    def test_run_refreshes_until_stopped(self, svc):
+        svc.load.side_effect = [ValueError, sentinel.value]
+
+        def wait(_timeout):
+            if svc.load.call_count == 2:
+                svc.stop()
+
+        svc._stop.wait = wait  # pylint:disable=protected-access
+
+        svc._run()  # pylint:disable=protected-access
+
+        assert svc.value == sentinel.value
+
+    def test_subclasses_must_implement_get_version(self):
+        svc = BackgroundRefreshService(sentinel.engine)
+
+        with pytest.raises(NotImplementedError):
+            svc._get_version(sentinel.session)  # pylint:disable=protected-access
+
+    def test_subclasses_must_implement_load(self):
+        svc = BackgroundRefreshService(sentinel.engine)
+
+        with pytest.raises(NotImplementedError):
+            svc._load(sentinel.session, 1)  # pylint:disable=protected-access
+
+    @pytest.fixture
+    def svc(self):
+        class TestService(BackgroundRefreshService):
+            name = "test-value"
+            get_version = Mock()
+            load = Mock()
+
+            def _get_version(self, session):
+                return self.get_version(session)
+
+            def _load(self, session, version):
+                return self.load(session, version)
+
+        return TestService(sentinel.engine, refresh_interval=1)
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.services._background_refresh.Thread")
+
+    @pytest.fixture(autouse=True)
+    def os(self, patch):
+        os = patch("checkmate.services._background_refresh.os")
+        os.getpid.return_value = 1
+        return os
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services._background_refresh.SESSION")
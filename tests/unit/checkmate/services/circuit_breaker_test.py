@@ -0,0 +1,69 @@
+import pytest
+
+from checkmate.services.circuit_breaker import CircuitBreakerService
+
+
+class TestCircuitBreakerService:
+    def test_it_allows_lookups_to_start_with(self, svc):
+        assert svc.allow()
+
+    def test_it_opens_after_enough_failures(self, svc):
+        svc.record_failure()
+        assert svc.allow()
+
+        svc.record_failure()
+
+        assert not svc.allow()
+        assert svc.metrics() == {"state": "open", "failures": 2, "times_opened": 1}
+
+    def test_successes_reset_the_failures(self, svc):
+        svc.record_failure()
+        svc.record_success()
+        svc.record_failure()
+
+        assert svc.allow()
+
+    def test_it_lets_one_lookup_through_after_the_reset_timeout(self, svc, time):
+        self.open(svc)
+        assert svc.metrics()["state"] == "open"
+
+        time.monotonic.return_value = 130
+
+        assert svc.metrics()["state"] == "half_open"
+        assert svc.allow()
+        assert not svc.allow()
+
+    def test_it_closes_if_the_trial_lookup_works(self, svc, time):
+        self.open(svc)
+        time.monotonic.return_value = 130
+        svc.allow()
+
+        svc.record_success()
+
+        assert svc.allow()
+        assert svc.metrics() == {"state": "closed", "failures": 0, "times_opened": 1}
+
+    def test_it_opens_again_if_the_trial_lookup_fails(self, svc, time):
+        self.open(svc)
+        time.monotonic.return_value = 130
+        svc.allow()
+
+        svc.record_failure()
+
+        assert not svc.allow()
+        assert svc.metrics()["times_opened"] == 2
+
+    @staticmethod
+    def open(svc):
+        svc.record_failure()
+        svc.record_failure()
+
+    @pytest.fixture
+    def svc(self):
+        return CircuitBreakerService(failure_threshold=2, reset_timeout=30)
+
+    @pytest.fixture(autouse=True)
+    def time(self, patch):
+        time = patch("checkmate.services.circuit_breaker.time")
+        time.monotonic.return_value = 100
+        return time
@@ -1,8 +1,9 @@
 from unittest.mock import sentinel
 
 import pytest
+import sqlalchemy as sa
 
-from checkmate.models import Reason
+from checkmate.models import Reason, RuleIndex, RuleVersion
 from checkmate.services import CustomRuleService
 from checkmate.services.custom_rule import factory
 
@@ -16,6 +17,50 @@ class TestCustomRuleService:
         assert errors == []
         assert custom_rule_service.get_block_list() == block_list
 
+    def test_setting_the_block_list_bumps_the_rule_version(
+        self, custom_rule_service, db_session
+    ):
+        custom_rule_service.set_block_list("example.com/ other")
+
+        assert RuleVersion.current(db_session) == 1
+
+    def test_setting_the_block_list_updates_the_rule_index(self, db_session):
+        custom_rule_service = CustomRuleService(db_session, rule_index=True)
+
+        custom_rule_service.set_block_list("example.com/ other\nexample.net/ high-io")
+        custom_rule_service.set_block_list("example.com/ malicious")
+
+        assert db_session.execute(
+            sa.select(RuleIndex.source, RuleIndex.tags)
+        ).all() == [("block_list", ["malicious"])]
+
+    def test_it_leaves_the_rule_index_alone_without_it(
+        self, custom_rule_service, db_session
+    ):
+        custom_rule_service.set_block_list("example.com/ malicious")
+
+        assert not db_session.scalars(sa.select(RuleIndex)).all()
+
+    def test_setting_the_block_list_rewrites_the_digest_files(
+        self, db_session, digest_file
+    ):
+        custom_rule_service = CustomRuleService(
+            db_session, transaction_manager=sentinel.transaction_manager
+        )
+
+        custom_rule_service.set_block_list("example.com/ malicious")
+
+        digest_file.write_after_commit.assert_called_once_with(
+            sentinel.transaction_manager
+        )
+
+    def test_it_leaves_the_digest_files_alone_without_them(
+        self, custom_rule_service, digest_file
+    ):
+        custom_rule_service.set_block_list("example.com/ malicious")
+
+        digest_file.write_after_commit.assert_not_called()
+
     def test_it_can_get_block_list(self, custom_rule_service):
         assert custom_rule_service.get_block_list() == ""
 
@@ -63,13 +108,34 @@ class TestCustomRuleService:
     def custom_rule_service(self, db_session):
         return CustomRuleService(db_session)
 
+    @pytest.fixture
+    def digest_file(self, patch):
+        return patch("checkmate.services.custom_rule.digest_file")
+
 
 class TestFactory:
-    def test_it(self, pyramid_request, CustomRuleService):
+    @pytest.mark.parametrize("rule_index", ("false", "true"))
+    def test_it(self, pyramid_request, CustomRuleService, rule_index):
+        pyramid_request.registry.settings["rule_index"] = rule_index
+
         result = factory(sentinel.context, pyramid_request)
 
         assert result == CustomRuleService.return_value
-        CustomRuleService.assert_called_once_with(pyramid_request.db)
+        CustomRuleService.assert_called_once_with(
+            pyramid_request.db,
+            rule_index=rule_index == "true",
+            transaction_manager=None,
+        )
+
+    @pytest.mark.parametrize("setting", ("digest_file", "last_known_good_file"))
+    def test_it_with_digest_files(self, pyramid_request, CustomRuleService, setting):
+        pyramid_request.registry.settings[setting] = "/tmp/digests"
+
+        factory(sentinel.context, pyramid_request)
+
+        CustomRuleService.assert_called_once_with(
+            pyramid_request.db, rule_index=False, transaction_manager=pyramid_request.tm
+        )
 
     @pytest.fixture
     def CustomRuleService(self, patch):
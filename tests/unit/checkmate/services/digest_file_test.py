@@ -0,0 +1,80 @@
+from unittest.mock import sentinel
+
+import pytest
+import transaction
+
+from checkmate.services.digest_file import DigestFileService, write_after_commit
+
+
+class TestDigestFileService:
+    def test_it_opens_the_file(self, svc, DigestFile, RuleVersion, SESSION):
+        DigestFile.return_value.version = RuleVersion.current.return_value
+
+        svc.refresh()
+
+        RuleVersion.current.assert_called_once_with(SESSION.return_value)
+        DigestFile.assert_called_once_with(sentinel.path)
+        assert svc.index == DigestFile.return_value.as_index.return_value
+
+    def test_it_has_no_index_when_the_file_is_stale(self, svc, DigestFile, RuleVersion):
+        RuleVersion.current.return_value = 2
+        DigestFile.return_value.version = 1
+
+        svc.refresh()
+
+        assert svc.index is None
+
+    def test_it_has_no_index_when_the_file_is_missing(self, svc, DigestFile):
+        DigestFile.side_effect = FileNotFoundError
+
+        svc.refresh()
+
+        assert svc.index is None
+
+    @pytest.fixture
+    def svc(self):
+        return DigestFileService(sentinel.engine, sentinel.path)
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.services._background_refresh.Thread")
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services._background_refresh.SESSION")
+
+    @pytest.fixture(autouse=True)
+    def DigestFile(self, patch):
+        return patch("checkmate.services.digest_file.DigestFile")
+
+    @pytest.fixture(autouse=True)
+    def RuleVersion(self, patch):
+        return patch("checkmate.services.digest_file.RuleVersion")
+
+
+class TestWriteAfterCommit:
+    def test_it_writes_the_files_after_the_commit(self, transaction_manager, task):
+        write_after_commit(transaction_manager)
+        task.delay.assert_not_called()
+
+        transaction_manager.commit()
+
+        task.delay.assert_called_once_with()
+
+    def test_it_does_nothing_if_the_commit_fails(self, transaction_manager, task):
+        write_after_commit(transaction_manager)
+
+        for hook, args, kwargs in transaction_manager.get().getAfterCommitHooks():
+            hook(False, *args, **kwargs)
+
+        task.delay.assert_not_called()
+
+    @pytest.fixture
+    def transaction_manager(self):
+        transaction_manager = transaction.TransactionManager(explicit=True)
+        transaction_manager.begin()
+        return transaction_manager
+
+    @pytest.fixture
+    def task(self, patch):
+        return patch("checkmate.services.digest_file.write_digest_file")
@@ -0,0 +1,38 @@
+from unittest.mock import sentinel
+
+import pytest
+
+from checkmate.services.hash_index import HashIndexService
+
+
+class TestHashIndexService:
+    def test_it_builds_an_index_for_the_rule_version(
+        self, svc, HashIndex, RuleVersion, SESSION
+    ):
+        svc.refresh()
+
+        RuleVersion.current.assert_called_once_with(SESSION.return_value)
+        HashIndex.load.assert_called_once_with(
+            SESSION.return_value, RuleVersion.current.return_value
+        )
+        assert svc.index == HashIndex.load.return_value
+
+    @pytest.fixture
+    def svc(self):
+        return HashIndexService(sentinel.engine)
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.services._background_refresh.Thread")
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services._background_refresh.SESSION")
+
+    @pytest.fixture(autouse=True)
+    def HashIndex(self, patch):
+        return patch("checkmate.services.hash_index.HashIndex")
+
+    @pytest.fixture(autouse=True)
+    def RuleVersion(self, patch):
+        return patch("checkmate.services.hash_index.RuleVersion")
@@ -0,0 +1,67 @@
+from unittest.mock import sentinel
+
+import pytest
+
+from checkmate.services.last_known_good import LastKnownGoodService
+
+
+class TestLastKnownGoodService:
+    def test_it_opens_the_file(self, svc, DigestFile):
+        svc.refresh()
+
+        DigestFile.assert_called_with(sentinel.path)
+        assert svc.index == DigestFile.return_value.as_index.return_value
+
+    def test_it_reopens_the_file_when_its_replaced(self, svc, DigestFile):
+        svc.refresh()
+        DigestFile.return_value.as_index.reset_mock()
+
+        DigestFile.return_value.version = 2
+        svc.refresh()
+
+        DigestFile.return_value.as_index.assert_called_once_with()
+
+    def test_it_doesnt_reopen_the_file_when_its_unchanged(self, svc, DigestFile):
+        svc.refresh()
+        DigestFile.return_value.as_index.reset_mock()
+
+        svc.refresh()
+
+        DigestFile.return_value.as_index.assert_not_called()
+
+    @pytest.mark.parametrize("error", (FileNotFoundError, ValueError))
+    def test_it_has_no_index_when_the_file_cant_be_opened(self, svc, DigestFile, error):
+        DigestFile.side_effect = error
+
+        svc.refresh()
+
+        assert svc.index is None
+
+    def test_it_never_writes_the_file(self, svc, DigestFile):
+        svc.refresh()
+
+        DigestFile.write.assert_not_called()
+
+    def test_it_falls_back_to_the_file_on_disk(self, svc, DigestFile):
+        assert svc.index == DigestFile.return_value.as_index.return_value
+        assert svc.index == DigestFile.return_value.as_index.return_value
+
+        DigestFile.assert_called_once_with(sentinel.path)
+
+    @pytest.fixture
+    def svc(self):
+        return LastKnownGoodService(sentinel.path)
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.services._background_refresh.Thread")
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services._background_refresh.SESSION")
+
+    @pytest.fixture(autouse=True)
+    def DigestFile(self, patch):
+        DigestFile = patch("checkmate.services.last_known_good.DigestFile")
+        DigestFile.return_value.version = 1
+        return DigestFile
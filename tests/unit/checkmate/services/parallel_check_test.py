@@ -0,0 +1,88 @@
+import logging
+from threading import Event
+from unittest.mock import sentinel
+
+import pytest
+
+from checkmate.services.parallel_check import ParallelCheckService
+
+
+class TestParallelCheckService:
+    def test_it_runs_tasks_with_their_own_sessions(self, svc, SESSION):
+        results, incomplete = svc.run(
+            {"a": lambda session: (session, "a"), "b": lambda session: "b"}
+        )
+
+        assert results == {"a": (SESSION.return_value, "a"), "b": "b"}
+        assert not incomplete
+        SESSION.assert_called_with(bind=sentinel.engine)
+        SESSION.return_value.execute.assert_called()
+        SESSION.return_value.close.assert_called()
+
+    def test_it_can_use_another_engine(self, svc, SESSION):
+        svc.run({"a": lambda session: None}, engine=sentinel.replica)
+
+        SESSION.assert_called_with(bind=sentinel.replica)
+
+    def test_it_sets_a_statement_timeout(self, svc, SESSION):
+        svc.run({"a": lambda session: None})
+
+        stmt = SESSION.return_value.execute.call_args[0][0]
+        assert "set_config" in str(stmt)
+        assert list(stmt.compile().params.values())[1:] == ["100", True]
+
+    def test_it_skips_tasks_which_take_too_long(self, svc, caplog):
+        finish = Event()
+
+        try:
+            results, incomplete = svc.run(
+                {"slow": lambda session: finish.wait(), "fast": lambda session: 1}
+            )
+        finally:
+            finish.set()
+
+        assert results == {"fast": 1}
+        assert incomplete == ["slow"]
+        assert "didn't complete" in caplog.text
+
+    def test_it_skips_tasks_which_fail(self, svc, caplog):
+        def fail(_session):
+            raise ValueError("Oh no")
+
+        with caplog.at_level(logging.ERROR):
+            results, incomplete = svc.run({"fail": fail})
+
+        assert not results
+        assert incomplete == ["fail"]
+        assert "failed" in caplog.text
+
+    def test_it_reuses_the_pool(self, svc):
+        svc.run({})
+        executor = svc._executor  # pylint:disable=protected-access
+
+        svc.run({})
+
+        assert svc._executor is executor  # pylint:disable=protected-access
+
+    def test_it_makes_a_new_pool_after_forking(self, svc, os):
+        svc.run({})
+        executor = svc._executor  # pylint:disable=protected-access
+        os.getpid.return_value = 1234
+
+        svc.run({})
+
+        assert svc._executor is not executor  # pylint:disable=protected-access
+
+    @pytest.fixture
+    def svc(self):
+        return ParallelCheckService(sentinel.engine, max_workers=2, timeout=0.1)
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services.parallel_check.SESSION")
+
+    @pytest.fixture
+    def os(self, patch):
+        os = patch("checkmate.services.parallel_check.os")
+        os.getpid.return_value = 1
+        return os
@@ -0,0 +1,61 @@
+from threading import Thread
+
+from checkmate.services.result_cache import ResultCacheService
+
+
+class TestResultCacheService:
+    def test_get_and_set(self):
+        svc = ResultCacheService()
+
+        svc.set(1, "key", "result")
+
+        assert svc.get(1, "key") == "result"
+        assert svc.get(1, "other") is None
+
+    def test_a_new_version_empties_the_cache(self):
+        svc = ResultCacheService()
+        svc.set(1, "key", "result")
+
+        assert svc.get(2, "key") is None
+        assert svc.metrics()["invalidations"] == 1
+
+    def test_old_versions_are_ignored(self):
+        svc = ResultCacheService()
+        svc.set(2, "key", "result")
+
+        svc.set(1, "old", "result")
+
+        assert svc.get(1, "key") is None
+        assert svc.get(2, "key") == "result"
+        assert svc.get(2, "old") is None
+
+    def test_a_result_for_an_old_version_isnt_stored_after_a_new_one(self):
+        svc = ResultCacheService()
+        svc.set(1, "key", "result")
+
+        with svc._cache.lock:  # pylint:disable=protected-access
+            # A request still checking against the old version...
+            thread = Thread(target=svc.set, args=(1, "old", "result"))
+            thread.start()
+            thread.join(timeout=0.1)
+            # ... and another which has seen the new one
+            svc.get(2, "key")
+
+        thread.join()
+        assert svc.get(2, "old") is None
+
+    def test_metrics(self):
+        svc = ResultCacheService(max_size=5, ttl=10)
+        svc.set(3, "key", "result")
+        svc.get(3, "key")
+
+        assert svc.metrics() == {
+            "size": 1,
+            "max_size": 5,
+            "hits": 1,
+            "misses": 0,
+            "hit_ratio": 1.0,
+            "evictions": 0,
+            "version": 3,
+            "invalidations": 0,
+        }
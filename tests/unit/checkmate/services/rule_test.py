@@ -4,8 +4,15 @@ import pytest
 from h_matchers import Any
 
 from checkmate.exceptions import ResourceConflict
-from checkmate.models import AllowRule, Detection, Reason, Source
-from checkmate.services import RuleService
+from checkmate.models import (
+    AllowRule,
+    Detection,
+    Reason,
+    RuleIndex,
+    RuleVersion,
+    Source,
+)
+from checkmate.services import RuleService, URLHasherService
 from checkmate.services.rule import factory
 
 
@@ -18,7 +25,7 @@ class TestRuleService:
         rule = rule_service.add_to_allow_list("http://example.com")
 
         url_checker_service.check_url.assert_called_once_with(
-            "http://example.com", fail_fast=False
+            "http://example.com", fail_fast=False, db_only=True
         )
         assert rule == Any.instance_of(AllowRule).with_attrs(
             {
@@ -29,6 +36,56 @@ class TestRuleService:
             }
         )
 
+    def test_it_bumps_the_rule_version(
+        self, rule_service, url_checker_service, db_session
+    ):
+        url_checker_service.check_url.return_value = [
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST)
+        ]
+
+        rule_service.add_to_allow_list("http://example.com")
+
+        assert RuleVersion.current(db_session) == 1
+
+    @pytest.mark.parametrize("transaction_manager", (None, sentinel.tm))
+    def test_it_rewrites_the_digest_files_if_there_are_any(
+        self, url_checker_service, db_session, digest_file, transaction_manager
+    ):
+        rule_service = RuleService(
+            url_checker_service,
+            db_session,
+            URLHasherService(),
+            transaction_manager=transaction_manager,
+        )
+        url_checker_service.check_url.return_value = [
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST)
+        ]
+
+        rule_service.add_to_allow_list("http://example.com")
+
+        if transaction_manager:
+            digest_file.write_after_commit.assert_called_once_with(transaction_manager)
+        else:
+            digest_file.write_after_commit.assert_not_called()
+
+    @pytest.mark.parametrize("rule_index", (False, True))
+    def test_it_updates_the_rule_index_if_its_on(
+        self, url_checker_service, db_session, rule_index
+    ):
+        rule_service = RuleService(
+            url_checker_service, db_session, URLHasherService(), rule_index=rule_index
+        )
+        url_checker_service.check_url.return_value = [
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST)
+        ]
+
+        rule = rule_service.add_to_allow_list("http://example.com")
+
+        assert (
+            bool(db_session.get(RuleIndex, (rule.hash, Source.ALLOW_LIST.value)))
+            == rule_index
+        )
+
     @pytest.mark.parametrize(
         "detections",
         (
@@ -49,15 +106,44 @@ class TestRuleService:
 
     @pytest.fixture
     def rule_service(self, url_checker_service, db_session):
-        return RuleService(url_checker_service, db_session)
+        return RuleService(url_checker_service, db_session, URLHasherService())
+
+    @pytest.fixture
+    def digest_file(self, patch):
+        return patch("checkmate.services.rule.digest_file")
 
 
 class TestFactory:
-    def test_it(self, pyramid_request, RuleService, url_checker_service):
+    def test_it(
+        self, pyramid_request, RuleService, url_checker_service, url_hasher_service
+    ):
+        pyramid_request.registry.settings["rule_index"] = "true"
+
         result = factory(sentinel.context, pyramid_request)
 
         assert result == RuleService.return_value
-        RuleService.assert_called_once_with(url_checker_service, pyramid_request.db)
+        RuleService.assert_called_once_with(
+            url_checker_service,
+            pyramid_request.db,
+            url_hasher_service,
+            rule_index=True,
+            transaction_manager=None,
+        )
+
+    def test_it_with_digest_files(
+        self, pyramid_request, RuleService, url_checker_service, url_hasher_service
+    ):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+
+        factory(sentinel.context, pyramid_request)
+
+        RuleService.assert_called_once_with(
+            url_checker_service,
+            pyramid_request.db,
+            url_hasher_service,
+            rule_index=False,
+            transaction_manager=pyramid_request.tm,
+        )
 
     @pytest.fixture
     def RuleService(self, patch):
@@ -1,12 +1,22 @@
-from unittest.mock import sentinel
+from unittest.mock import Mock, create_autospec, sentinel
 
 import pytest
+import sqlalchemy as sa
 from checkmatelib.url import hash_url
+from h_matchers import Any
 
-from checkmate.models import Reason, Source
+from checkmate.checker.url import CuckooFilter, hash_index
+from checkmate.models import Reason, RuleVersion, Source
 from checkmate.models.detection import Detection
+from checkmate.services.circuit_breaker import CircuitBreakerService
+from checkmate.services.hash_index import HashIndexService
+from checkmate.services.last_known_good import LastKnownGoodService
+from checkmate.services.parallel_check import ParallelCheckService
+from checkmate.services.result_cache import ResultCacheService
 from checkmate.services.url_checker import URLCheckerService, factory
 
+HASH = "ab" * 32
+
 
 class TestURLCheckerService:
     def test_it_calls_sub_checkers(self, checker, URLHaus, CustomRules, AllowRules):
@@ -27,6 +37,24 @@ class TestURLCheckerService:
         for sub_checker in (URLHaus, CustomRules, AllowRules):
             sub_checker.return_value.check_url.assert_called_once_with(url_hashes)
 
+    @pytest.mark.usefixtures("HashIndex")
+    def test_it_uses_the_url_hasher(self, db_session, url_hasher_service):
+        url_hasher_service.hash_url.return_value = ["hash"]
+        checker = URLCheckerService(db_session, url_hasher=url_hasher_service)
+
+        checker.check_url("http://example.com")
+        checker.check_urls(["http://example.com"])
+
+        assert url_hasher_service.hash_url.call_count == 2
+        url_hasher_service.hash_url.assert_called_with("http://example.com")
+
+    def test_it_passes_the_url_haus_filter_on(self, db_session, URLHaus):
+        URLCheckerService(db_session, url_haus_filter=sentinel.url_haus_filter)
+
+        URLHaus.assert_called_once_with(
+            db_session, url_haus_filter=sentinel.url_haus_filter
+        )
+
     def test_it_can_fail_fast(self, checker, URLHaus, CustomRules, AllowRules):
         URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
 
@@ -74,10 +102,511 @@ class TestURLCheckerService:
 
         AllowRules.return_value.check_url.assert_not_called()
 
+    def test_it_uses_the_hash_index_when_ready(
+        self, db_session, hash_index_service, URLHaus
+    ):
+        index = hash_index_service.index
+        index.blocking_checkers = {
+            Source.URL_HAUS: Mock(check_url=Mock(return_value=[Reason.MALICIOUS]))
+        }
+        index.allowing_checkers = {}
+        checker = URLCheckerService(db_session, hash_index=hash_index_service)
+
+        results = checker.check_url("http://example.com")
+
+        assert list(results) == [Detection(Reason.MALICIOUS, Source.URL_HAUS)]
+        URLHaus.return_value.check_url.assert_not_called()
+
+    def test_it_uses_the_db_until_the_hash_index_is_ready(
+        self, db_session, hash_index_service, URLHaus
+    ):
+        hash_index_service.index = None
+        checker = URLCheckerService(db_session, hash_index=hash_index_service)
+
+        checker.check_url("http://example.com")
+
+        URLHaus.return_value.check_url.assert_called_once()
+
+    def test_it_can_use_a_combined_lookup(self, db_session, HashIndex, URLHaus):
+        HashIndex.load_matching.return_value.blocking_checkers = {
+            Source.BLOCK_LIST: Mock(check_url=Mock(return_value=[Reason.HIGH_IO]))
+        }
+        HashIndex.load_matching.return_value.allowing_checkers = {}
+        checker = URLCheckerService(db_session, combined_lookup=True)
+
+        results = checker.check_url("http://example.com")
+
+        HashIndex.load_matching.assert_called_once_with(
+            db_session, list(hash_url("http://example.com"))
+        )
+        assert list(results) == [Detection(Reason.HIGH_IO, Source.BLOCK_LIST)]
+        URLHaus.return_value.check_url.assert_not_called()
+
+    @pytest.mark.parametrize("batch", (True, False))
+    def test_it_can_use_the_rule_index(self, db_session, HashIndex, URLHaus, batch):
+        HashIndex.load_from_rule_index.return_value.blocking_checkers = {
+            Source.BLOCK_LIST: Mock(check_url=Mock(return_value=[Reason.HIGH_IO]))
+        }
+        HashIndex.load_from_rule_index.return_value.allowing_checkers = {}
+        checker = URLCheckerService(db_session, rule_index=True)
+
+        if batch:
+            results = checker.check_urls(["http://example.com"])["http://example.com"]
+        else:
+            results = checker.check_url("http://example.com")
+
+        HashIndex.load_from_rule_index.assert_called_once_with(
+            db_session, Any.list.containing(list(hash_url("http://example.com"))).only()
+        )
+        assert list(results) == [Detection(Reason.HIGH_IO, Source.BLOCK_LIST)]
+        HashIndex.load_matching.assert_not_called()
+        URLHaus.return_value.check_url.assert_not_called()
+
+    def test_it_can_use_the_check_function(self, db_session, CheckFunction, URLHaus):
+        CheckFunction.check.return_value = [
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST),
+            Detection(Reason.MALICIOUS, Source.URL_HAUS),
+        ]
+        checker = URLCheckerService(db_session, check_function=True)
+
+        results = checker.check_url(
+            "http://example.com",
+            allow_all=sentinel.allow_all,
+            fail_fast=sentinel.fail_fast,
+            ignore_reasons=[Reason.OTHER],
+        )
+
+        CheckFunction.check.assert_called_once_with(
+            db_session,
+            list(hash_url("http://example.com")),
+            sentinel.allow_all,
+            sentinel.fail_fast,
+            [Reason.OTHER],
+        )
+        assert list(results) == [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS),
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST),
+        ]
+        URLHaus.return_value.check_url.assert_not_called()
+
+    def test_check_hashes(self, checker, URLHaus):
+        URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
+
+        results = checker.check_hashes(["hash"])
+
+        assert results == [Detection(Reason.MALICIOUS, Source.URL_HAUS)]
+        URLHaus.return_value.check_url.assert_called_once_with(["hash"])
+
+    def test_check_many_hashes(self, checker, HashIndex):
+        url_haus = Mock(spec_set=["check_url"])
+        url_haus.check_url.side_effect = lambda hashes: (
+            [Reason.MALICIOUS] if "bad" in hashes else []
+        )
+        HashIndex.load_matching.return_value.blocking_checkers = {
+            Source.URL_HAUS: url_haus
+        }
+        HashIndex.load_matching.return_value.allowing_checkers = {}
+
+        results = checker.check_many_hashes([["good"], None, ["bad", "bad"]])
+
+        HashIndex.load_matching.assert_called_once_with(Any(), ["bad", "good"])
+        assert results == [
+            [],
+            None,
+            [Detection(Reason.MALICIOUS, Source.URL_HAUS)],
+        ]
+
+    def test_find_prefix_matches(self, checker, db_session, HashIndex):
+        index = HashIndex.load_prefixes.return_value
+        index.hashes.return_value = {"bb", "aa"}
+        index.blocking_checkers = {
+            Source.URL_HAUS: Mock(
+                check_url=lambda hashes: [Reason.MALICIOUS] if hashes == ["aa"] else []
+            ),
+            Source.BLOCK_LIST: Mock(
+                check_url=lambda hashes: [Reason.HIGH_IO] if hashes == ["aa"] else []
+            ),
+        }
+        index.allowing_checkers = {
+            Source.ALLOW_LIST: Mock(
+                check_url=lambda hashes: (
+                    [Reason.NOT_ALLOWED] if hashes == ["aa"] else []
+                )
+            )
+        }
+
+        matches = checker.find_prefix_matches(["aaaa", "bbbb"])
+
+        HashIndex.load_prefixes.assert_called_once_with(db_session, ["aaaa", "bbbb"])
+        assert list(matches.items()) == [
+            (
+                "aa",
+                (
+                    [
+                        Detection(Reason.MALICIOUS, Source.URL_HAUS),
+                        Detection(Reason.HIGH_IO, Source.BLOCK_LIST),
+                    ],
+                    False,
+                ),
+            ),
+            ("bb", ([], True)),
+        ]
+
+    def test_it_caches_results(self, db_session, URLHaus):
+        URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
+        checker = URLCheckerService(db_session, result_cache=ResultCacheService())
+
+        first = checker.check_url("http://example.com")
+        # This canonicalises to the same URL
+        second = checker.check_url("http://EXAMPLE.com/")
+
+        assert first == second == [Detection(Reason.MALICIOUS, Source.URL_HAUS)]
+        URLHaus.return_value.check_url.assert_called_once()
+
+    def test_it_caches_results_for_different_options_separately(
+        self, db_session, URLHaus
+    ):
+        checker = URLCheckerService(db_session, result_cache=ResultCacheService())
+
+        checker.check_url("http://example.com")
+        checker.check_url("http://example.com", allow_all=True)
+        checker.check_url("http://example.com", ignore_reasons=[Reason.OTHER])
+
+        assert URLHaus.return_value.check_url.call_count == 3
+
+    def test_it_recalculates_results_when_the_rules_change(self, db_session, URLHaus):
+        checker = URLCheckerService(db_session, result_cache=ResultCacheService())
+
+        checker.check_url("http://example.com")
+        RuleVersion.bump(db_session)
+        checker.check_url("http://example.com")
+
+        assert URLHaus.return_value.check_url.call_count == 2
+
+    @pytest.mark.parametrize("index_version,call_count", ((1, 1), (0, 2)))
+    def test_it_only_caches_results_from_an_index_with_the_current_rules(
+        self, db_session, hash_index_service, index_version, call_count
+    ):
+        RuleVersion.bump(db_session)
+        index = hash_index_service.index
+        index.version = index_version
+        index.blocking_checkers = {
+            Source.URL_HAUS: Mock(check_url=Mock(return_value=[]))
+        }
+        index.allowing_checkers = {}
+        checker = URLCheckerService(
+            db_session, hash_index=hash_index_service, result_cache=ResultCacheService()
+        )
+
+        checker.check_url("http://example.com")
+        checker.check_url("http://example.com")
+
+        url_haus = index.blocking_checkers[Source.URL_HAUS]
+        assert url_haus.check_url.call_count == call_count
+
+    def test_it_caches_results_for_different_url_haus_filters_separately(
+        self, db_session, URLHaus
+    ):
+        result_cache = ResultCacheService()
+        for version in (1, 2):
+            url_haus_filter = CuckooFilter(capacity=1)
+            url_haus_filter.version = version
+            checker = URLCheckerService(
+                db_session, url_haus_filter=url_haus_filter, result_cache=result_cache
+            )
+
+            checker.check_url("http://example.com")
+
+        assert URLHaus.return_value.check_url.call_count == 2
+
+    def test_check_urls(self, checker, HashIndex):
+        index = HashIndex.load_matching.return_value
+        url_haus = Mock(spec_set=["check_url"])
+        url_haus.check_url.side_effect = lambda hashes: (
+            [Reason.MALICIOUS]
+            if hashes == self.hashes("http://bad.example.com")
+            else []
+        )
+        index.blocking_checkers = {Source.URL_HAUS: url_haus}
+        index.allowing_checkers = {}
+
+        results = checker.check_urls(
+            ["http://bad.example.com", "http://good.example.com", "http://bad]"]
+        )
+
+        HashIndex.load_matching.assert_called_once_with(
+            checker._db_session,  # pylint:disable=protected-access
+            sorted(
+                set(self.hashes("http://bad.example.com"))
+                | set(self.hashes("http://good.example.com"))
+            ),
+        )
+        assert results == {
+            "http://bad.example.com": [Detection(Reason.MALICIOUS, Source.URL_HAUS)],
+            "http://good.example.com": [],
+            "http://bad]": None,
+        }
+
+    def test_check_urls_uses_the_hash_index_when_ready(
+        self, db_session, hash_index_service, HashIndex
+    ):
+        hash_index_service.index.blocking_checkers = {}
+        hash_index_service.index.allowing_checkers = {}
+        checker = URLCheckerService(db_session, hash_index=hash_index_service)
+
+        results = checker.check_urls(["http://example.com"])
+
+        assert results == {"http://example.com": []}
+        HashIndex.load_matching.assert_not_called()
+
+    def test_it_can_run_the_checkers_in_parallel(
+        self, db_session, parallel_check, URLHaus, CustomRules, AllowRules
+    ):
+        URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
+        CustomRules.return_value.check_url.return_value = (Reason.OTHER,)
+        AllowRules.return_value.check_url.return_value = (Reason.NOT_ALLOWED,)
+        checker = URLCheckerService(db_session, parallel_check=parallel_check)
+
+        results = checker.check_url("http://example.com", fail_fast=False)
+
+        assert list(results) == [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS),
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST),
+            Detection(Reason.OTHER, Source.BLOCK_LIST),
+        ]
+        parallel_check.run.assert_called_once_with(
+            Any.dict.containing(
+                [Source.URL_HAUS, Source.BLOCK_LIST, Source.ALLOW_LIST]
+            ),
+            engine=db_session.get_bind(),
+        )
+        # Each checker is created with the session for its own thread
+        URLHaus.assert_called_with(sentinel.thread_session, url_haus_filter=None)
+        for checker_class in (CustomRules, AllowRules):
+            checker_class.assert_called_with(sentinel.thread_session)
+        assert not checker.incomplete_sources
+        assert not checker.degraded
+
+    def test_it_skips_checkers_which_dont_finish_in_parallel(
+        self, db_session, parallel_check, URLHaus, CustomRules
+    ):
+        CustomRules.return_value.check_url.return_value = (Reason.OTHER,)
+        parallel_check.incomplete = [Source.BLOCK_LIST]
+        checker = URLCheckerService(db_session, parallel_check=parallel_check)
+
+        results = checker.check_url("http://example.com", fail_fast=False)
+
+        assert not list(results)
+        assert checker.incomplete_sources == [Source.BLOCK_LIST]
+        assert checker.degraded
+
+    def test_it_doesnt_cache_partial_results(
+        self, db_session, parallel_check, AllowRules
+    ):
+        AllowRules.return_value.check_url.return_value = (Reason.NOT_ALLOWED,)
+        parallel_check.incomplete = [Source.ALLOW_LIST]
+        checker = URLCheckerService(
+            db_session, parallel_check=parallel_check, result_cache=ResultCacheService()
+        )
+
+        assert not checker.check_url("http://example.com")
+
+        parallel_check.incomplete = []
+        assert checker.check_url("http://example.com") == [
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST)
+        ]
+
+    def test_it_doesnt_run_the_allow_list_in_parallel_with_allow_all(
+        self, db_session, parallel_check
+    ):
+        checker = URLCheckerService(db_session, parallel_check=parallel_check)
+
+        list(checker.check_url("http://example.com", allow_all=True))
+
+        assert Source.ALLOW_LIST not in parallel_check.run.call_args[0][0]
+
+    def test_it_doesnt_run_in_parallel_with_an_index(
+        self, db_session, hash_index_service, parallel_check
+    ):
+        hash_index_service.index.blocking_checkers = {}
+        hash_index_service.index.allowing_checkers = {}
+        checker = URLCheckerService(
+            db_session, hash_index=hash_index_service, parallel_check=parallel_check
+        )
+
+        list(checker.check_url("http://example.com"))
+
+        parallel_check.run.assert_not_called()
+
+    def test_it_records_successes_with_the_circuit_breaker(
+        self, db_session, circuit_breaker, URLHaus
+    ):
+        URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
+        checker = URLCheckerService(db_session, circuit_breaker=circuit_breaker)
+
+        results = checker.check_hashes(["hash"])
+
+        assert results == [Detection(Reason.MALICIOUS, Source.URL_HAUS)]
+        circuit_breaker.record_success.assert_called_once_with()
+        assert not checker.degraded
+
+    @pytest.mark.parametrize(
+        "error", (sa.exc.OperationalError(None, None, None), sa.exc.TimeoutError())
+    )
+    def test_it_uses_the_last_known_good_rules_when_the_db_fails(
+        self, db_session, circuit_breaker, last_known_good, URLHaus, error
+    ):
+        URLHaus.return_value.check_url.side_effect = error
+        checker = URLCheckerService(
+            db_session,
+            circuit_breaker=circuit_breaker,
+            last_known_good=last_known_good,
+        )
+
+        results = checker.check_hashes([HASH])
+
+        circuit_breaker.record_failure.assert_called_once_with()
+        assert results == [Detection(Reason.HIGH_IO, Source.BLOCK_LIST)]
+        assert checker.degraded
+
+    def test_it_uses_the_last_known_good_rules_when_the_breaker_is_open(
+        self, db_session, circuit_breaker, last_known_good, URLHaus
+    ):
+        circuit_breaker.allow.return_value = False
+        checker = URLCheckerService(
+            db_session,
+            circuit_breaker=circuit_breaker,
+            last_known_good=last_known_good,
+        )
+
+        results = checker.check_many_hashes([[HASH], None])
+
+        URLHaus.return_value.check_url.assert_not_called()
+        assert results == [[Detection(Reason.HIGH_IO, Source.BLOCK_LIST)], None]
+        assert checker.degraded
+
+    def test_it_lets_everything_through_without_last_known_good_rules(
+        self, db_session, circuit_breaker, last_known_good, AllowRules
+    ):
+        AllowRules.return_value.check_url.return_value = (Reason.NOT_ALLOWED,)
+        circuit_breaker.allow.return_value = False
+        last_known_good.index = None
+        checker = URLCheckerService(
+            db_session,
+            circuit_breaker=circuit_breaker,
+            last_known_good=last_known_good,
+        )
+
+        assert checker.check_hashes(["hash"]) == []
+        assert checker.degraded
+
+    def test_it_can_only_read_the_rule_tables(
+        self,
+        db_session,
+        hash_index_service,
+        parallel_check,
+        circuit_breaker,
+        URLHaus,
+        CustomRules,
+        AllowRules,
+    ):
+        URLHaus.return_value.check_url.return_value = (Reason.MALICIOUS,)
+        AllowRules.return_value.check_url.return_value = (Reason.NOT_ALLOWED,)
+        # Only the first check should ask the circuit breaker
+        circuit_breaker.allow.side_effect = [True]
+        hash_index_service.index.version = RuleVersion.current(db_session)
+        checker = URLCheckerService(
+            db_session,
+            hash_index=hash_index_service,
+            rule_index=True,
+            url_haus_filter=CuckooFilter(capacity=1),
+            result_cache=ResultCacheService(),
+            parallel_check=parallel_check,
+            circuit_breaker=circuit_breaker,
+        )
+        # This is answered from the index and cached, neither of which should
+        # be used again
+        checker.check_url("http://example.com", fail_fast=False)
+
+        results = checker.check_url("http://example.com", fail_fast=False, db_only=True)
+
+        assert results == [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS),
+            Detection(Reason.NOT_ALLOWED, Source.ALLOW_LIST),
+        ]
+        # The URLHaus checker doesn't get the filter, which could be stale
+        URLHaus.assert_called_with(db_session)
+        hashes = self.hashes("http://example.com")
+        for checker_class in (URLHaus, CustomRules, AllowRules):
+            checker_class.return_value.check_url.assert_called_once_with(hashes)
+        hash_index_service.index.blocking_checkers.items.assert_called_once_with()
+        parallel_check.run.assert_not_called()
+
+    def test_it_can_only_read_the_rule_tables_with_allow_all(self, checker, AllowRules):
+        checker.check_hashes(["hash"], allow_all=True, db_only=True)
+
+        AllowRules.return_value.check_url.assert_not_called()
+
+    def test_it_raises_db_errors_without_the_circuit_breaker(self, db_session, URLHaus):
+        URLHaus.return_value.check_url.side_effect = sa.exc.TimeoutError()
+        checker = URLCheckerService(db_session)
+
+        with pytest.raises(sa.exc.TimeoutError):
+            checker.check_hashes(["hash"])
+
+    @staticmethod
+    def hashes(url):
+        return list(hash_url(url))
+
+    @pytest.fixture
+    def circuit_breaker(self):
+        circuit_breaker = create_autospec(CircuitBreakerService, instance=True)
+        circuit_breaker.allow.return_value = True
+        return circuit_breaker
+
+    @pytest.fixture
+    def last_known_good(self):
+        last_known_good = create_autospec(LastKnownGoodService, instance=True)
+        last_known_good.index = hash_index.HashIndex(
+            1,
+            url_haus=set(),
+            block_list={bytes.fromhex(HASH): (Reason.HIGH_IO,)},
+            allow_list={bytes.fromhex(HASH)},
+        )
+        return last_known_good
+
     @pytest.fixture
     def checker(self, db_session):
         return URLCheckerService(db_session)
 
+    @pytest.fixture
+    def HashIndex(self, patch):
+        return patch("checkmate.services.url_checker.HashIndex")
+
+    @pytest.fixture
+    def parallel_check(self):
+        parallel_check = create_autospec(ParallelCheckService, instance=True)
+        parallel_check.incomplete = []
+
+        def run(tasks, **_kwargs):
+            results = {
+                key: task(sentinel.thread_session)
+                for key, task in tasks.items()
+                if key not in parallel_check.incomplete
+            }
+            return results, parallel_check.incomplete
+
+        parallel_check.run.side_effect = run
+        return parallel_check
+
+    @pytest.fixture
+    def CheckFunction(self, patch):
+        return patch("checkmate.services.url_checker.CheckFunction")
+
+    @pytest.fixture
+    def hash_index_service(self):
+        return create_autospec(HashIndexService, instance=True)
+
     @pytest.fixture
     def patch_checker(self, patch):
         """Return a function for patching a checker class."""
@@ -104,7 +633,166 @@ class TestURLCheckerService:
 
 class TestFactory:
     # Some basic sanity
+    @pytest.mark.usefixtures("url_hasher_service")
     def test_it(self, pyramid_request):
         service = factory(sentinel.context, pyramid_request)
 
         assert isinstance(service, URLCheckerService)
+
+    def test_it_with_the_hash_index(
+        self, pyramid_request, hash_index_service, url_hasher_service, URLCheckerService
+    ):
+        pyramid_request.registry.settings["hash_index"] = "true"
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=hash_index_service,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=None,
+            result_cache=None,
+            url_hasher=url_hasher_service,
+            parallel_check=None,
+            circuit_breaker=None,
+            last_known_good=None,
+        )
+
+    def test_it_with_the_digest_file(
+        self,
+        pyramid_request,
+        digest_file_service,
+        url_hasher_service,
+        URLCheckerService,
+    ):
+        pyramid_request.registry.settings["digest_file"] = "/tmp/digests"
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=digest_file_service,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=None,
+            result_cache=None,
+            url_hasher=url_hasher_service,
+            parallel_check=None,
+            circuit_breaker=None,
+            last_known_good=None,
+        )
+
+    def test_it_with_the_url_haus_filter(
+        self,
+        pyramid_request,
+        url_haus_filter_service,
+        url_hasher_service,
+        URLCheckerService,
+    ):
+        pyramid_request.registry.settings["url_haus_filter"] = "true"
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=None,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=url_haus_filter_service.filter,
+            result_cache=None,
+            url_hasher=url_hasher_service,
+            parallel_check=None,
+            circuit_breaker=None,
+            last_known_good=None,
+        )
+
+    def test_it_with_the_result_cache(
+        self,
+        pyramid_request,
+        result_cache_service,
+        url_hasher_service,
+        URLCheckerService,
+    ):
+        pyramid_request.registry.settings["result_cache"] = "true"
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=None,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=None,
+            result_cache=result_cache_service,
+            url_hasher=url_hasher_service,
+            parallel_check=None,
+            circuit_breaker=None,
+            last_known_good=None,
+        )
+
+    def test_it_with_parallel_checks(
+        self,
+        pyramid_request,
+        parallel_check_service,
+        url_hasher_service,
+        URLCheckerService,
+    ):
+        pyramid_request.registry.settings["parallel_checks"] = "true"
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=None,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=None,
+            result_cache=None,
+            url_hasher=url_hasher_service,
+            parallel_check=parallel_check_service,
+            circuit_breaker=None,
+            last_known_good=None,
+        )
+
+    @pytest.mark.parametrize("last_known_good_file", ("", "/tmp/last_known_good"))
+    def test_it_with_the_circuit_breaker(
+        self,
+        pyramid_request,
+        circuit_breaker_service,
+        last_known_good_service,
+        url_hasher_service,
+        URLCheckerService,
+        last_known_good_file,
+    ):
+        pyramid_request.registry.settings.update(
+            {
+                "circuit_breaker": "true",
+                "last_known_good_file": last_known_good_file,
+            }
+        )
+
+        factory(sentinel.context, pyramid_request)
+
+        URLCheckerService.assert_called_once_with(
+            db_session=pyramid_request.db,
+            hash_index=None,
+            combined_lookup=False,
+            rule_index=False,
+            check_function=False,
+            url_haus_filter=None,
+            result_cache=None,
+            url_hasher=url_hasher_service,
+            parallel_check=None,
+            circuit_breaker=circuit_breaker_service,
+            last_known_good=(last_known_good_service if last_known_good_file else None),
+        )
+
+    @pytest.fixture
+    def URLCheckerService(self, patch):
+        return patch("checkmate.services.url_checker.URLCheckerService")
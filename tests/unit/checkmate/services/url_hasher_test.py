@@ -0,0 +1,52 @@
+import pytest
+from checkmatelib.url import hash_for_rule, hash_url
+
+from checkmate.exceptions import BadURL
+from checkmate.services.url_hasher import URLHasherService
+
+
+class TestURLHasherService:
+    def test_hash_url(self, svc):
+        assert svc.hash_url("http://example.com") == list(
+            hash_url("http://example.com")
+        )
+
+    def test_hash_for_rule(self, svc):
+        assert svc.hash_for_rule("http://example.com") == hash_for_rule(
+            "http://example.com"
+        )
+
+    def test_it_remembers_results(self, svc, hash_url):
+        hash_url.return_value = iter(["hash"])
+
+        assert svc.hash_url("http://example.com") == ["hash"]
+        assert svc.hash_url("http://example.com") == ["hash"]
+
+        hash_url.assert_called_once_with("http://example.com")
+        assert svc.metrics() == {
+            "size": 1,
+            "max_size": 2,
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5,
+            "evictions": 0,
+        }
+
+    def test_it_keeps_results_separate(self, svc):
+        svc.hash_for_rule("http://example.com")
+
+        assert svc.hash_url("http://example.com") == list(
+            hash_url("http://example.com")
+        )
+
+    def test_it_raises_for_bad_urls(self, svc):
+        with pytest.raises(BadURL):
+            svc.hash_url("http://example.com]")
+
+    @pytest.fixture
+    def svc(self):
+        return URLHasherService(max_size=2)
+
+    @pytest.fixture
+    def hash_url(self, patch):
+        return patch("checkmate.services.url_hasher.hash_url")
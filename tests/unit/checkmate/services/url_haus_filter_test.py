@@ -0,0 +1,60 @@
+from unittest.mock import sentinel
+
+import pytest
+
+from checkmate.services.url_haus_filter import URLHausFilterService
+
+
+class TestURLHausFilterService:
+    def test_it_loads_the_filter_for_the_version(
+        self, svc, CuckooFilter, URLHausFilter, SESSION
+    ):
+        svc.refresh()
+
+        URLHausFilter.current_version.assert_called_once_with(SESSION.return_value)
+        URLHausFilter.load.assert_called_once_with(SESSION.return_value)
+        CuckooFilter.from_bytes.assert_called_once_with(
+            URLHausFilter.load.return_value,
+            version=URLHausFilter.current_version.return_value,
+        )
+        assert svc.filter == CuckooFilter.from_bytes.return_value
+
+    def test_it_has_no_filter_if_none_is_stored(self, svc, URLHausFilter):
+        URLHausFilter.load.return_value = None
+
+        svc.refresh()
+
+        assert svc.filter is None
+
+    def test_metrics(self, svc, CuckooFilter, URLHausFilter):
+        CuckooFilter.from_bytes.return_value.metrics.return_value = {"items": 2}
+        svc.refresh()
+
+        assert svc.metrics() == {
+            "ready": True,
+            "version": URLHausFilter.current_version.return_value,
+            "items": 2,
+        }
+
+    def test_metrics_when_not_ready(self, svc):
+        assert svc.metrics() == {"ready": False}
+
+    @pytest.fixture
+    def svc(self):
+        return URLHausFilterService(sentinel.engine)
+
+    @pytest.fixture(autouse=True)
+    def Thread(self, patch):
+        return patch("checkmate.services._background_refresh.Thread")
+
+    @pytest.fixture(autouse=True)
+    def SESSION(self, patch):
+        return patch("checkmate.services._background_refresh.SESSION")
+
+    @pytest.fixture(autouse=True)
+    def CuckooFilter(self, patch):
+        return patch("checkmate.services.url_haus_filter.CuckooFilter")
+
+    @pytest.fixture(autouse=True)
+    def URLHausFilter(self, patch):
+        return patch("checkmate.services.url_haus_filter.URLHausFilter")
@@ -1,8 +1,19 @@
 import pytest
+from h_matchers import Any
+from marshmallow import ValidationError
 
 from checkmate.exceptions import BadURL, BadURLParameter
 from checkmate.models import BlockedFor, Detection, Reason, Source
-from checkmate.views.api.check_url import check_url
+from checkmate.views.api.check_url import (
+    BatchCheckSchema,
+    check_url,
+    check_url_batch,
+    check_url_prefixes,
+)
+from checkmate.views.derivers.jsonapi import JSONAPIBody
+
+HASH_1 = "7d93a7a785da3bb7fc67b08cda3368745eb7cf6155e4d8b26415680e69a3f5c6"
+HASH_2 = "f1991c232fda31acdfb50bf118458ddfd31140649218f4774f9c98e50317a59c"
 
 
 @pytest.mark.usefixtures("secure_link_service", "url_checker_service")
@@ -85,6 +96,31 @@ class TestURLCheck:
             ignore_reasons={Reason.MEDIA_IMAGE, Reason.MALICIOUS},
         )
 
+    def test_a_good_url_checked_while_degraded(
+        self, pyramid_request, url_checker_service
+    ):
+        url_checker_service.degraded = True
+        pyramid_request.params["url"] = "http://happy.example.com"
+
+        response = check_url(pyramid_request)
+
+        assert response.status_code == 204
+        assert response.headers["X-Checkmate-Degraded"] == "true"
+
+    def test_a_bad_url_checked_while_degraded(
+        self, pyramid_request, url_checker_service
+    ):
+        url_checker_service.degraded = True
+        url_checker_service.check_url.return_value = [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS)
+        ]
+        pyramid_request.params["url"] = "http://sad.example.com"
+
+        result = check_url(pyramid_request)
+
+        assert result["meta"] == {"maxSeverity": "mandatory", "degraded": True}
+        assert pyramid_request.response.headers["X-Checkmate-Degraded"] == "true"
+
     def test_it_returns_an_error_for_no_url(self, pyramid_request):
         with pytest.raises(BadURLParameter):
             check_url(pyramid_request)
@@ -105,3 +141,321 @@ class TestURLCheck:
 
         with pytest.raises(BadURLParameter):
             check_url(pyramid_request)
+
+    @pytest.mark.parametrize("url", (None, "http://sad.example.com"))
+    def test_it_can_check_hashes(
+        self,
+        pyramid_request,
+        url_checker_service,
+        url_hasher_service,
+        secure_link_service,
+        url,
+    ):
+        url_checker_service.check_hashes.return_value = [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS)
+        ]
+        url_hasher_service.hash_url.return_value = [HASH_2, HASH_1]
+        pyramid_request.params["hashes"] = f"{HASH_1.upper()},{HASH_2}"
+        if url:
+            pyramid_request.params["url"] = url
+
+        result = check_url(pyramid_request)
+
+        url_checker_service.check_url.assert_not_called()
+        url_checker_service.check_hashes.assert_called_once_with(
+            [HASH_1, HASH_2], allow_all=None, ignore_reasons=[]
+        )
+        if url:
+            assert result["links"] == {
+                "html": secure_link_service.route_url.return_value
+            }
+        else:
+            assert "links" not in result
+            secure_link_service.route_url.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "url_hashes,error", (([HASH_1], None), ([HASH_1, HASH_2], BadURL()))
+    )
+    def test_it_only_links_to_the_block_page_for_the_hashes_url(
+        self,
+        pyramid_request,
+        url_checker_service,
+        url_hasher_service,
+        secure_link_service,
+        url_hashes,
+        error,
+    ):
+        url_checker_service.check_hashes.return_value = [
+            Detection(Reason.MALICIOUS, Source.URL_HAUS)
+        ]
+        url_hasher_service.hash_url.return_value = url_hashes
+        url_hasher_service.hash_url.side_effect = error
+        pyramid_request.params["hashes"] = f"{HASH_1},{HASH_2}"
+        pyramid_request.params["url"] = "http://other.example.com"
+
+        result = check_url(pyramid_request)
+
+        url_hasher_service.hash_url.assert_called_once_with("http://other.example.com")
+        assert "links" not in result
+        secure_link_service.route_url.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "hashes", (",", "abcd", f"{HASH_1}0", ",".join([HASH_1] * 101))
+    )
+    def test_it_returns_an_error_for_invalid_hashes(self, pyramid_request, hashes):
+        pyramid_request.params["hashes"] = hashes
+
+        with pytest.raises(BadURLParameter):
+            check_url(pyramid_request)
+
+
+@pytest.mark.usefixtures("secure_link_service", "url_checker_service")
+class TestURLCheckBatch:
+    def test_it(self, pyramid_request, url_checker_service, secure_link_service):
+        url_checker_service.check_urls.return_value = {
+            "http://sad.example.com": [Detection(Reason.MALICIOUS, Source.URL_HAUS)],
+            "http://happy.example.com": [],
+            "http://example.com]": None,
+        }
+
+        result = check_url_batch(pyramid_request)
+
+        url_checker_service.check_urls.assert_called_once_with(
+            [
+                "http://sad.example.com",
+                "http://happy.example.com",
+                "http://example.com]",
+            ],
+            allow_all=False,
+            ignore_reasons={Reason.MEDIA_IMAGE},
+        )
+        assert pyramid_request.response.status_code == 200
+        assert result == {
+            "data": [
+                {
+                    "url": "http://sad.example.com",
+                    "data": [Reason.MALICIOUS.serialise()],
+                    "meta": {"maxSeverity": "mandatory"},
+                    "links": {"html": secure_link_service.route_url.return_value},
+                },
+                {"url": "http://happy.example.com", "data": []},
+                {
+                    "url": "http://example.com]",
+                    "errors": [Any.dict.containing({"id": "BadURLParameter"})],
+                },
+            ]
+        }
+        secure_link_service.route_url.assert_called_once_with(
+            "present_block",
+            _scheme=Any(),
+            _port=Any(),
+            _host=Any(),
+            _query={
+                "url": "http://sad.example.com",
+                "reason": Reason.MALICIOUS.value,  # pylint: disable=no-member
+                "blocked_for": BlockedFor.LMS.value,
+            },
+        )
+
+    def test_it_when_degraded(self, pyramid_request, url_checker_service):
+        url_checker_service.degraded = True
+        url_checker_service.check_urls.return_value = {
+            "http://sad.example.com": [],
+            "http://happy.example.com": [],
+            "http://example.com]": None,
+        }
+
+        result = check_url_batch(pyramid_request)
+
+        assert result["meta"] == {"degraded": True}
+        assert pyramid_request.response.headers["X-Checkmate-Degraded"] == "true"
+
+    def test_it_can_check_hashes(self, pyramid_request, url_checker_service):
+        del pyramid_request.jsonapi.attributes["urls"]
+        pyramid_request.jsonapi.attributes["hashes"] = [[HASH_1.upper()], [HASH_2]]
+        url_checker_service.check_many_hashes.return_value = [
+            [Detection(Reason.MALICIOUS, Source.URL_HAUS)],
+            [],
+        ]
+
+        result = check_url_batch(pyramid_request)
+
+        url_checker_service.check_many_hashes.assert_called_once_with(
+            [[HASH_1], [HASH_2]],
+            allow_all=False,
+            ignore_reasons={Reason.MEDIA_IMAGE},
+        )
+        assert result == {
+            "data": [
+                {
+                    "hashes": [HASH_1.upper()],
+                    "data": [Reason.MALICIOUS.serialise()],
+                    "meta": {"maxSeverity": "mandatory"},
+                },
+                {"hashes": [HASH_2], "data": []},
+            ]
+        }
+
+    def test_it_can_check_hashes_with_urls(
+        self,
+        pyramid_request,
+        url_checker_service,
+        url_hasher_service,
+        secure_link_service,
+    ):
+        pyramid_request.jsonapi.attributes["urls"] = [
+            "http://sad.example.com",
+            "http://other.example.com",
+        ]
+        pyramid_request.jsonapi.attributes["hashes"] = [[HASH_1.upper()], [HASH_1]]
+        url_checker_service.check_many_hashes.return_value = [
+            [Detection(Reason.MALICIOUS, Source.URL_HAUS)]
+        ] * 2
+        url_hasher_service.hash_url.side_effect = lambda url: (
+            [HASH_1] if url == "http://sad.example.com" else [HASH_2]
+        )
+
+        result = check_url_batch(pyramid_request)
+
+        url_checker_service.check_urls.assert_not_called()
+        # We only link to the block page for the URL the hashes are for
+        assert [document.get("links") for document in result["data"]] == [
+            {"html": secure_link_service.route_url.return_value},
+            None,
+        ]
+
+    def test_it_returns_an_error_for_invalid_hashes(self, pyramid_request):
+        pyramid_request.jsonapi.attributes["hashes"] = [["abcd"]]
+
+        with pytest.raises(BadURLParameter):
+            check_url_batch(pyramid_request)
+
+    def test_it_returns_an_error_for_unknown_ignore_reason(self, pyramid_request):
+        pyramid_request.jsonapi.attributes["ignore_reasons"] = ["whatever"]
+
+        with pytest.raises(BadURLParameter):
+            check_url_batch(pyramid_request)
+
+    @pytest.fixture
+    def pyramid_request(self, pyramid_request):
+        pyramid_request.jsonapi = JSONAPIBody(
+            type_="BatchCheck",
+            attributes={
+                "urls": [
+                    "http://sad.example.com",
+                    "http://happy.example.com",
+                    "http://example.com]",
+                ],
+                "ignore_reasons": [Reason.MEDIA_IMAGE.value],
+                "allow_all": False,
+                "blocked_for": BlockedFor.LMS.value,
+            },
+        )
+        return pyramid_request
+
+
+class TestURLCheckPrefixes:
+    def test_it(self, pyramid_request, url_checker_service):
+        pyramid_request.params["prefixes"] = "0123ABCD, 456789ab,"
+        url_checker_service.find_prefix_matches.return_value = {
+            "0123abcdff": (
+                [
+                    Detection(Reason.MALICIOUS, Source.URL_HAUS),
+                    Detection(Reason.MALICIOUS, Source.BLOCK_LIST),
+                    Detection(Reason.HIGH_IO, Source.BLOCK_LIST),
+                ],
+                False,
+            ),
+            "456789abff": ([], True),
+        }
+
+        result = check_url_prefixes(pyramid_request)
+
+        url_checker_service.find_prefix_matches.assert_called_once_with(
+            ["0123abcd", "456789ab"]
+        )
+        assert result == {
+            "data": [
+                {
+                    "type": "hash",
+                    "id": "0123abcdff",
+                    "attributes": {
+                        "reasons": ["malicious", "high-io"],
+                        "allowed": False,
+                    },
+                },
+                {
+                    "type": "hash",
+                    "id": "456789abff",
+                    "attributes": {"reasons": [], "allowed": True},
+                },
+            ]
+        }
+
+    @pytest.mark.parametrize(
+        "prefixes",
+        (
+            None,
+            "",
+            ",",
+            "0123abc",
+            "0123abcg",
+            "a" * 65,
+            ",".join(["0123abcd"] * 101),
+        ),
+    )
+    def test_it_rejects_bad_prefixes(self, pyramid_request, prefixes):
+        if prefixes is not None:
+            pyramid_request.params["prefixes"] = prefixes
+
+        with pytest.raises(BadURLParameter):
+            check_url_prefixes(pyramid_request)
+
+
+class TestBatchCheckSchema:
+    def test_it_applies_defaults(self):
+        attributes = BatchCheckSchema().load(
+            {"data": {"type": "BatchCheck", "attributes": {"urls": ["example.com"]}}}
+        )
+
+        assert attributes == {
+            "urls": ["example.com"],
+            "ignore_reasons": [],
+            "allow_all": False,
+            "blocked_for": BlockedFor.GENERAL.value,
+        }
+
+    @pytest.mark.parametrize("urls", (None, ["example.com"]))
+    def test_it_accepts_hashes(self, urls):
+        attributes = {"hashes": [[HASH_1]]}
+        if urls:
+            attributes["urls"] = urls
+
+        attributes = BatchCheckSchema().load(
+            {"data": {"type": "BatchCheck", "attributes": attributes}}
+        )
+
+        assert attributes["hashes"] == [[HASH_1]]
+
+    @pytest.mark.parametrize(
+        "attributes",
+        (
+            {},
+            {"hashes": []},
+            {"hashes": [[]]},
+            {"hashes": [[HASH_1] * 101]},
+            {"urls": ["example.com"], "hashes": [[HASH_1], [HASH_2]]},
+        ),
+    )
+    def test_it_validates_hashes(self, attributes):
+        with pytest.raises(ValidationError):
+            BatchCheckSchema().load(
+                {"data": {"type": "BatchCheck", "attributes": attributes}}
+            )
+
+    @pytest.mark.parametrize("urls", ([], ["example.com"] * 101))
+    def test_it_limits_the_number_of_urls(self, urls):
+        with pytest.raises(ValidationError):
+            BatchCheckSchema().load(
+                {"data": {"type": "BatchCheck", "attributes": {"urls": urls}}}
+            )
@@ -1,14 +1,40 @@
+from unittest.mock import Mock, create_autospec
+
 import pytest
 from h_matchers import Any
 
+from checkmate.db_pool import InstrumentedQueuePool
+from checkmate.db_replicas import ReplicaRouter
 from checkmate.views.status import status
 
 
 class TestStatusRoute:
     def test_it(self, pyramid_request, capture_message):
-        assert status(pyramid_request) == Any.dict()
+        assert status(pyramid_request) == {"status": "okay"}
         capture_message.assert_not_called()
 
+    def test_it_with_verbose(self, pyramid_request, url_hasher_service):
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == {
+            "status": "okay",
+            "metrics": {"url_hasher": url_hasher_service.metrics.return_value},
+        }
+
+    def test_it_with_verbose_and_the_url_haus_filter(
+        self, pyramid_request, url_haus_filter_service
+    ):
+        pyramid_request.registry.settings["url_haus_filter"] = "true"
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == Any.dict.containing(
+            {
+                "metrics": Any.dict.containing(
+                    {"url_haus_filter": url_haus_filter_service.metrics.return_value}
+                )
+            }
+        )
+
     def test_it_sends_test_messages_to_sentry(self, pyramid_request, capture_message):
         pyramid_request.params["sentry"] = ""
 
@@ -18,6 +44,65 @@ class TestStatusRoute:
             "Test message from Checkmate's status view"
         )
 
+    def test_it_with_verbose_and_the_result_cache(
+        self, pyramid_request, result_cache_service
+    ):
+        pyramid_request.registry.settings["result_cache"] = "true"
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == Any.dict.containing(
+            {
+                "metrics": Any.dict.containing(
+                    {"result_cache": result_cache_service.metrics.return_value}
+                )
+            }
+        )
+
+    def test_it_with_verbose_and_the_circuit_breaker(
+        self, pyramid_request, circuit_breaker_service
+    ):
+        pyramid_request.registry.settings["circuit_breaker"] = "true"
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == Any.dict.containing(
+            {
+                "metrics": Any.dict.containing(
+                    {"circuit_breaker": circuit_breaker_service.metrics.return_value}
+                )
+            }
+        )
+
+    def test_it_with_verbose_and_a_database_pool(self, pyramid_request):
+        pool = create_autospec(InstrumentedQueuePool, instance=True)
+        pyramid_request.registry["database_engine"] = Mock(pool=pool)
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == Any.dict.containing(
+            {
+                "metrics": Any.dict.containing(
+                    {"database_pool": pool.metrics.return_value}
+                )
+            }
+        )
+
+    def test_it_with_verbose_and_replicas(self, pyramid_request):
+        router = create_autospec(ReplicaRouter, instance=True, replicas=["replica"])
+        pyramid_request.registry["database_router"] = router
+        pyramid_request.params["verbose"] = ""
+
+        assert status(pyramid_request) == Any.dict.containing(
+            {
+                "metrics": Any.dict.containing(
+                    {"database_replicas": router.metrics.return_value}
+                )
+            }
+        )
+
+
+@pytest.fixture(autouse=True)
+def url_hasher_service(url_hasher_service):
+    return url_hasher_service
+
 
 @pytest.fixture(autouse=True)
 def capture_message(patch):
@@ -3,10 +3,18 @@ from unittest import mock
 import pytest
 
 from checkmate.services import (
+    CircuitBreakerService,
     CustomRuleService,
+    DigestFileService,
+    HashIndexService,
+    LastKnownGoodService,
+    ParallelCheckService,
+    ResultCacheService,
     RuleService,
     SignatureService,
     URLCheckerService,
+    URLHasherService,
+    URLHausFilterService,
 )
 from checkmate.services.secure_link import SecureLinkService
 
@@ -36,7 +44,9 @@ def secure_link_service(mock_service):
 
 @pytest.fixture
 def url_checker_service(mock_service):
-    return mock_service(URLCheckerService)
+    url_checker_service = mock_service(URLCheckerService)
+    url_checker_service.degraded = False
+    return url_checker_service
 
 
 @pytest.fixture
@@ -47,3 +57,43 @@ def rule_service(mock_service):
 @pytest.fixture
 def custom_rule_service(mock_service):
     return mock_service(CustomRuleService)
+
+
+@pytest.fixture
+def hash_index_service(mock_service):
+    return mock_service(HashIndexService)
+
+
+@pytest.fixture
+def result_cache_service(mock_service):
+    return mock_service(ResultCacheService)
+
+
+@pytest.fixture
+def url_haus_filter_service(mock_service):
+    return mock_service(URLHausFilterService)
+
+
+@pytest.fixture
+def url_hasher_service(mock_service):
+    return mock_service(URLHasherService)
+
+
+@pytest.fixture
+def digest_file_service(mock_service):
+    return mock_service(DigestFileService)
+
+
+@pytest.fixture
+def parallel_check_service(mock_service):
+    return mock_service(ParallelCheckService)
+
+
+@pytest.fixture
+def circuit_breaker_service(mock_service):
+    return mock_service(CircuitBreakerService)
+
+
+@pytest.fixture
+def last_known_good_service(mock_service):
+    return mock_service(LastKnownGoodService)